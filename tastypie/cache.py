@@ -1,4 +1,29 @@
+import errno
+import math
+import mmap
+import os
+import random
+import stat
+import struct
+import threading
+import time
 from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import md5
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 
 class NoCache(object):
@@ -6,7 +31,39 @@ class NoCache(object):
     A simplified, swappable base class for caching.
     
     Does nothing save for simulating the cache API.
+    
+    Also provides ``get_or_set``, which guards against cache stampedes on any
+    subclass. It can be tuned with:
+    
+    * ``stale_timeout``, how many seconds an expired value is kept around to
+      be served while it's being rebuilt (defaults to ``60``).
+    * ``lock_timeout``, how many seconds the rebuilding lock lasts if its
+      holder dies (defaults to ``10``).
+    * ``lock_wait``, how many seconds to wait for another worker's rebuild
+      when there's no stale value to serve (defaults to ``1``).
+    * ``early_refresh``, how eagerly values are rebuilt before they expire.
+      ``0`` disables it. Defaults to ``1.0``.
     """
+    # Class-level defaults, so subclasses that don't call ``__init__`` work.
+    stale_timeout = 60
+    lock_timeout = 10
+    lock_wait = 1
+    early_refresh = 1.0
+    lock_poll_interval = 0.05
+    
+    def __init__(self, stale_timeout=None, lock_timeout=None, lock_wait=None, early_refresh=None):
+        if stale_timeout is not None:
+            self.stale_timeout = stale_timeout
+        
+        if lock_timeout is not None:
+            self.lock_timeout = lock_timeout
+        
+        if lock_wait is not None:
+            self.lock_wait = lock_wait
+        
+        if early_refresh is not None:
+            self.early_refresh = early_refresh
+    
     def get(self, key):
         """
         Always returns ``None``.
@@ -18,6 +75,118 @@ class NoCache(object):
         No-op for setting values in the cache.
         """
         pass
+    
+    def delete(self, key):
+        """
+        No-op for removing values from the cache.
+        """
+        pass
+    
+    def get_many(self, keys):
+        """
+        Gets several keys at once. Returns a dictionary of the keys that
+        were found.
+        
+        Calls ``get`` for each key. Backends that can do better override it.
+        """
+        found = {}
+        
+        for key in keys:
+            value = self.get(key)
+            
+            if value is not None:
+                found[key] = value
+        
+        return found
+    
+    def set_many(self, data, timeout=60):
+        """
+        Sets several key-values in the cache at once.
+        
+        Calls ``set`` for each key. Backends that can do better override it.
+        """
+        for key, value in data.items():
+            self.set(key, value, timeout)
+    
+    def add(self, key, value, timeout=60):
+        """
+        Sets a key-value only if the key isn't already in the cache. Returns
+        ``True`` if it was set.
+        
+        With nothing ever cached, this always "succeeds".
+        """
+        return True
+    
+    def get_or_set(self, key, callback, timeout=60):
+        """
+        Gets a key from the cache, calling ``callback`` to build (& store)
+        the value if it's missing or expired.
+        
+        Only one worker rebuilds a value at a time. The others serve the
+        expired value if there is one, or wait up to ``lock_wait`` seconds
+        for the rebuild. Values are also rebuilt a little early, with a
+        chance that grows as they near expiry & with how slow the
+        ``callback`` was, so a hot key rarely expires at all.
+        
+        The value is stored along with its expiry, so it should only be read
+        back through ``get_or_set``.
+        """
+        lock_key = "%s:lock" % key
+        cached = self.get(key)
+        
+        if cached is not None:
+            value, expires, duration = cached
+            
+            if not self.should_refresh(expires, duration):
+                return value
+            
+            if not self.add(lock_key, 1, self.lock_timeout):
+                # Someone else is rebuilding it. Serve what we have.
+                return value
+        elif not self.add(lock_key, 1, self.lock_timeout):
+            # Someone else is rebuilding it & there's nothing to serve yet.
+            deadline = time.time() + self.lock_wait
+            
+            while time.time() < deadline:
+                time.sleep(self.lock_poll_interval)
+                cached = self.get(key)
+                
+                if cached is not None:
+                    return cached[0]
+            
+            # They're taking too long. Build it ourselves, but leave the
+            # storing to the lock holder.
+            return callback()
+        
+        try:
+            started = time.time()
+            value = callback()
+            finished = time.time()
+            self.set(key, (value, finished + timeout, finished - started), timeout + self.stale_timeout)
+        finally:
+            self.delete(lock_key)
+        
+        return value
+    
+    def should_refresh(self, expires, duration):
+        """
+        Decides whether a value that expires at ``expires`` (& took
+        ``duration`` seconds to build) should be rebuilt now.
+        
+        Always true once it's expired. Before then, it's true with a chance
+        that grows exponentially as the expiry nears (see "Optimal
+        Probabilistic Cache Stampede Prevention", Vattani et al.).
+        """
+        now = time.time()
+        
+        if now >= expires:
+            return True
+        
+        if not self.early_refresh or duration <= 0:
+            return False
+        
+        # ``1.0 - random.random()`` is in (0, 1], so the log is safe.
+        return now - duration * self.early_refresh * math.log(1.0 - random.random()) >= expires
 
 
 class SimpleCache(NoCache):
@@ -37,3 +206,711 @@ class SimpleCache(NoCache):
         Optionally accepts a ``timeout`` in seconds. Defaults to ``60`` seconds.
         """
         cache.set(key, value, timeout)
+    
+    def delete(self, key):
+        """
+        Removes a key from the cache, if present.
+        """
+        cache.delete(key)
+    
+    def get_many(self, keys):
+        """
+        Gets several keys from the cache in one round trip. Returns a
+        dictionary of the keys that were found.
+        """
+        return cache.get_many(keys)
+    
+    def set_many(self, data, timeout=60):
+        """
+        Sets several key-values in the cache in one round trip.
+        
+        Optionally accepts a ``timeout`` in seconds. Defaults to ``60`` seconds.
+        """
+        cache.set_many(data, timeout)
+    
+    def add(self, key, value, timeout=60):
+        """
+        Sets a key-value only if the key isn't already in the cache. Returns
+        ``True`` if it was set.
+        
+        This is atomic on backends that support it (i.e. memcached), which
+        makes it suitable for locks.
+        """
+        return cache.add(key, value, timeout)
+
+
+# The slots of the linked list entries in ``LRUCache``.
+PREVIOUS, NEXT, KEY, VALUE, EXPIRES = 0, 1, 2, 3, 4
+
+
+class LRUCache(NoCache):
+    """
+    A bounded, in-process cache.
+    
+    Holds at most ``size`` keys (defaults to ``1000``), evicting the least
+    recently used key to make room. Keys also expire after their
+    ``timeout``, which is capped at ``max_timeout`` seconds if provided.
+    
+    Values are stored pickled (like Django's local-memory cache), so callers
+    never share mutable objects.
+    
+    Since each process has its own copy, deletes in one process aren't seen
+    by the others. Keep ``max_timeout`` short where that matters.
+    
+    Keeps ``hits``, ``misses``, ``evictions`` (to make room) & ``expirations``
+    counters for sizing it. See ``stats``.
+    """
+    def __init__(self, size=1000, max_timeout=None, **kwargs):
+        super(LRUCache, self).__init__(**kwargs)
+        self.size = size
+        self.max_timeout = max_timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self.clear()
+    
+    def clear(self):
+        """
+        Removes every key from the cache. The counters are left alone.
+        """
+        self._lock.acquire()
+        
+        try:
+            # A circular, doubly-linked list of entries, from least to most
+            # recently used, plus a dictionary to find them by key.
+            root = []
+            root[:] = [root, root, None, None, None]
+            self._root = root
+            self._entries = {}
+        finally:
+            self._lock.release()
+    
+    def _unlink(self, entry):
+        entry[PREVIOUS][NEXT] = entry[NEXT]
+        entry[NEXT][PREVIOUS] = entry[PREVIOUS]
+    
+    def _append(self, entry):
+        last = self._root[PREVIOUS]
+        entry[PREVIOUS] = last
+        entry[NEXT] = self._root
+        last[NEXT] = entry
+        self._root[PREVIOUS] = entry
+    
+    def get(self, key):
+        """
+        Gets a key from the cache. Returns ``None`` if the key is not found
+        or has expired.
+        """
+        self._lock.acquire()
+        
+        try:
+            entry = self._entries.get(key)
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            if entry[EXPIRES] is not None and entry[EXPIRES] <= time.time():
+                self._unlink(entry)
+                del(self._entries[key])
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            # Mark it as the most recently used.
+            self._unlink(entry)
+            self._append(entry)
+            self.hits += 1
+            pickled = entry[VALUE]
+        finally:
+            self._lock.release()
+        
+        return pickle.loads(pickled)
+    
+    def set(self, key, value, timeout=60):
+        """
+        Sets a key-value in the cache, evicting the least recently used key
+        if the cache is full.
+        
+        Optionally accepts a ``timeout`` in seconds. Defaults to ``60``
+        seconds. ``None`` means no expiry (beyond ``max_timeout``).
+        """
+        self._set(key, value, timeout, replace=True)
+    
+    def add(self, key, value, timeout=60):
+        """
+        Sets a key-value only if the key isn't already in the cache (or has
+        expired). Returns ``True`` if it was set.
+        """
+        return self._set(key, value, timeout, replace=False)
+    
+    def _set(self, key, value, timeout, replace):
+        if self.max_timeout is not None and (timeout is None or timeout > self.max_timeout):
+            timeout = self.max_timeout
+        
+        expires = None
+        
+        if timeout is not None:
+            expires = time.time() + timeout
+        
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self._lock.acquire()
+        
+        try:
+            entry = self._entries.get(key)
+            
+            if entry is not None:
+                if not replace and (entry[EXPIRES] is None or entry[EXPIRES] > time.time()):
+                    return False
+                
+                self._unlink(entry)
+            
+            entry = [None, None, key, pickled, expires]
+            self._append(entry)
+            self._entries[key] = entry
+            
+            while len(self._entries) > self.size:
+                oldest = self._root[NEXT]
+                self._unlink(oldest)
+                del(self._entries[oldest[KEY]])
+                self.evictions += 1
+        finally:
+            self._lock.release()
+        
+        return True
+    
+    def delete(self, key):
+        """
+        Removes a key from the cache, if present.
+        """
+        self._lock.acquire()
+        
+        try:
+            entry = self._entries.pop(key, None)
+            
+            if entry is not None:
+                self._unlink(entry)
+        finally:
+            self._lock.release()
+    
+    def stats(self):
+        """
+        Returns a dictionary of the counters & the current number of keys.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': len(self._entries),
+        }
+
+
+class TwoTierCache(SimpleCache):
+    """
+    Puts a bounded, in-process ``LRUCache`` in front of Django's current
+    ``CACHE_BACKEND``.
+    
+    Hot keys are served from process memory, falling back to (& filling
+    from) the shared cache on a miss. Writes & deletes go to both tiers.
+    
+    Other processes only see deletes once their local copy expires, so
+    ``local_timeout`` (defaults to ``10`` seconds) bounds how stale a value
+    can be. ``size`` (defaults to ``1000``) bounds the local tier.
+    """
+    def __init__(self, size=1000, local_timeout=10, **kwargs):
+        super(TwoTierCache, self).__init__(**kwargs)
+        self.local = LRUCache(size=size, max_timeout=local_timeout)
+        self.shared_hits = 0
+        self.shared_misses = 0
+    
+    def get(self, key):
+        """
+        Gets a key from the local tier, then the shared one. Returns ``None``
+        if the key is not found.
+        """
+        value = self.local.get(key)
+        
+        if value is not None:
+            return value
+        
+        value = super(TwoTierCache, self).get(key)
+        
+        if value is None:
+            self.shared_misses += 1
+            return None
+        
+        self.shared_hits += 1
+        self.local.set(key, value, self.local.max_timeout)
+        return value
+    
+    def set(self, key, value, timeout=60):
+        """
+        Sets a key-value in both tiers.
+        
+        Optionally accepts a ``timeout`` in seconds. Defaults to ``60`` seconds.
+        """
+        super(TwoTierCache, self).set(key, value, timeout)
+        self.local.set(key, value, timeout)
+    
+    def delete(self, key):
+        """
+        Removes a key from both tiers.
+        """
+        self.local.delete(key)
+        super(TwoTierCache, self).delete(key)
+    
+    def get_many(self, keys):
+        """
+        Gets several keys, fetching whatever the local tier is missing from
+        the shared cache in one round trip.
+        """
+        found = self.local.get_many(keys)
+        missing = [key for key in keys if not key in found]
+        
+        if missing:
+            shared = super(TwoTierCache, self).get_many(missing)
+            self.shared_hits += len(shared)
+            self.shared_misses += len(missing) - len(shared)
+            self.local.set_many(shared, self.local.max_timeout)
+            found.update(shared)
+        
+        return found
+    
+    def set_many(self, data, timeout=60):
+        """
+        Sets several key-values in both tiers.
+        """
+        super(TwoTierCache, self).set_many(data, timeout)
+        self.local.set_many(data, timeout)
+    
+    def add(self, key, value, timeout=60):
+        """
+        Sets a key-value in both tiers, only if the key isn't already in the
+        shared cache. Returns ``True`` if it was set.
+        """
+        if not super(TwoTierCache, self).add(key, value, timeout):
+            return False
+        
+        self.local.set(key, value, timeout)
+        return True
+    
+    def stats(self):
+        """
+        Returns the local tier's ``stats``, plus how often local misses were
+        found in the shared cache.
+        """
+        stats = self.local.stats()
+        stats['shared_hits'] = self.shared_hits
+        stats['shared_misses'] = self.shared_misses
+        return stats
+
+
+# The layout of the ``MmapCache`` file: a header, then ``buckets * ways``
+# fixed-size slots. Each slot is a header (key hash, expiry, last use, key
+# length & value length), the key & then the pickled value.
+MMAP_MAGIC = 'TPMC'
+MMAP_VERSION = 1
+MMAP_HEADER = struct.Struct('<4sIIII')
+MMAP_HEADER_SIZE = 64
+MMAP_SLOT = struct.Struct('<QddHI')
+MMAP_LAST_USED = struct.Struct('<d')
+MMAP_LAST_USED_OFFSET = 16
+MMAP_MAX_KEY_LENGTH = 250
+MMAP_LOCK_STRIPES = 64
+
+# ``fcntl`` locks belong to the process (& closing any descriptor for a file
+# drops them all), so every ``MmapCache`` in a process on the same file
+# shares these thread locks, keyed by the file's device & inode.
+mmap_locks = {}
+mmap_locks_lock = threading.Lock()
+
+
+def get_mmap_locks(file_id):
+    """
+    Returns the ``(file_lock, stripe_locks)`` shared by every ``MmapCache``
+    in the process on the file identified by ``(st_dev, st_ino)``.
+    """
+    mmap_locks_lock.acquire()
+    
+    try:
+        if not file_id in mmap_locks:
+            mmap_locks[file_id] = (threading.Lock(), [threading.Lock() for i in range(MMAP_LOCK_STRIPES)])
+        
+        return mmap_locks[file_id]
+    finally:
+        mmap_locks_lock.release()
+
+
+class MmapCache(NoCache):
+    """
+    A cache shared by every process on a host, held in a memory-mapped file
+    at ``path``. No external service is needed.
+    
+    The file is a fixed-size hash table of ``slots`` entries (defaults to
+    ``4096``) of ``slot_size`` bytes each (defaults to ``4096``), so it
+    takes ``slots * slot_size`` bytes. Keys hash to a bucket of ``ways``
+    slots (defaults to ``8``). A full bucket evicts its least recently used
+    entry, & entries expire after their ``timeout``. Values too big for a
+    slot aren't cached.
+    
+    Each bucket is locked on its own (with ``fcntl`` byte-range locks), so
+    processes only contend when they touch the same bucket. Reads share the
+    lock.
+    
+    Every process must use the same settings. A file made with other
+    settings is refused, as is one that isn't owned by the current user or
+    is writable by others (since its contents are unpickled). Keep ``path``
+    in a directory only the user running the workers can write to. Requires
+    a Unix platform.
+    """
+    def __init__(self, path, slots=4096, slot_size=4096, ways=8, **kwargs):
+        super(MmapCache, self).__init__(**kwargs)
+        
+        if fcntl is None:
+            raise ImproperlyConfigured("Usage of MmapCache requires the 'fcntl' module (a Unix platform).")
+        
+        if slot_size <= MMAP_SLOT.size + MMAP_MAX_KEY_LENGTH:
+            raise ImproperlyConfigured("MmapCache's 'slot_size' must be more than %s bytes." % (MMAP_SLOT.size + MMAP_MAX_KEY_LENGTH))
+        
+        if not path:
+            raise ImproperlyConfigured("MmapCache requires a 'path' for its file.")
+        
+        self.path = path
+        self.ways = ways
+        self.buckets = max(1, slots // ways)
+        self.slot_size = slot_size
+        self.bucket_size = ways * slot_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._open()
+    
+    def _open(self):
+        size = MMAP_HEADER_SIZE + self.buckets * self.bucket_size
+        header = MMAP_HEADER.pack(MMAP_MAGIC, MMAP_VERSION, self.buckets, self.ways, self.slot_size)
+        
+        try:
+            # Never follow a symlink someone else planted.
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0600)
+        except OSError, e:
+            if e.errno == errno.ELOOP:
+                raise ImproperlyConfigured("MmapCache refuses to use '%s', as it's a symlink." % self.path)
+            
+            raise
+        
+        try:
+            file_stat = self._check_file()
+            self._file_lock, self._thread_locks = get_mmap_locks((file_stat.st_dev, file_stat.st_ino))
+            self._file_lock.acquire()
+            
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, MMAP_HEADER_SIZE, 0, os.SEEK_SET)
+                
+                try:
+                    self._init_file(size, header)
+                finally:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, MMAP_HEADER_SIZE, 0, os.SEEK_SET)
+            finally:
+                self._file_lock.release()
+            
+            self._map = mmap.mmap(self._fd, size)
+        except:
+            os.close(self._fd)
+            raise
+    
+    def _check_file(self):
+        """
+        Refuses the file unless it's a regular file owned by the current
+        user that nobody else can write to. Returns its ``os.fstat``.
+        """
+        file_stat = os.fstat(self._fd)
+        
+        if not stat.S_ISREG(file_stat.st_mode):
+            raise ImproperlyConfigured("MmapCache refuses to use '%s', as it isn't a regular file." % self.path)
+        
+        if file_stat.st_uid != os.getuid():
+            raise ImproperlyConfigured("MmapCache refuses to use '%s', as it's owned by another user." % self.path)
+        
+        if file_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise ImproperlyConfigured("MmapCache refuses to use '%s', as it's writable by other users." % self.path)
+        
+        return file_stat
+    
+    def _init_file(self, size, header):
+        """
+        Sizes & stamps a new file. An existing file must have been made with
+        the same settings, since other processes may have it mapped (and
+        resizing it under them would crash them).
+        """
+        current_size = os.fstat(self._fd).st_size
+        
+        if current_size == 0:
+            os.ftruncate(self._fd, size)
+        elif current_size != size:
+            raise ImproperlyConfigured("MmapCache's file '%s' was made with other settings (it's %s bytes, not %s)." % (self.path, current_size, size))
+        
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        current_header = os.read(self._fd, MMAP_HEADER.size)
+        
+        if current_header == '\0' * MMAP_HEADER.size:
+            # New (or its creator died before stamping it).
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            os.write(self._fd, header)
+        elif current_header != header:
+            raise ImproperlyConfigured("MmapCache's file '%s' was made with other settings." % self.path)
+    
+    def close(self):
+        """
+        Unmaps & closes the file. The cache can't be used afterward.
+        
+        Closing the file drops every ``fcntl`` lock this process holds on
+        it, so this waits until no other thread is inside a bucket.
+        """
+        self._file_lock.acquire()
+        
+        for thread_lock in self._thread_locks:
+            thread_lock.acquire()
+        
+        try:
+            self._map.close()
+            os.close(self._fd)
+        finally:
+            for thread_lock in self._thread_locks:
+                thread_lock.release()
+            
+            self._file_lock.release()
+    
+    def _locate(self, key):
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        
+        if len(key) > MMAP_MAX_KEY_LENGTH:
+            key = md5(key).hexdigest()
+        
+        key_hash = struct.unpack('<Q', md5(key).digest()[:8])[0]
+        return key, key_hash, key_hash % self.buckets
+    
+    def _lock(self, bucket, exclusive=False):
+        thread_lock = self._thread_locks[bucket % MMAP_LOCK_STRIPES]
+        thread_lock.acquire()
+        
+        if exclusive:
+            operation = fcntl.LOCK_EX
+        else:
+            operation = fcntl.LOCK_SH
+        
+        try:
+            fcntl.lockf(self._fd, operation, self.bucket_size, self._bucket_offset(bucket), os.SEEK_SET)
+        except:
+            thread_lock.release()
+            raise
+    
+    def _unlock(self, bucket):
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.bucket_size, self._bucket_offset(bucket), os.SEEK_SET)
+        finally:
+            self._thread_locks[bucket % MMAP_LOCK_STRIPES].release()
+    
+    def _bucket_offset(self, bucket):
+        return MMAP_HEADER_SIZE + bucket * self.bucket_size
+    
+    def _slots(self, bucket):
+        """
+        Yields the offset & header of each slot in the bucket.
+        """
+        offset = self._bucket_offset(bucket)
+        
+        for way in xrange(self.ways):
+            yield offset, MMAP_SLOT.unpack_from(self._map, offset)
+            offset += self.slot_size
+    
+    def _find(self, bucket, key, key_hash):
+        for offset, slot in self._slots(bucket):
+            slot_hash, expires, last_used, key_length, value_length = slot
+            
+            if key_length and slot_hash == key_hash:
+                key_start = offset + MMAP_SLOT.size
+                
+                if self._map[key_start:key_start + key_length] == key:
+                    return offset, slot
+        
+        return None, None
+    
+    def get(self, key):
+        """
+        Gets a key from the cache. Returns ``None`` if the key is not found
+        or has expired.
+        """
+        key, key_hash, bucket = self._locate(key)
+        now = time.time()
+        self._lock(bucket)
+        
+        try:
+            offset, slot = self._find(bucket, key, key_hash)
+            
+            if offset is None:
+                self.misses += 1
+                return None
+            
+            slot_hash, expires, last_used, key_length, value_length = slot
+            
+            if expires and expires <= now:
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            # Readers share the lock, but racing to stamp (about) the same
+            # time is harmless.
+            last_used_start = offset + MMAP_LAST_USED_OFFSET
+            self._map[last_used_start:last_used_start + MMAP_LAST_USED.size] = MMAP_LAST_USED.pack(now)
+            value_start = offset + MMAP_SLOT.size + key_length
+            pickled = self._map[value_start:value_start + value_length]
+        finally:
+            self._unlock(bucket)
+        
+        try:
+            value = pickle.loads(pickled)
+        except Exception:
+            # Torn by a process that died mid-write.
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return value
+    
+    def set(self, key, value, timeout=60):
+        """
+        Sets a key-value in the cache, evicting the bucket's least recently
+        used key if it is full.
+        
+        Optionally accepts a ``timeout`` in seconds. Defaults to ``60``
+        seconds. ``None`` means no expiry.
+        """
+        self._set(key, value, timeout, replace=True)
+    
+    def add(self, key, value, timeout=60):
+        """
+        Sets a key-value only if the key isn't already in the cache (or has
+        expired). Returns ``True`` if it was set.
+        
+        Atomic across processes, so it's suitable for locks.
+        """
+        return self._set(key, value, timeout, replace=False)
+    
+    def _set(self, key, value, timeout, replace):
+        key, key_hash, bucket = self._locate(key)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        
+        if MMAP_SLOT.size + len(key) + len(pickled) > self.slot_size:
+            # Too big. When replacing, make sure an older value isn't served
+            # instead, but ``add`` never touches an existing entry.
+            if replace:
+                self.delete(key)
+            
+            return False
+        
+        now = time.time()
+        expires = 0.0
+        
+        if timeout is not None:
+            expires = now + timeout
+        
+        self._lock(bucket, exclusive=True)
+        
+        try:
+            target = None
+            free = None
+            oldest = None
+            oldest_used = None
+            
+            for offset, slot in self._slots(bucket):
+                slot_hash, slot_expires, last_used, key_length, value_length = slot
+                live = key_length and not (slot_expires and slot_expires <= now)
+                
+                if key_length and slot_hash == key_hash:
+                    key_start = offset + MMAP_SLOT.size
+                    
+                    if self._map[key_start:key_start + key_length] == key:
+                        if live and not replace:
+                            return False
+                        
+                        target = offset
+                        break
+                
+                if not live:
+                    if free is None:
+                        free = offset
+                elif oldest is None or last_used < oldest_used:
+                    oldest = offset
+                    oldest_used = last_used
+            
+            if target is None:
+                target = free
+            
+            if target is None:
+                target = oldest
+                self.evictions += 1
+            
+            # Written in one go, so a reader never sees a half-set slot.
+            data = MMAP_SLOT.pack(key_hash, expires, now, len(key), len(pickled)) + key + pickled
+            self._map[target:target + len(data)] = data
+        finally:
+            self._unlock(bucket)
+        
+        return True
+    
+    def delete(self, key):
+        """
+        Removes a key from the cache, if present.
+        """
+        key, key_hash, bucket = self._locate(key)
+        self._lock(bucket, exclusive=True)
+        
+        try:
+            offset, slot = self._find(bucket, key, key_hash)
+            
+            if offset is not None:
+                self._map[offset:offset + MMAP_SLOT.size] = MMAP_SLOT.pack(0, 0.0, 0.0, 0, 0)
+        finally:
+            self._unlock(bucket)
+    
+    def clear(self):
+        """
+        Removes every key from the cache, for every process. The counters
+        are left alone.
+        """
+        for bucket in xrange(self.buckets):
+            self._lock(bucket, exclusive=True)
+            
+            try:
+                offset = self._bucket_offset(bucket)
+                self._map[offset:offset + self.bucket_size] = '\0' * self.bucket_size
+            finally:
+                self._unlock(bucket)
+    
+    def stats(self):
+        """
+        Returns a dictionary of this process' counters & the current number
+        of (unexpired) keys, shared by every process.
+        """
+        now = time.time()
+        size = 0
+        
+        for bucket in xrange(self.buckets):
+            for offset, slot in self._slots(bucket):
+                slot_hash, expires, last_used, key_length, value_length = slot
+                
+                if key_length and not (expires and expires <= now):
+                    size += 1
+        
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': size,
+        }
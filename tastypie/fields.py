@@ -2,6 +2,7 @@ import datetime
 from dateutil.parser import parse
 from decimal import Decimal
 import re
+import threading
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 from django.utils import datetime_safe, importlib
 from tastypie.bundle import Bundle
@@ -18,6 +19,34 @@ DATE_REGEX = re.compile('^(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2}).*?$')
 DATETIME_REGEX = re.compile('^(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})(T|\s+)(?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2}).*?$')
 
 
+# Per-process instances of related resources, shared by every related field
+# pointing at the same ``Resource`` class. Instantiating a ``Resource``
+# deep-copies its fields, which is far too costly to do per related object.
+_shared_resources = {}
+_shared_resources_lock = threading.Lock()
+
+
+def get_shared_resource(resource_class):
+    """
+    Returns the shared instance of ``resource_class``, creating it on first
+    use.
+    """
+    try:
+        return _shared_resources[resource_class]
+    except KeyError:
+        pass
+
+    _shared_resources_lock.acquire()
+
+    try:
+        if not resource_class in _shared_resources:
+            _shared_resources[resource_class] = resource_class()
+
+        return _shared_resources[resource_class]
+    finally:
+        _shared_resources_lock.release()
+
+
 # All the ApiField variants.
 
 class ApiField(object):
@@ -75,6 +104,22 @@ class ApiField(object):
         self.instance_name = name
         self._resource = cls
 
+    def get_attribute_bits(self):
+        """
+        Returns the ``attribute`` split on ``__``, for looking through
+        relations.
+
+        The split is only done once (and again should ``attribute`` be
+        reassigned), rather than for every object being dehydrated.
+        """
+        cached = getattr(self, '_attribute_bits', None)
+
+        if cached is None or cached[0] is not self.attribute:
+            cached = (self.attribute, self.attribute.split('__'))
+            self._attribute_bits = cached
+
+        return cached[1]
+
     def has_default(self):
         """Returns a boolean of whether this field has a default value."""
         return self._default is not NOT_PROVIDED
@@ -94,7 +139,7 @@ class ApiField(object):
         """
         if self.attribute is not None:
             # Check for `__` in the field for looking through the relation.
-            attrs = self.attribute.split('__')
+            attrs = self.get_attribute_bits()
             current_object = bundle.obj
 
             for attr in attrs:
@@ -125,6 +170,54 @@ class ApiField(object):
         else:
             return None
 
+    def compile_dehydrate(self):
+        """
+        Returns a function that does what ``dehydrate`` does for a bundle,
+        with everything that doesn't vary by object (splitting ``attribute``,
+        checking for a default, picking the ``convert`` method) done once,
+        up front. Used by ``Resource.get_dehydrate_plan``.
+
+        Fields that override ``dehydrate`` get it back as-is.
+        """
+        if self.__class__.dehydrate.im_func is not ApiField.dehydrate.im_func:
+            return self.dehydrate
+
+        convert = self.convert
+
+        if self.attribute is None:
+            if not self.has_default():
+                return lambda bundle: None
+
+            return lambda bundle: convert(self.default)
+
+        attrs = tuple(self.get_attribute_bits())
+        has_default = self.has_default()
+        default = self._default
+        null = self.null
+
+        def dehydrate(bundle):
+            current_object = bundle.obj
+
+            for attr in attrs:
+                previous_object = current_object
+                current_object = getattr(current_object, attr, None)
+
+                if current_object is None:
+                    if has_default:
+                        current_object = default
+                        break
+                    elif null:
+                        break
+                    else:
+                        raise ApiFieldError("The object '%r' has an empty attribute '%s' and doesn't allow a default or null value." % (previous_object, attr))
+
+            if callable(current_object):
+                current_object = current_object()
+
+            return convert(current_object)
+
+        return dehydrate
+
     def convert(self, value):
         """
         Handles conversion between the data found and the type of the field.
@@ -457,17 +550,20 @@ class RelatedField(ApiField):
 
     def get_related_resource(self, related_instance):
         """
-        Instaniates the related resource.
+        Returns the related resource.
+
+        Rather than instantiating the related resource for every related
+        object, a per-process instance (see ``get_shared_resource``) is
+        reused. As such, it should not carry any per-object state; the
+        ``related_instance`` travels with the ``Bundle`` instead.
         """
-        related_resource = self.to_class()
+        related_resource = get_shared_resource(self.to_class)
 
         # Fix the ``api_name`` if it's not present.
         if related_resource._meta.api_name is None:
             if self._resource and not self._resource._meta.api_name is None:
                 related_resource._meta.api_name = self._resource._meta.api_name
 
-        # Try to be efficient about DB queries.
-        related_resource.instance = related_instance
         return related_resource
 
     @property
@@ -510,7 +606,7 @@ class RelatedField(ApiField):
             return related_resource.get_resource_uri(bundle)
         else:
             # ZOMG extra data and big payloads.
-            bundle = related_resource.build_bundle(obj=related_resource.instance, request=bundle.request)
+            bundle = related_resource.build_bundle(obj=bundle.obj, request=bundle.request)
             return related_resource.full_dehydrate(bundle)
 
     def resource_from_uri(self, fk_resource, uri, request=None, related_obj=None, related_name=None):
@@ -576,7 +672,7 @@ class RelatedField(ApiField):
         Accepts either a URI, a data dictionary (or dictionary-like structure)
         or an object with a ``pk``.
         """
-        self.fk_resource = self.to_class()
+        self.fk_resource = get_shared_resource(self.to_class)
         kwargs = {
             'request': request,
             'related_obj': related_obj,
@@ -611,7 +707,7 @@ class ToOneField(RelatedField):
         self.fk_resource = None
 
     def dehydrate(self, bundle):
-        attrs = self.attribute.split('__')
+        attrs = self.get_attribute_bits()
         foreign_obj = bundle.obj
 
         for attr in attrs:
@@ -682,7 +778,7 @@ class ToManyField(RelatedField):
         attr = self.attribute
 
         if isinstance(self.attribute, basestring):
-            attrs = self.attribute.split('__')
+            attrs = self.get_attribute_bits()
             the_m2ms = bundle.obj
 
             for attr in attrs:
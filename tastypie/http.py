@@ -46,6 +46,10 @@ class HttpResponseConflict(HttpResponse):
     status_code = 409
 
 
+class HttpResponseTooManyRequests(HttpResponse):
+    status_code = 429
+
+
 class HttpResponseNotImplemented(HttpResponse):
     status_code = 501
 
@@ -63,5 +67,6 @@ HttpNotFound = HttpResponseNotFound
 HttpMethodNotAllowed = HttpResponseNotAllowed
 HttpConflict = HttpResponseConflict
 HttpGone = HttpResponseGone
+HttpTooManyRequests = HttpResponseTooManyRequests
 HttpApplicationError = HttpResponseServerError
 HttpNotImplemented = HttpResponseNotImplemented
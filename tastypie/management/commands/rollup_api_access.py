@@ -0,0 +1,194 @@
+import time
+from optparse import make_option
+from django.conf import settings
+from django.core.management.base import NoArgsCommand
+from django.core.urlresolvers import resolve, Resolver404
+from django.db import transaction
+from django.db.models import Count, F, Max, Min
+from tastypie.models import ApiAccess, ApiAccessRollup
+
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+class Command(NoArgsCommand):
+    help = "Rolls up ApiAccess records into hourly counts & prunes old records."
+    option_list = NoArgsCommand.option_list + (
+        make_option('--keep-days', action='store', type='int', dest='keep_days', default=None,
+            help='Delete ApiAccess records older than this many days, once rolled up. Defaults to settings.TASTYPIE_API_ACCESS_RETENTION_DAYS (or keeping them all).'),
+        make_option('--delay', action='store', type='int', dest='delay', default=300,
+            help='How long (in seconds) to wait after an hour ends before rolling it up, for accesses still being written. Defaults to 300.'),
+    )
+    # The most rows to write per ``bulk_create``.
+    batch_size = 100
+
+    def handle_noargs(self, **options):
+        """Rolls up ApiAccess records into hourly counts & prunes old records."""
+        self.verbosity = int(options.get('verbosity', 1))
+        self.resources = {}
+        keep_days = options.get('keep_days')
+        delay = options.get('delay')
+
+        if keep_days is None:
+            keep_days = getattr(settings, 'TASTYPIE_API_ACCESS_RETENTION_DAYS', None)
+
+        if delay is None:
+            delay = 300
+
+        now = int(time.time())
+        # Only whole hours that ended at least ``delay`` seconds ago.
+        end = now - int(delay)
+        end -= end % HOUR
+        # Only accesses written by now are counted. Any written later (even
+        # for hours already rolled up) are picked up by the next run.
+        high = ApiAccess.objects.aggregate(high=Max('id'))['high'] or 0
+        hours = self.rollup(end, high)
+
+        if self.verbosity >= 1:
+            print u"Rolled up %d hour(s) of accesses." % hours
+
+        if keep_days is not None:
+            # Never prune accesses that haven't been rolled up.
+            pruned = self.prune(min(now - int(keep_days) * DAY, end), high)
+
+            if self.verbosity >= 1:
+                print u"Pruned %d access(es)." % pruned
+
+    def rollup(self, end, high):
+        """
+        Rolls up the accesses (up to the ``high`` id) in every hour that
+        follows the last one rolled up & ends by ``end``, plus any written
+        late for hours already rolled up. Returns the number of hours rolled
+        up.
+        """
+        latest = ApiAccessRollup.objects.aggregate(hour=Max('hour'), last_access_id=Max('last_access_id'))
+
+        if latest['hour'] is None:
+            start = 0
+        else:
+            start = latest['hour'] + HOUR
+
+        # Accesses written after the last run (i.e. buffered writes retried
+        # after an outage) for hours it already rolled up.
+        late = ApiAccess.objects.filter(id__gt=latest['last_access_id'] or 0, id__lte=high, accessed__lt=start)
+        accesses = ApiAccess.objects.filter(id__lte=high, accessed__gte=start, accessed__lt=end)
+        hours = 0
+
+        for queryset in (late, accesses):
+            for hour in self.get_hours(queryset):
+                self.rollup_hour(hour, queryset.filter(accessed__gte=hour, accessed__lt=hour + HOUR), high)
+                hours += 1
+
+        return hours
+
+    def get_hours(self, accesses):
+        """
+        Yields the start of each hour with any of the ``accesses``, in order.
+        """
+        start = 0
+
+        while True:
+            # Skip straight to the next hour with any accesses.
+            first = accesses.filter(accessed__gte=start).aggregate(first=Min('accessed'))['first']
+
+            if first is None:
+                return
+
+            hour = first - first % HOUR
+            yield hour
+            start = hour + HOUR
+
+    def rollup_hour(self, hour, accesses, high):
+        """
+        Counts the ``accesses`` in the hour starting at ``hour`` by
+        identifier, resource & method & adds the counts to those already
+        saved for the hour (if any), recording the ``high`` id counted up to.
+        """
+        counts = {}
+
+        for row in accesses.values('identifier', 'url', 'request_method').annotate(count=Count('id')):
+            key = (row['identifier'], self.get_resource(row['url']), row['request_method'])
+            counts[key] = counts.get(key, 0) + row['count']
+
+        existing = {}
+
+        for rollup in ApiAccessRollup.objects.filter(hour=hour):
+            existing[(rollup.identifier, rollup.resource, rollup.request_method)] = rollup
+
+        rollups = []
+
+        for (identifier, resource, request_method), count in sorted(counts.items()):
+            rollup = existing.get((identifier, resource, request_method))
+
+            if rollup is not None:
+                ApiAccessRollup.objects.filter(pk=rollup.pk).update(count=F('count') + count, last_access_id=high)
+            else:
+                rollups.append(ApiAccessRollup(identifier=identifier, hour=hour, resource=resource, request_method=request_method, count=count, last_access_id=high))
+
+        if not hasattr(ApiAccessRollup.objects, 'bulk_create'):
+            # Django 1.3.
+            for rollup in rollups:
+                rollup.save()
+
+            return
+
+        for offset in range(0, len(rollups), self.batch_size):
+            ApiAccessRollup.objects.bulk_create(rollups[offset:offset + self.batch_size])
+
+    rollup_hour = transaction.commit_on_success(rollup_hour)
+
+    def get_resource(self, url):
+        """
+        Works out which resource was requested from the URL of an access.
+
+        This is the ``resource_name`` (prefixed with the ``api_name``, if
+        any) for URLs that resolve to a ``Resource``, otherwise the path.
+        """
+        path = url.split('?', 1)[0]
+
+        if path not in self.resources:
+            resource = path
+
+            try:
+                match = resolve(path)
+                resource_name = match.kwargs.get('resource_name')
+
+                if resource_name:
+                    resource = resource_name
+
+                    if match.kwargs.get('api_name'):
+                        resource = u"%s/%s" % (match.kwargs['api_name'], resource_name)
+            except Resolver404:
+                pass
+
+            self.resources[path] = resource[:255]
+
+        return self.resources[path]
+
+    def prune(self, cutoff, high):
+        """
+        Deletes the accesses before ``cutoff`` (that have been rolled up, so
+        below the ``high`` id), a day at a time. Returns the number deleted.
+
+        The newest access is always kept, since some databases (SQLite &
+        MySQL before 8.0, after a restart) would reuse its id, which would
+        then look already counted.
+        """
+        accesses = ApiAccess.objects.filter(id__lt=high, accessed__lt=cutoff)
+        pruned = 0
+
+        while True:
+            first = accesses.aggregate(first=Min('accessed'))['first']
+
+            if first is None:
+                return pruned
+
+            pruned += self.prune_range(accesses.filter(accessed__gte=first, accessed__lt=min(first + DAY, cutoff)))
+
+    def prune_range(self, accesses):
+        count = accesses.count()
+        accesses.delete()
+        return count
+
+    prune_range = transaction.commit_on_success(prune_range)
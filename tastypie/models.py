@@ -14,10 +14,10 @@ except ImportError:
 
 class ApiAccess(models.Model):
     """A simple model for use with the ``CacheDBThrottle`` behaviors."""
-    identifier = models.CharField(max_length=255)
+    identifier = models.CharField(max_length=255, db_index=True)
     url = models.CharField(max_length=255, blank=True, default='')
     request_method = models.CharField(max_length=10, blank=True, default='')
-    accessed = models.PositiveIntegerField()
+    accessed = models.PositiveIntegerField(db_index=True)
     
     def __unicode__(self):
         return u"%s @ %s" % (self.identifer, self.accessed)
@@ -27,6 +27,31 @@ class ApiAccess(models.Model):
         return super(ApiAccess, self).save(*args, **kwargs)
 
 
+class ApiAccessRollup(models.Model):
+    """
+    The number of ``ApiAccess`` records for an identifier, resource & method
+    in an hour. Built by the ``rollup_api_access`` management command.
+    """
+    identifier = models.CharField(max_length=255)
+    # The start of the hour, in seconds since the epoch (like
+    # ``ApiAccess.accessed``).
+    hour = models.PositiveIntegerField(db_index=True)
+    resource = models.CharField(max_length=255, blank=True, default='')
+    request_method = models.CharField(max_length=10, blank=True, default='')
+    count = models.PositiveIntegerField(default=0)
+    # The highest ``ApiAccess`` id counted so far, so accesses written late
+    # (& only those) get added on the next run.
+    last_access_id = models.PositiveIntegerField(default=0, db_index=True)
+    
+    class Meta:
+        # Leads with ``identifier`` & ``hour``, so it also serves as the
+        # index for usage over time per identifier.
+        unique_together = (('identifier', 'hour', 'resource', 'request_method'),)
+    
+    def __unicode__(self):
+        return u"%s @ %s: %s" % (self.identifier, self.hour, self.count)
+
+
 if 'django.contrib.auth' in settings.INSTALLED_APPS:
     import uuid
     from django.conf import settings
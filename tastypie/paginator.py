@@ -1,7 +1,163 @@
+import base64
+import re
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.db.models.fields import FieldDoesNotExist
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.utils import simplejson
+from tastypie.cache import SimpleCache
 from tastypie.exceptions import BadRequest
 from urllib import urlencode
 
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import md5
+
+
+class ExactCount(object):
+    """
+    A count strategy that always runs a full ``COUNT(*)``.
+
+    This is the default & the base class for the other count strategies,
+    which are handed to the ``Paginator`` as ``count_strategy`` (or to a
+    ``Resource`` as ``Meta.count_strategy``).
+    """
+    def get_count(self, paginator):
+        """
+        Returns a tuple of the ``total_count`` for the paginator's objects
+        and whether that count is exact.
+
+        A count of ``None`` means no count is available, in which case the
+        ``Paginator`` checks for a next page by fetching one extra object.
+        """
+        return paginator.get_count(), True
+
+
+class SkippedCount(ExactCount):
+    """
+    A count strategy that never counts.
+
+    The ``total_count`` is ``None`` & a next page is detected by fetching
+    ``limit + 1`` objects, which is far cheaper than a ``COUNT(*)`` on large
+    tables.
+    """
+    def get_count(self, paginator):
+        return None, False
+
+
+class CachedCount(ExactCount):
+    """
+    A count strategy that caches the ``COUNT(*)`` for each distinct query.
+
+    The cache key is built from the SQL of the (unordered) ``QuerySet``, so
+    every combination of filters (including any authorization limits) gets
+    its own count. Cached counts may be up to ``timeout`` seconds stale, so
+    they're never reported as exact (even when just counted), so the same
+    count always reports the same way.
+
+    Optionally accepts a ``timeout`` in seconds (defaults to ``300``) and a
+    ``cache`` (defaults to ``SimpleCache()``).
+    """
+    def __init__(self, timeout=300, cache=None):
+        self.timeout = timeout
+
+        if cache is None:
+            cache = SimpleCache()
+
+        self.cache = cache
+
+    def get_cache_key(self, objects):
+        """
+        Builds the cache key for the provided ``QuerySet``.
+        """
+        query = objects.order_by().query.get_compiler(using=objects.db).as_sql()
+        return 'tastypie:count:%s:%s' % (objects.db, md5(repr(query)).hexdigest())
+
+    def get_count(self, paginator):
+        objects = paginator.objects
+
+        if not hasattr(objects, 'query'):
+            return super(CachedCount, self).get_count(paginator)
+
+        try:
+            cache_key = self.get_cache_key(objects)
+        except EmptyResultSet:
+            # The query can't match anything (i.e. ``pk__in=[]``).
+            return 0, True
+
+        count = self.cache.get(cache_key)
+
+        if count is None:
+            count = paginator.get_count()
+            self.cache.set(cache_key, count, self.timeout)
+
+        return count, False
+
+
+class EstimatedCount(ExactCount):
+    """
+    A count strategy that uses the database planner's row estimate.
+
+    Runs an ``EXPLAIN`` (PostgreSQL & MySQL only) rather than a ``COUNT(*)``.
+    Estimates below ``threshold`` (defaults to ``1000``) are replaced with an
+    exact count, since those are cheap & estimates are least accurate for
+    small result sets. Other databases always get an exact count.
+    """
+    def __init__(self, threshold=1000):
+        self.threshold = threshold
+
+    def get_estimate(self, objects):
+        """
+        Returns the planner's estimated number of rows for the provided
+        ``QuerySet`` or ``None`` if no estimate is available.
+        """
+        if not hasattr(objects, 'query'):
+            return None
+
+        connection = connections[objects.db]
+        vendor = getattr(connection, 'vendor', None)
+
+        if not vendor in ('postgresql', 'mysql'):
+            return None
+
+        try:
+            sql, params = objects.order_by().query.get_compiler(using=objects.db).as_sql()
+        except EmptyResultSet:
+            return 0
+
+        cursor = connection.cursor()
+        cursor.execute('EXPLAIN %s' % sql, params)
+        row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        if vendor == 'postgresql':
+            match = re.search(r'rows=(\d+)', row[0])
+
+            if match is None:
+                return None
+
+            return int(match.group(1))
+
+        columns = [column[0] for column in cursor.description]
+
+        if not 'rows' in columns or row[columns.index('rows')] is None:
+            return None
+
+        return int(row[columns.index('rows')])
+
+    def get_count(self, paginator):
+        estimate = self.get_estimate(paginator.objects)
+
+        if estimate is None or estimate < self.threshold:
+            return super(EstimatedCount, self).get_count(paginator)
+
+        return estimate, False
+
 
 class Paginator(object):
     """
@@ -15,7 +171,9 @@ class Paginator(object):
     ``total_count`` of resources seen and convenience links to the
     ``previous``/``next`` pages of data as available.
     """
-    def __init__(self, request_data, objects, resource_uri=None, limit=None, offset=0, max_limit=1000, collection_name='objects'):
+    count_param = 'count'
+
+    def __init__(self, request_data, objects, resource_uri=None, limit=None, offset=0, max_limit=1000, collection_name='objects', count_strategy=None):
         """
         Instantiates the ``Paginator`` and allows for some configuration.
 
@@ -36,7 +194,13 @@ class Paginator(object):
         Optionally accepts a ``max_limit`` argument, which the upper bound
         limit. Defaults to ``1000``. If you set it to 0 or ``None``, no upper
         bound will be enforced.
+
+        Optionally accepts a ``count_strategy``, which determines how the
+        ``total_count`` is found. Defaults to ``ExactCount()``.
         """
+        if count_strategy is None:
+            count_strategy = ExactCount()
+
         self.request_data = request_data
         self.objects = objects
         self.limit = limit
@@ -44,6 +208,7 @@ class Paginator(object):
         self.offset = offset
         self.resource_uri = resource_uri
         self.collection_name = collection_name
+        self.count_strategy = count_strategy
 
     def get_limit(self):
         """
@@ -123,6 +288,19 @@ class Paginator(object):
             # If it's not a QuerySet (or it's ilk), fallback to ``len``.
             return len(self.objects)
 
+    def get_total_count(self):
+        """
+        Returns a tuple of the ``total_count`` & whether it's exact, as
+        determined by the ``count_strategy``.
+
+        The client can skip the count altogether by passing ``count=false``
+        in the GET parameters, in which case the count is ``None``.
+        """
+        if self.request_data.get(self.count_param) in ('false', 'False', '0'):
+            return None, False
+
+        return self.count_strategy.get_count(self)
+
     def get_previous(self, limit, offset):
         """
         If a previous page is available, will generate a URL to request that
@@ -163,17 +341,265 @@ class Paginator(object):
         """
         limit = self.get_limit()
         offset = self.get_offset()
-        count = self.get_count()
-        objects = self.get_slice(limit, offset)
+        count, exact = self.get_total_count()
         meta = {
             'offset': offset,
             'limit': limit,
             'total_count': count,
         }
 
+        if not exact:
+            meta['total_count_exact'] = False
+
+        if count is None and limit:
+            # No count to compare against, so fetch one extra to see if
+            # there's a next page.
+            objects = list(self.get_slice(limit + 1, offset))
+            has_next = len(objects) > limit
+            objects = objects[:limit]
+        else:
+            objects = self.get_slice(limit, offset)
+
         if limit:
             meta['previous'] = self.get_previous(limit, offset)
-            meta['next'] = self.get_next(limit, offset, count)
+
+            if count is None:
+                meta['next'] = None
+
+                if has_next:
+                    meta['next'] = self._generate_uri(limit, offset + limit)
+            else:
+                meta['next'] = self.get_next(limit, offset, count)
+
+        return {
+            self.collection_name: objects,
+            'meta': meta,
+        }
+
+
+class CursorPaginator(Paginator):
+    """
+    Limits result sets using keyset ("cursor") pagination.
+
+    Slicing with an ``offset`` makes the database walk (& throw away) every
+    row before the requested page, so deep pages get progressively slower.
+    Instead, this filters on the ordering values of the last object the
+    client saw, so every page costs about the same as the first one.
+
+    The ordering comes from the ``QuerySet`` itself (an ``order_by`` on
+    ``Meta.queryset`` or the model's ``Meta.ordering``), with the primary key
+    added as a tiebreaker. The position is handed to the client as an opaque
+    ``cursor`` parameter in the ``previous``/``next`` links.
+
+    Falls back to the regular ``limit``/``offset`` behavior when the client
+    supplies its own ``order_by`` or an ``offset``, or when the objects can't
+    be paginated by key (not a ``QuerySet``, ordered on related or nullable
+    fields, no ``limit``, etc.).
+    """
+    cursor_param = 'cursor'
+    fallback_params = ('offset', 'order_by', 'sort_by')
+
+    def get_ordering(self):
+        """
+        Determines the fields the objects are ordered on.
+
+        Returns a list of ``(model_field, descending)`` pairs ending in the
+        primary key, or ``None`` if the objects can't be paginated by key.
+        """
+        query = getattr(self.objects, 'query', None)
+
+        if query is None or not hasattr(self.objects, 'model') or getattr(query, 'extra_order_by', None):
+            return None
+
+        opts = self.objects.model._meta
+
+        if query.order_by:
+            order_by = list(query.order_by)
+        elif query.default_ordering:
+            order_by = list(opts.ordering)
+        else:
+            order_by = []
+
+        ordering = []
+        seen = set()
+
+        for lookup in order_by:
+            if not isinstance(lookup, basestring) or lookup == '?':
+                return None
+
+            descending = lookup.startswith('-')
+            field_name = lookup.lstrip('-')
+
+            if field_name == 'pk':
+                field_name = opts.pk.name
+
+            try:
+                field = opts.get_field(field_name)
+            except FieldDoesNotExist:
+                # Related lookups (``author__username``) & the like.
+                return None
+
+            if field.rel is not None or field.null:
+                # Ordering on a relation uses the related model's ordering
+                # & ``NULL`` can't be compared against, so neither can be
+                # turned into a keyset filter.
+                return None
+
+            if field.name in seen:
+                continue
+
+            seen.add(field.name)
+            ordering.append((field, descending))
+
+            if field.primary_key or field.unique:
+                # A unique field already gives a total ordering.
+                return ordering
+
+        ordering.append((opts.pk, False))
+        return ordering
+
+    def get_cursor(self, ordering):
+        """
+        Decodes the user-provided ``cursor`` from the GET parameters, if
+        specified.
+
+        Returns a tuple of ``(backwards, values)`` or ``None`` if no cursor
+        was provided.
+        """
+        cursor = self.request_data.get(self.cursor_param)
+
+        if not cursor:
+            return None
+
+        try:
+            data = simplejson.loads(base64.urlsafe_b64decode(str(cursor)))
+            backwards = bool(data['b'])
+            raw_values = data['v']
+
+            if len(raw_values) != len(ordering):
+                raise ValueError
+
+            values = [field.to_python(value) for (field, descending), value in zip(ordering, raw_values)]
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeError):
+            raise BadRequest("Invalid cursor '%s' provided." % cursor)
+
+        return backwards, values
+
+    def encode_cursor(self, obj, ordering, backwards=False):
+        """
+        Builds the opaque cursor pointing just past (or, if ``backwards``,
+        just before) the provided object.
+        """
+        values = [field.value_to_string(obj) for field, descending in ordering]
+        data = simplejson.dumps({'b': int(backwards), 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data)
+
+    def get_keyset_filter(self, ordering, values, backwards=False):
+        """
+        Builds the ``Q`` object selecting everything after (or, if
+        ``backwards``, before) the provided ordering values.
+        """
+        keyset_filter = None
+
+        for index, (field, descending) in enumerate(ordering):
+            lookup = 'gt'
+
+            if descending != backwards:
+                lookup = 'lt'
+
+            clause = Q(**{'%s__%s' % (field.name, lookup): values[index]})
+
+            for (previous_field, previous_descending), value in zip(ordering[:index], values[:index]):
+                clause &= Q(**{previous_field.name: value})
+
+            if keyset_filter is None:
+                keyset_filter = clause
+            else:
+                keyset_filter |= clause
+
+        return keyset_filter
+
+    def get_cursor_slice(self, limit, ordering, cursor):
+        """
+        Fetches the page of objects starting at the provided ``cursor``.
+
+        Returns a tuple of the objects (in their regular order) & whether
+        more objects are available past the page in the direction traveled.
+        """
+        objects = self.objects.order_by(*[
+            '%s%s' % (descending and '-' or '', field.name) for field, descending in ordering
+        ])
+        backwards = False
+
+        if cursor is not None:
+            backwards, values = cursor
+            objects = objects.filter(self.get_keyset_filter(ordering, values, backwards))
+
+        if backwards:
+            objects = objects.reverse()
+
+        # Fetch one extra to see if there's anything past this page, rather
+        # than running a second query.
+        page = list(objects[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        if backwards:
+            page.reverse()
+
+        return page, has_more
+
+    def _generate_cursor_uri(self, limit, cursor):
+        if self.resource_uri is None:
+            return None
+
+        request_params = dict([k, v.encode('utf-8')] for k, v in self.request_data.items())
+        request_params.pop('offset', None)
+        request_params.update({'limit': limit, self.cursor_param: cursor})
+        return '%s?%s' % (
+            self.resource_uri,
+            urlencode(request_params)
+        )
+
+    def page(self):
+        """
+        Generates all pertinent data about the requested page.
+
+        Handles getting the correct ``limit`` & ``cursor``, then fetches the
+        correct set of results and returns all pertinent metadata.
+        """
+        for param in self.fallback_params:
+            if param in self.request_data:
+                return super(CursorPaginator, self).page()
+
+        limit = self.get_limit()
+        ordering = self.get_ordering()
+
+        if not limit or ordering is None:
+            return super(CursorPaginator, self).page()
+
+        cursor = self.get_cursor(ordering)
+        objects, has_more = self.get_cursor_slice(limit, ordering, cursor)
+        backwards = cursor is not None and cursor[0]
+        count, exact = self.get_total_count()
+        meta = {
+            'limit': limit,
+            'total_count': count,
+            'previous': None,
+            'next': None,
+        }
+
+        if not exact:
+            meta['total_count_exact'] = False
+
+        if objects:
+            # Coming from a cursor means there's something on the far side
+            # of it; otherwise, ``has_more`` tells us.
+            if (backwards and has_more) or (not backwards and cursor is not None):
+                meta['previous'] = self._generate_cursor_uri(limit, self.encode_cursor(objects[0], ordering, backwards=True))
+
+            if backwards or has_more:
+                meta['next'] = self._generate_cursor_uri(limit, self.encode_cursor(objects[-1], ordering))
 
         return {
             self.collection_name: objects,
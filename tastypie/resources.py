@@ -1,14 +1,23 @@
+import itertools
 import logging
+import math
+import re
+import uuid
 import warnings
 import django
 from django.conf import settings
 from django.conf.urls.defaults import patterns, include, url
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned, ValidationError
-from django.core.urlresolvers import NoReverseMatch, reverse, resolve, Resolver404, get_script_prefix
+from django.core.urlresolvers import NoReverseMatch, reverse, resolve, Resolver404, get_resolver, get_script_prefix, get_urlconf
 from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.db.models.fields import FieldDoesNotExist
 from django.db.models.sql.constants import QUERY_TERMS, LOOKUP_SEP
 from django.http import HttpResponse, HttpResponseNotFound, Http404
 from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, parse_etags, quote_etag
+from django.utils.encoding import force_unicode, iri_to_uri
 from tastypie.authentication import Authentication
 from tastypie.authorization import ReadOnlyAuthorization
 from tastypie.bundle import Bundle
@@ -20,9 +29,23 @@ from tastypie import http
 from tastypie.paginator import Paginator
 from tastypie.serializers import Serializer
 from tastypie.throttle import BaseThrottle
-from tastypie.utils import is_valid_jsonp_callback_value, dict_strip_unicode_keys, trailing_slash
+from tastypie.utils import is_valid_jsonp_callback_value, dict_strip_unicode_keys, trailing_slash, datetime_to_timestamp
 from tastypie.utils.mime import determine_format, build_content_type
 from tastypie.validation import Validation
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    # Django < 1.5 streams any ``HttpResponse`` built from an iterator.
+    StreamingHttpResponse = HttpResponse
+try:
+    from django.db.models.query import prefetch_related_objects
+except ImportError:
+    # Django < 1.4 has no ``prefetch_related``.
+    prefetch_related_objects = None
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import md5
 try:
     set
 except NameError:
@@ -46,6 +69,31 @@ class NOT_AVAILABLE:
         return 'No such data is available.'
 
 
+# Reversed in place of a real value when compiling URI templates. Any URL
+# pattern that accepts this should accept values matching
+# ``URI_TEMPLATE_SAFE_VALUE`` just the same.
+URI_TEMPLATE_SENTINEL = 'Tastypie0-uri_template'
+URI_TEMPLATE_SAFE_VALUE = re.compile(r'^\w[\w-]*$', re.UNICODE)
+
+# Cache keys longer than this (leaving room for Django's ``KEY_PREFIX`` &
+# version under memcached's 250 character limit) or with characters outside
+# of ``CACHE_KEY_SAFE_VALUE`` are hashed.
+MAX_CACHE_KEY_LENGTH = 200
+CACHE_KEY_SAFE_VALUE = re.compile(r'^[\x21-\x7e]*$')
+
+# How long a cache generation token is kept. Losing one early only means
+# the cached list responses are rebuilt.
+CACHE_GENERATION_TIMEOUT = 60 * 60 * 24
+
+# Per-process registries for the dependency signals (see
+# ``ModelResource.connect_dependency_signals``): the resource classes still
+# to connect, the resource classes depending on each model & the
+# ``ForeignKey`` attnames of each model that memberships depend on.
+_pending_dependency_resources = []
+_dependent_resources = {}
+_dependency_links = {}
+
+
 class ResourceOptions(object):
     """
     A configuration class for ``Resource``.
@@ -58,8 +106,12 @@ class ResourceOptions(object):
     authorization = ReadOnlyAuthorization()
     cache = NoCache()
     throttle = BaseThrottle()
+    ip_throttle = None
+    ip_throttle_header = None
+    concurrency_throttle = None
     validation = Validation()
     paginator_class = Paginator
+    count_strategy = None
     allowed_methods = ['get', 'post', 'put', 'delete', 'patch']
     list_allowed_methods = None
     detail_allowed_methods = None
@@ -79,6 +131,17 @@ class ResourceOptions(object):
     include_absolute_url = False
     always_return_data = False
     collection_name = 'objects'
+    stream_list = False
+    stream_chunk_size = 100
+    last_modified_attribute = None
+    version_attribute = None
+    list_validators = False
+    cache_list = False
+    cache_detail = False
+    cache_fragments = False
+    plan_related_queries = True
+    throttle_by_cost = False
+    throttle_method_costs = {}
 
     def __new__(cls, meta=None):
         overrides = {}
@@ -101,9 +164,53 @@ class ResourceOptions(object):
         return object.__new__(type('ResourceOptions', (cls,), overrides))
 
 
+class ResourceFields(dict):
+    """
+    The ``base_fields`` of a ``Resource`` class & the ``fields`` of each
+    instance (copied from them).
+
+    Holds on to the resource's compiled dehydrate plan (see
+    ``Resource.get_dehydrate_plan``), which is thrown away whenever a field
+    is added, removed or replaced.
+    """
+    dehydrate_plan = None
+
+    def __setitem__(self, key, value):
+        self.dehydrate_plan = None
+        super(ResourceFields, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.dehydrate_plan = None
+        super(ResourceFields, self).__delitem__(key)
+
+    def clear(self):
+        self.dehydrate_plan = None
+        super(ResourceFields, self).clear()
+
+    def pop(self, *args):
+        self.dehydrate_plan = None
+        return super(ResourceFields, self).pop(*args)
+
+    def popitem(self):
+        self.dehydrate_plan = None
+        return super(ResourceFields, self).popitem()
+
+    def setdefault(self, key, default=None):
+        self.dehydrate_plan = None
+        return super(ResourceFields, self).setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self.dehydrate_plan = None
+        super(ResourceFields, self).update(*args, **kwargs)
+
+    def __getstate__(self):
+        # The plan is bound to the resource, so copies start without one.
+        return {}
+
+
 class DeclarativeMetaclass(type):
     def __new__(cls, name, bases, attrs):
-        attrs['base_fields'] = {}
+        attrs['base_fields'] = ResourceFields()
         declared_fields = {}
 
         # Inherit any fields from parent(s).
@@ -275,6 +382,74 @@ class Resource(object):
         """
         return reverse(name, args=args, kwargs=kwargs)
 
+    def _build_uri_template(self, name, kwargs, placeholder):
+        """
+        Reverses ``name`` once, with a sentinel standing in for the
+        ``placeholder`` kwarg, & returns a template the real value can be
+        interpolated into.
+
+        Returns ``None`` if the URL can't be templated (the sentinel was
+        rejected by the URLconf or shows up more than once).
+        """
+        template_kwargs = kwargs.copy()
+        template_kwargs[placeholder] = URI_TEMPLATE_SENTINEL
+
+        try:
+            url = self._build_reverse_url(name, kwargs=template_kwargs)
+        except NoReverseMatch:
+            return None
+
+        if url.count(URI_TEMPLATE_SENTINEL) != 1:
+            return None
+
+        return url.replace('%', '%%').replace(URI_TEMPLATE_SENTINEL, '%s')
+
+    def _build_templated_url(self, name, kwargs, placeholder=None):
+        """
+        A cached version of ``_build_reverse_url``.
+
+        The URL is only reversed once per name/kwargs/namespace (and URLconf
+        or script prefix, should they change). If a ``placeholder`` kwarg is
+        given, its value is left out of the cache key & interpolated into
+        a compiled template instead, so that building the URL for each
+        object doesn't cost a ``reverse``.
+        """
+        cache = self.__class__.__dict__.get('_uri_templates')
+
+        if cache is None:
+            cache = self.__class__._uri_templates = {}
+
+        value = None
+        static_kwargs = kwargs
+
+        if placeholder is not None:
+            static_kwargs = kwargs.copy()
+            value = force_unicode(static_kwargs.pop(placeholder))
+
+            if not URI_TEMPLATE_SAFE_VALUE.match(value):
+                # Can't vouch for how the URLconf would treat it.
+                return self._build_reverse_url(name, kwargs=kwargs)
+
+        cache_key = (name, placeholder, self._meta.urlconf_namespace, tuple(sorted(static_kwargs.items())), get_resolver(get_urlconf()), get_script_prefix())
+
+        try:
+            template = cache[cache_key]
+        except KeyError:
+            if placeholder is None:
+                template = self._build_reverse_url(name, kwargs=kwargs)
+            else:
+                template = self._build_uri_template(name, static_kwargs, placeholder)
+
+            cache[cache_key] = template
+
+        if placeholder is None:
+            return template
+
+        if template is None:
+            return self._build_reverse_url(name, kwargs=kwargs)
+
+        return template % iri_to_uri(value)
+
     def base_urls(self):
         """
         The standard URLs this ``Resource`` should respond to.
@@ -325,6 +500,24 @@ class Resource(object):
 
         Mostly a hook, this uses the ``Serializer`` from ``Resource._meta``.
         """
+        options = self.get_serialize_options(request, format, options)
+        return self._meta.serializer.serialize(data, format, options)
+
+    def serialize_stream(self, request, data, format, options=None):
+        """
+        Given a request, data and a desired format, produces an iterable of
+        chunks of the serialized data, suitable for a streaming response.
+
+        Mostly a hook, this uses the ``Serializer`` from ``Resource._meta``.
+        """
+        options = self.get_serialize_options(request, format, options)
+        return self._meta.serializer.serialize_stream(data, format, options)
+
+    def get_serialize_options(self, request, format, options=None):
+        """
+        Builds the options handed to the ``Serializer``, such as the JSONP
+        callback name.
+        """
         options = options or {}
 
         if 'text/javascript' in format:
@@ -336,7 +529,7 @@ class Resource(object):
 
             options['callback'] = callback
 
-        return self._meta.serializer.serialize(data, format, options)
+        return options
 
     def deserialize(self, request, data, format='application/json'):
         """
@@ -422,23 +615,40 @@ class Resource(object):
         if method is None:
             raise ImmediateHttpResponse(response=http.HttpNotImplemented())
 
+        self.ip_throttle_check(request)
         self.is_authenticated(request)
         self.is_authorized(request)
-        self.throttle_check(request)
+        custom_throttle_hooks = self.has_custom_throttle_hooks()
+        throttle_status = None
+
+        # Claimed first, so requests turned away here aren't charged to the
+        # user's throttle.
+        slot = self.acquire_concurrency_slot(request)
+
+        try:
+            if custom_throttle_hooks:
+                self.throttle_check(request)
+            else:
+                throttle_status = self.consume_throttle(request, request_type, **kwargs)
 
-        # All clear. Process the request.
-        request = convert_post_to_put(request)
-        response = method(request, **kwargs)
+            # All clear. Process the request.
+            request = convert_post_to_put(request)
+            response = method(request, **kwargs)
+            slot = self.release_concurrency_slot_on_close(response, slot)
+        finally:
+            self.release_concurrency_slot(slot)
 
-        # Add the throttled request.
-        self.log_throttled_access(request)
+        if custom_throttle_hooks:
+            # Add the throttled request.
+            self.log_throttled_access(request)
 
         # If what comes back isn't a ``HttpResponse``, assume that the
         # request was accepted and that some action occurred. This also
         # prevents Django from freaking out.
         if not isinstance(response, HttpResponse):
-            return http.HttpNoContent()
+            response = http.HttpNoContent()
 
+        self.add_throttle_headers(response, throttle_status)
         return response
 
     def remove_api_resource_names(self, url_dict):
@@ -529,6 +739,102 @@ class Resource(object):
         if not auth_result is True:
             raise ImmediateHttpResponse(response=http.HttpUnauthorized())
 
+    def ip_throttle_check(self, request):
+        """
+        Handles throttling by IP address, before the user is authenticated.
+
+        Does nothing unless ``Meta.ip_throttle`` is set. Requests over its
+        limit are rejected without authenticating them (so without touching
+        the database).
+        """
+        if self._meta.ip_throttle is None:
+            return
+
+        identifier = "ip_%s" % self.get_client_ip(request)
+        status = {}
+
+        if self._meta.ip_throttle.consume(identifier, url=request.get_full_path(), request_method=request.method.lower(), resource_name=self._meta.resource_name, status=status):
+            # Throttle limit exceeded.
+            raise ImmediateHttpResponse(response=self.create_throttled_response(request, status))
+
+    def get_client_ip(self, request):
+        """
+        Returns the client's IP address, for ``ip_throttle_check``.
+
+        This is ``REMOTE_ADDR`` or, if ``Meta.ip_throttle_header`` is set
+        (i.e. to ``HTTP_X_FORWARDED_FOR``) & present, the last address in
+        that header (the one your proxy added).
+        """
+        header = self._meta.ip_throttle_header
+
+        if header and request.META.get(header):
+            addresses = [address.strip() for address in request.META[header].split(',') if address.strip()]
+
+            if addresses:
+                return addresses[-1]
+
+        return request.META.get('REMOTE_ADDR', 'noaddr')
+
+    def acquire_concurrency_slot(self, request):
+        """
+        Claims one of the user's in-flight request slots, from the class
+        assigned to ``concurrency_throttle`` in ``Resource._meta`` (if any).
+
+        Raises an ``ImmediateHttpResponse`` (429) if none came free. Returns
+        what ``release_concurrency_slot`` needs to give it back.
+        """
+        if self._meta.concurrency_throttle is None:
+            return None
+
+        identifier = self._meta.authentication.get_identifier(request)
+        kwargs = {
+            'resource_name': self._meta.resource_name,
+            'request_method': request.method.lower(),
+        }
+
+        if not self._meta.concurrency_throttle.acquire(identifier, **kwargs):
+            raise ImmediateHttpResponse(response=self.create_throttled_response(request))
+
+        return (identifier, kwargs)
+
+    def release_concurrency_slot(self, slot):
+        """
+        Gives back a slot claimed by ``acquire_concurrency_slot`` once the
+        request has been handled.
+        """
+        if slot is None:
+            return
+
+        identifier, kwargs = slot
+        self._meta.concurrency_throttle.release(identifier, **kwargs)
+
+    def release_concurrency_slot_on_close(self, response, slot):
+        """
+        Hands a slot claimed by ``acquire_concurrency_slot`` over to a
+        streaming ``response``, which gives it back once it has been written
+        out & closed, since that's when the work is actually done.
+
+        Returns ``None`` if it did, or the ``slot`` (for the caller to
+        release) if the response isn't streamed.
+        """
+        if slot is None:
+            return None
+
+        def release():
+            self.release_concurrency_slot(slot)
+
+        if getattr(response, 'streaming', False):
+            response.streaming_content = ClosingIterator(response.streaming_content, release)
+            return None
+
+        # Before Django 1.5, any ``HttpResponse`` built from an iterator is
+        # streamed. Django 1.3 flags those with ``_is_string = False``.
+        if getattr(response, '_base_content_is_iter', False) or getattr(response, '_is_string', True) is False:
+            response._container = ClosingIterator(response._container, release)
+            return None
+
+        return slot
+
     def throttle_check(self, request):
         """
         Handles checking if the user should be throttled.
@@ -537,11 +843,12 @@ class Resource(object):
         ``Resource._meta``.
         """
         identifier = self._meta.authentication.get_identifier(request)
+        request_method = request.method.lower()
 
         # Check to see if they should be throttled.
-        if self._meta.throttle.should_be_throttled(identifier):
+        if self._meta.throttle.should_be_throttled(identifier, resource_name=self._meta.resource_name, request_method=request_method):
             # Throttle limit exceeded.
-            raise ImmediateHttpResponse(response=http.HttpForbidden())
+            raise ImmediateHttpResponse(response=self.create_throttled_response(request))
 
     def log_throttled_access(self, request):
         """
@@ -551,7 +858,109 @@ class Resource(object):
         ``Resource._meta``.
         """
         request_method = request.method.lower()
-        self._meta.throttle.accessed(self._meta.authentication.get_identifier(request), url=request.get_full_path(), request_method=request_method)
+        self._meta.throttle.accessed(self._meta.authentication.get_identifier(request), url=request.get_full_path(), request_method=request_method, resource_name=self._meta.resource_name)
+
+    def consume_throttle(self, request, request_type=None, **kwargs):
+        """
+        Handles checking if the user should be throttled & recording their
+        access, in one step (see ``BaseThrottle.consume``).
+
+        The access is weighed by ``get_throttle_cost``. Returns the
+        throttle's status (see ``BaseThrottle.update_status``), for
+        ``add_throttle_headers``.
+
+        Mostly a hook, this uses class assigned to ``throttle`` from
+        ``Resource._meta``. If ``throttle_check`` or ``log_throttled_access``
+        have been overridden, they're called instead.
+        """
+        if self.has_custom_throttle_hooks():
+            self.throttle_check(request)
+            self.log_throttled_access(request)
+            return None
+
+        identifier = self._meta.authentication.get_identifier(request)
+        request_method = request.method.lower()
+        cost = self.get_throttle_cost(request, request_type, **kwargs)
+        status = {}
+
+        if self._meta.throttle.consume(identifier, url=request.get_full_path(), request_method=request_method, resource_name=self._meta.resource_name, cost=cost, status=status):
+            # Throttle limit exceeded.
+            raise ImmediateHttpResponse(response=self.create_throttled_response(request, status))
+
+        return status
+
+    def create_throttled_response(self, request, status=None):
+        """
+        Builds the response for a throttled request: a 429 (Too Many
+        Requests), with the ``X-RateLimit-*`` & ``Retry-After`` headers if
+        the throttle reported its status.
+        """
+        response = http.HttpTooManyRequests()
+        self.add_throttle_headers(response, status)
+
+        if status and status.get('retry_after') is not None:
+            response['Retry-After'] = str(status['retry_after'])
+
+        return response
+
+    def add_throttle_headers(self, response, status):
+        """
+        Adds ``X-RateLimit-Limit``, ``X-RateLimit-Remaining`` &
+        ``X-RateLimit-Reset`` headers to the ``response`` from the throttle's
+        status, if it reported one.
+        """
+        if not status:
+            return
+
+        response['X-RateLimit-Limit'] = str(status['limit'])
+        response['X-RateLimit-Remaining'] = str(status['remaining'])
+        response['X-RateLimit-Reset'] = str(status['reset'])
+
+    def get_throttle_cost(self, request, request_type=None, **kwargs):
+        """
+        Estimates how much work a request is, in accesses, for throttling.
+
+        Every request costs 1 unless ``Meta.throttle_by_cost`` is set. Then
+        it's the number of objects it returns (the effective ``limit`` for a
+        list ``GET``, the number requested for ``get_multiple``, otherwise
+        1), times one plus the number of ``full=True`` related fields, times
+        the cost of its method in ``Meta.throttle_method_costs`` (1 by
+        default).
+        """
+        if not self._meta.throttle_by_cost:
+            return 1
+
+        request_method = request.method.lower()
+        objects = 1
+
+        if request_type == 'list' and request_method == 'get':
+            paginator = self._meta.paginator_class(request.GET, [], limit=self._meta.limit, max_limit=self._meta.max_limit)
+            # No limit at all (``limit=0``) counts as the ``max_limit`` (or
+            # its default, if there's none).
+            objects = paginator.get_limit() or self._meta.max_limit or ResourceOptions.max_limit
+        elif request_type == 'multiple':
+            objects = len(kwargs.get('pk_list', '').split(';'))
+
+        full_fields = 0
+
+        for field_object in self.fields.values():
+            if getattr(field_object, 'full', False):
+                full_fields += 1
+
+        cost = objects * (1 + full_fields) * self._meta.throttle_method_costs.get(request_method, 1)
+        return max(1, int(math.ceil(cost)))
+
+    def has_custom_throttle_hooks(self):
+        """
+        Returns whether ``throttle_check`` or ``log_throttled_access`` have
+        been overridden, in which case they're used rather than
+        ``consume_throttle``.
+        """
+        for name in ('throttle_check', 'log_throttled_access'):
+            if getattr(self.__class__, name).im_func is not getattr(Resource, name).im_func:
+                return True
+
+        return False
 
     def build_bundle(self, obj=None, data=None, request=None):
         """
@@ -616,7 +1025,7 @@ class Resource(object):
             kwargs['api_name'] = self._meta.api_name
 
         try:
-            return self._build_reverse_url("api_dispatch_list", kwargs=kwargs)
+            return self._build_templated_url("api_dispatch_list", kwargs=kwargs)
         except NoReverseMatch:
             return None
 
@@ -645,22 +1054,57 @@ class Resource(object):
 
     # Data preparation.
 
-    def full_dehydrate(self, bundle):
+    def get_dehydrate_plan(self):
         """
-        Given a bundle with an object instance, extract the information from it
-        to populate the resource.
+        Compiles the steps ``full_dehydrate`` runs for each bundle.
+
+        Returns a tuple of the related fields (which need the ``api_name`` &
+        ``resource_name`` handed down) & an ordered list of
+        ``(field_name, dehydrate, dehydrate_FOO)`` steps. ``dehydrate`` is
+        the field's compiled ``ApiField.compile_dehydrate`` & the last is
+        ``None`` if the resource has no such method.
+
+        The plan is kept with the ``fields``, which drop it whenever a field
+        gets added, removed or replaced.
         """
-        # Dehydrate each field.
+        if not isinstance(self.fields, ResourceFields):
+            # Swapped out for a plain ``dict``.
+            self.fields = ResourceFields(self.fields)
+
+        plan = self.fields.dehydrate_plan
+
+        if plan is not None:
+            return plan
+
+        related_fields = []
+        steps = []
+
         for field_name, field_object in self.fields.items():
-            # A touch leaky but it makes URI resolution work.
             if getattr(field_object, 'dehydrated_type', None) == 'related':
-                field_object.api_name = self._meta.api_name
-                field_object.resource_name = self._meta.resource_name
-
-            bundle.data[field_name] = field_object.dehydrate(bundle)
+                related_fields.append(field_object)
 
             # Check for an optional method to do further dehydration.
             method = getattr(self, "dehydrate_%s" % field_name, None)
+            steps.append((field_name, field_object.compile_dehydrate(), method))
+
+        self.fields.dehydrate_plan = plan = (related_fields, steps)
+        return plan
+
+    def full_dehydrate(self, bundle):
+        """
+        Given a bundle with an object instance, extract the information from it
+        to populate the resource.
+        """
+        related_fields, steps = self.get_dehydrate_plan()
+
+        # A touch leaky but it makes URI resolution work.
+        for field_object in related_fields:
+            field_object.api_name = self._meta.api_name
+            field_object.resource_name = self._meta.resource_name
+
+        # Dehydrate each field.
+        for field_name, field_dehydrate, method in steps:
+            bundle.data[field_name] = field_dehydrate(bundle)
 
             if method:
                 bundle.data[field_name] = method(bundle)
@@ -668,6 +1112,100 @@ class Resource(object):
         bundle = self.dehydrate(bundle)
         return bundle
 
+    def full_dehydrate_many(self, bundles, epoch=None, dependencies=None):
+        """
+        Given a list of bundles with object instances, dehydrates them all,
+        like calling ``full_dehydrate`` on each.
+
+        If ``Meta.cache_fragments = True``, each object's dehydrated data is
+        cached (see ``get_fragment_cache_key``). The whole list is fetched
+        with a single ``get_many`` & only the misses are dehydrated.
+
+        Each fragment records its dependencies (see ``get_dependencies``).
+        The ``epoch`` (see ``get_dependency_epoch``) should be read before
+        the objects were fetched. If provided, the ``dependencies`` set is
+        updated with those of every bundle.
+        """
+        if not self._meta.cache_fragments:
+            bundles = [self.full_dehydrate(bundle) for bundle in bundles]
+
+            if dependencies is not None:
+                for bundle in bundles:
+                    dependencies.update(self.get_dependencies(bundle))
+
+            return bundles
+
+        generation = None
+        keys = []
+
+        for bundle in bundles:
+            if getattr(bundle.obj, 'pk', None) is None:
+                keys.append(None)
+                continue
+
+            if generation is None and self.get_object_version(bundle.obj) is None:
+                generation = self.get_cache_generation()
+
+            keys.append(self.get_fragment_cache_key(bundle, generation))
+
+        cached = self._meta.cache.get_many([key for key in keys if key is not None])
+        cached_keys = cached.keys()
+
+        for key, is_current in zip(cached_keys, self.check_dependencies([cached[key][1] for key in cached_keys])):
+            if not is_current:
+                del(cached[key])
+
+        dehydrated = []
+        misses = []
+
+        for bundle, key in zip(bundles, keys):
+            if key in cached:
+                bundle.data, snapshot = cached[key]
+                bundle_dependencies = snapshot.keys()
+            else:
+                bundle = self.full_dehydrate(bundle)
+                bundle_dependencies = self.get_dependencies(bundle)
+
+                if key is not None:
+                    misses.append((key, bundle.data, bundle_dependencies))
+
+            if dependencies is not None:
+                dependencies.update(bundle_dependencies)
+
+            dehydrated.append(bundle)
+
+        if misses:
+            snapshots = self.snapshot_dependencies([miss[2] for miss in misses], epoch)
+
+            # Nothing is stored if a dependency changed meanwhile.
+            if snapshots is not None:
+                fragments = {}
+
+                for (key, data, bundle_dependencies), snapshot in zip(misses, snapshots):
+                    fragments[key] = (fragment_data(data), snapshot)
+
+                self._meta.cache.set_many(fragments)
+
+        return dehydrated
+
+    def get_fragment_cache_key(self, bundle, generation=None):
+        """
+        Builds the cache key for the dehydrated data of ``bundle.obj``.
+
+        It's made from the object's ``pk`` & version (see
+        ``get_object_version``) and the user's scope (see
+        ``get_cache_scope``), since ``dehydrate_FOO`` methods may look at the
+        request. Objects without a version use the cache ``generation``
+        instead, which is looked up if not provided.
+        """
+        version = self.get_object_version(bundle.obj)
+
+        if version is None:
+            version = generation or self.get_cache_generation()
+
+        signature = repr((version, self.get_cache_scope(bundle.request)))
+        return self.generate_cache_key('fragment', bundle.obj.pk, md5(signature).hexdigest())
+
     def dehydrate(self, bundle):
         """
         A hook to allow a final manipulation of data once all fields/methods
@@ -817,15 +1355,419 @@ class Resource(object):
         """
         Creates a unique-enough cache key.
 
-        This is based off the current api_name/resource_name/args/kwargs.
+        This is based off the current api_name/resource_name/args/kwargs. The
+        kwargs are sorted & all values are normalized to unicode, so
+        ``pk=5`` & ``pk=u'5'`` produce the same key. Keys that are too long
+        or contain characters memcached won't accept are hashed.
         """
         smooshed = []
 
-        for key, value in kwargs.items():
-            smooshed.append("%s=%s" % (key, value))
+        for key, value in sorted(kwargs.items()):
+            smooshed.append(u"%s=%s" % (force_unicode(key), force_unicode(value)))
 
         # Use a list plus a ``.join()`` because it's faster than concatenation.
-        return "%s:%s:%s:%s" % (self._meta.api_name, self._meta.resource_name, ':'.join(args), ':'.join(smooshed))
+        cache_key = u"%s:%s:%s:%s" % (self._meta.api_name, self._meta.resource_name, u':'.join([force_unicode(arg) for arg in args]), u':'.join(smooshed))
+
+        if len(cache_key) > MAX_CACHE_KEY_LENGTH or not CACHE_KEY_SAFE_VALUE.match(cache_key):
+            return "tastypie:%s" % md5(cache_key.encode('utf-8')).hexdigest()
+
+        return str(cache_key)
+
+    def get_cache_generation(self):
+        """
+        Returns the resource's current cache generation, a token that's part
+        of every cached list response key.
+
+        A new one is started if none is stored (or it was evicted).
+        """
+        generation_key = self.generate_cache_key('generation')
+        generation = self._meta.cache.get(generation_key)
+
+        if generation is None:
+            generation = self.bump_cache_generation()
+
+        return generation
+
+    def bump_cache_generation(self):
+        """
+        Starts a new cache generation, which expires every cached list
+        response for the resource at once without having to find the keys.
+        """
+        generation = uuid.uuid4().hex
+        self._meta.cache.set(self.generate_cache_key('generation'), generation, CACHE_GENERATION_TIMEOUT)
+        return generation
+
+    def invalidate_cache(self, obj=None, **kwargs):
+        """
+        Invalidates the cached data for the resource after a change to
+        ``obj`` (or an unknown change, if ``None``).
+
+        Evicts the ``cached_obj_get`` entries for the ``obj`` (see
+        ``get_detail_cache_kwargs``) & for the lookup ``kwargs``, if any, then
+        starts a new cache generation so cached list responses expire.
+
+        The write methods (``put_detail``, ``patch_detail``,
+        ``delete_detail``, etc.) call this. ``ModelResource`` also calls it
+        from the ``post_save``/``post_delete`` signals of its model.
+        """
+        lookups = []
+
+        if kwargs:
+            lookups.append(kwargs)
+
+        if obj is not None:
+            lookups.extend(self.get_detail_cache_kwargs(obj))
+
+        for lookup in lookups:
+            self._meta.cache.delete(self.generate_cache_key('detail', **lookup))
+
+        self.bump_cache_generation()
+
+    def get_detail_cache_kwargs(self, obj):
+        """
+        Returns a list of the lookup kwargs the ``obj`` may be cached under
+        by ``cached_obj_get``, for eviction when it changes.
+
+        By default, this is just the ``pk``. Resources that look objects up
+        by other means (i.e. a ``slug`` in ``override_urls``) should add
+        those lookups here.
+        """
+        pk = getattr(obj, 'pk', None)
+
+        if pk is None:
+            return []
+
+        return [{'pk': pk}]
+
+    def get_list_cache_key(self, request, **kwargs):
+        """
+        Builds the cache key for a list response.
+
+        It's made from a normalized view of everything that can change the
+        response (the filters, ordering, ``limit``/``offset`` & other GET
+        parameters, the URL ``kwargs``, the format & the user) plus the
+        current cache generation.
+        """
+        normalized_kwargs = sorted([(force_unicode(key), force_unicode(value)) for key, value in kwargs.items()])
+        signature = repr(self.get_request_signature(request) + (normalized_kwargs,))
+        return self.generate_cache_key('list_response', self.get_cache_generation(), md5(signature).hexdigest())
+
+    def get_detail_cache_key(self, request, obj=None, **kwargs):
+        """
+        Builds the cache key for a detail response.
+
+        Like ``get_list_cache_key``, it's made from a normalized view of the
+        request & the URL ``kwargs``. It also includes the version of the
+        ``obj`` (see ``get_object_version``), so a changed object never
+        matches an old entry. Without an ``obj`` (or a version), the current
+        cache generation is used instead.
+        """
+        version = None
+
+        if obj is not None:
+            version = self.get_object_version(obj)
+
+        if version is None:
+            version = self.get_cache_generation()
+
+        normalized_kwargs = sorted([(force_unicode(key), force_unicode(value)) for key, value in kwargs.items()])
+        signature = repr(self.get_request_signature(request) + (normalized_kwargs, version))
+        return self.generate_cache_key('detail_response', md5(signature).hexdigest())
+
+    def get_cached_response(self, request, cache_key):
+        """
+        Rebuilds a response stored by ``set_cached_response``, or returns
+        ``None`` if there isn't one (or something it depends on has changed
+        since, see ``check_dependencies``).
+
+        Conditional requests are still answered with a 304 where possible.
+        """
+        cached = self._meta.cache.get(cache_key)
+
+        if cached is None:
+            return None
+
+        content, content_type, etag, last_modified, snapshot = cached
+
+        if snapshot and not self.check_dependencies([snapshot])[0]:
+            return None
+
+        not_modified = self.check_not_modified(request, etag, last_modified)
+
+        if not_modified is not None:
+            return not_modified
+
+        response = HttpResponse(content=content, content_type=content_type)
+        return self.set_validator_headers(response, etag, last_modified)
+
+    def set_cached_response(self, cache_key, response, etag=None, last_modified=None, dependencies=None, epoch=None):
+        """
+        Stores the serialized content of the ``response`` (along with its
+        validators) in the cache.
+
+        If provided, the ``dependencies`` (see ``get_dependencies``) are
+        recorded so the entry expires when any of them change. The ``epoch``
+        (see ``get_dependency_epoch``) should be read before the data in the
+        response was. If anything changed since, nothing is stored.
+        """
+        snapshot = {}
+
+        if dependencies:
+            snapshot = self.snapshot_dependencies([dependencies], epoch)
+
+            if snapshot is None:
+                return
+
+            snapshot = snapshot[0]
+
+        self._meta.cache.set(cache_key, (response.content, response['Content-Type'], etag, last_modified, snapshot))
+
+    def get_dependencies(self, bundle):
+        """
+        Returns the cache keys of the versions the dehydrated ``bundle``
+        depends on (see ``get_dependency_graph``).
+
+        Those are the versions of the objects embedded through ``full=True``
+        related fields, at any depth, & those of the membership of each
+        to-many relation of every object dehydrated.
+        """
+        graph = self.get_dependency_graph()
+        dependencies = set()
+
+        if not graph:
+            return dependencies
+
+        pending = [(self.__class__, bundle)]
+
+        while pending:
+            resource_class, bundle = pending.pop()
+            pk = getattr(bundle.obj, 'pk', None)
+
+            for field_name, to_class, full, many, membership in graph.get(resource_class, []):
+                model = get_resource_model(to_class)
+
+                if many and membership is not None and pk is not None:
+                    link_model, link_field = membership[:2]
+                    dependencies.add(self.get_membership_cache_key(get_model_label(link_model), link_field, pk))
+                elif many and model is not None:
+                    # The relation couldn't be worked out, so any change to
+                    # the related model will do.
+                    dependencies.add(self.get_dependency_cache_key(get_model_label(model)))
+
+                if not full:
+                    continue
+
+                value = bundle.data.get(field_name)
+
+                if not many:
+                    value = [value]
+
+                for related_bundle in value or []:
+                    if not isinstance(related_bundle, Bundle):
+                        continue
+
+                    related_pk = getattr(related_bundle.obj, 'pk', None)
+
+                    if related_pk is not None and hasattr(related_bundle.obj, '_meta'):
+                        dependencies.add(self.get_dependency_cache_key(get_model_label(related_bundle.obj), related_pk))
+
+                    pending.append((to_class, related_bundle))
+
+        return dependencies
+
+    def get_object_dependencies(self, obj):
+        """
+        Returns the cache keys of the versions an ``obj`` cached by
+        ``cached_obj_get`` depends on, through the related objects already
+        loaded onto it.
+
+        Objects don't carry related data by default, so this returns an
+        empty set. ``ModelResource`` includes a version that finds the
+        related objects loaded by ``select_related``/``prefetch_related``.
+        """
+        return set()
+
+    def get_dependency_cache_key(self, label, pk=None):
+        """
+        Builds the cache key holding the current version of an object (by
+        model label & ``pk``) the resource's cached representations may
+        embed. Without a ``pk``, the version covers the whole model.
+        """
+        if pk is None:
+            return self.generate_cache_key('dependency', label)
+
+        return self.generate_cache_key('dependency', label, pk)
+
+    def get_membership_cache_key(self, label, link_field, pk):
+        """
+        Builds the cache key holding the current version of the membership
+        of a to-many relation: which objects of the model ``label`` (a child
+        model or a ``through`` model) point at the object with the ``pk``
+        through their ``link_field``.
+        """
+        return self.generate_cache_key('membership', label, link_field, pk)
+
+    def get_dependency_epoch(self):
+        """
+        Returns the resource's dependency epoch, a token that changes with
+        every call to ``invalidate_dependencies``.
+
+        Read it before the data being cached & hand it over to
+        ``snapshot_dependencies``, so nothing is stored if a dependency
+        changed in between.
+        """
+        return self._meta.cache.get(self.generate_cache_key('dependency_epoch')) or ''
+
+    def snapshot_dependencies(self, dependency_sets, epoch=None):
+        """
+        Given a list of sets of dependencies (see ``get_dependencies``),
+        returns a matching list of snapshots (dictionaries of their current
+        versions) to store with cached entries. Uses one ``get_many``.
+
+        Dependencies without a version yet are given one. Returns ``None``
+        if the dependency ``epoch`` (see ``get_dependency_epoch``), when
+        provided, has moved on, as the data may predate a change.
+        """
+        keys = set()
+
+        for dependencies in dependency_sets:
+            keys.update(dependencies)
+
+        if not keys:
+            return [{} for dependencies in dependency_sets]
+
+        epoch_key = self.generate_cache_key('dependency_epoch')
+        versions = self._meta.cache.get_many(list(keys) + [epoch_key])
+        current_epoch = versions.pop(epoch_key, '')
+        added = False
+
+        for key in keys:
+            if key in versions:
+                continue
+
+            version = uuid.uuid4().hex
+
+            # Another worker may be setting one too. Only one can win.
+            if not self._meta.cache.add(key, version, CACHE_GENERATION_TIMEOUT):
+                version = self._meta.cache.get(key) or version
+
+            versions[key] = version
+            added = True
+
+        if added:
+            # Checked again after adding the versions, so a change made
+            # before then is always noticed.
+            current_epoch = self._meta.cache.get(epoch_key) or ''
+
+        if epoch is not None and current_epoch != epoch:
+            return None
+
+        snapshots = []
+
+        for dependencies in dependency_sets:
+            snapshots.append(dict([(key, versions[key]) for key in dependencies]))
+
+        return snapshots
+
+    def check_dependencies(self, snapshots):
+        """
+        Given a list of snapshots (see ``snapshot_dependencies``), returns a
+        matching list of whether each is still current. Uses one
+        ``get_many``.
+        """
+        keys = set()
+
+        for snapshot in snapshots:
+            keys.update(snapshot.keys())
+
+        if not keys:
+            return [True for snapshot in snapshots]
+
+        versions = self._meta.cache.get_many(list(keys))
+        current = []
+
+        for snapshot in snapshots:
+            is_current = True
+
+            for key, version in snapshot.items():
+                if versions.get(key) != version:
+                    is_current = False
+                    break
+
+            current.append(is_current)
+
+        return current
+
+    def invalidate_dependencies(self, keys):
+        """
+        Expires every cached representation (responses, fragments &
+        ``cached_obj_get`` entries) depending on any of the provided version
+        ``keys`` (see ``get_dependency_cache_key`` &
+        ``get_membership_cache_key``) by dropping them, then moves the
+        dependency epoch on.
+
+        ``ModelResource`` calls this from the signals of the models in its
+        ``get_dependency_graph``.
+        """
+        if not keys:
+            return
+
+        for key in keys:
+            self._meta.cache.delete(key)
+
+        self._meta.cache.set(self.generate_cache_key('dependency_epoch'), uuid.uuid4().hex, CACHE_GENERATION_TIMEOUT)
+
+    @classmethod
+    def get_dependency_graph(cls):
+        """
+        Returns what the resource's representations depend on besides its
+        own objects, as a dictionary of each resource class reached (through
+        ``full=True`` related fields, via ``RelatedField.to_class``, as deep
+        as they go) to a list of its related fields that matter.
+
+        Each field is a tuple of the field name, the ``to_class``, whether
+        it's ``full``, whether it's to-many & (for to-many fields) the
+        membership of the relation (see ``get_membership``) or ``None`` if
+        it can't be worked out.
+
+        Built once per resource class. Empty if nothing is related.
+        """
+        if not '_dependency_graph' in cls.__dict__:
+            graph = {}
+            seen = set([cls])
+            pending = [cls]
+
+            while pending:
+                resource_class = pending.pop()
+                model = get_resource_model(resource_class)
+                related_fields = []
+
+                for field_name, field_object in resource_class.base_fields.items():
+                    if not getattr(field_object, 'is_related', False):
+                        continue
+
+                    many = getattr(field_object, 'is_m2m', False)
+
+                    if not field_object.full and not many:
+                        continue
+
+                    membership = None
+
+                    if many and model is not None and isinstance(field_object.attribute, basestring):
+                        membership = get_membership(model, field_object.attribute)
+
+                    related_fields.append((field_name, field_object.to_class, field_object.full, many, membership))
+
+                    if field_object.full and not field_object.to_class in seen:
+                        seen.add(field_object.to_class)
+                        pending.append(field_object.to_class)
+
+                if related_fields:
+                    graph[resource_class] = related_fields
+
+            cls._dependency_graph = graph
+
+        return cls._dependency_graph
 
     # Data access methods.
 
@@ -899,15 +1841,12 @@ class Resource(object):
         """
         A version of ``obj_get_list`` that uses the cache as a means to get
         commonly-accessed data faster.
+
+        When the entry expires, only one worker rebuilds it (see
+        ``NoCache.get_or_set``).
         """
         cache_key = self.generate_cache_key('list', **kwargs)
-        obj_list = self._meta.cache.get(cache_key)
-
-        if obj_list is None:
-            obj_list = self.obj_get_list(request=request, **kwargs)
-            self._meta.cache.set(cache_key, obj_list)
-
-        return obj_list
+        return self._meta.cache.get_or_set(cache_key, lambda: self.obj_get_list(request=request, **kwargs))
 
     def obj_get(self, request=None, **kwargs):
         """
@@ -921,19 +1860,59 @@ class Resource(object):
         """
         raise NotImplementedError()
 
+    def obj_get_many(self, request=None, pk_list=None):
+        """
+        Fetches several individual objects on the resource at once.
+
+        Returns a dictionary mapping each identifier in ``pk_list`` that was
+        found to its object. Identifiers that could not be found are simply
+        left out.
+
+        By default, this falls back to calling ``obj_get`` once per
+        identifier. ``ModelResource`` includes a version specific to Django's
+        ``Models`` that fetches everything in a single query.
+        """
+        objects = {}
+
+        for pk in pk_list or []:
+            try:
+                objects[pk] = self.obj_get(request, pk=pk)
+            except ObjectDoesNotExist:
+                pass
+
+        return objects
+
     def cached_obj_get(self, request=None, **kwargs):
         """
         A version of ``obj_get`` that uses the cache as a means to get
         commonly-accessed data faster.
+
+        When the entry expires, only one worker rebuilds it (see
+        ``NoCache.get_or_set``).
+
+        If the resource has related data (see ``get_dependency_graph``), the
+        entry also expires when the related objects loaded onto the object
+        change (see ``get_object_dependencies``).
         """
         cache_key = self.generate_cache_key('detail', **kwargs)
-        bundle = self._meta.cache.get(cache_key)
 
-        if bundle is None:
-            bundle = self.obj_get(request=request, **kwargs)
-            self._meta.cache.set(cache_key, bundle)
+        if not self.get_dependency_graph():
+            return self._meta.cache.get_or_set(cache_key, lambda: self.obj_get(request=request, **kwargs))
 
-        return bundle
+        def fetch():
+            epoch = self.get_dependency_epoch()
+            obj = self.obj_get(request=request, **kwargs)
+            # ``None`` if a dependency changed meanwhile, which never matches.
+            snapshot = self.snapshot_dependencies([self.get_object_dependencies(obj)], epoch)
+            return (obj, snapshot and snapshot[0])
+
+        obj, snapshot = self._meta.cache.get_or_set(cache_key, fetch)
+
+        if snapshot is None or not self.check_dependencies([snapshot])[0]:
+            self._meta.cache.delete(cache_key)
+            obj, snapshot = self._meta.cache.get_or_set(cache_key, fetch)
+
+        return obj
 
     def obj_create(self, bundle, request=None, **kwargs):
         """
@@ -990,6 +1969,18 @@ class Resource(object):
         serialized = self.serialize(request, data, desired_format)
         return response_class(content=serialized, content_type=build_content_type(desired_format), **response_kwargs)
 
+    def create_streaming_response(self, request, data, response_class=StreamingHttpResponse, **response_kwargs):
+        """
+        Like ``create_response``, but the data is serialized as the response
+        is written out rather than all at once.
+
+        Any iterators within the data are consumed lazily, so the first
+        chunk goes out before the last object is read.
+        """
+        desired_format = self.determine_format(request)
+        serialized = self.serialize_stream(request, data, desired_format)
+        return response_class(serialized, content_type=build_content_type(desired_format), **response_kwargs)
+
     def is_valid(self, bundle, request=None):
         """
         Handles checking if the data provided by the user is valid.
@@ -1034,21 +2025,232 @@ class Resource(object):
         Calls ``obj_get_list`` to provide the data, then handles that result
         set and serializes it.
 
-        Should return a HttpResponse (200 OK).
+        If ``Meta.cache_list = True``, the serialized response is cached
+        (see ``get_list_cache_key``).
+
+        Should return a HttpResponse (200 OK).
+        """
+        cache_key = None
+        epoch = None
+        dependencies = None
+
+        if (self._meta.cache_list or self._meta.cache_fragments) and not self._meta.stream_list:
+            # Read before any data is (see ``get_dependency_epoch``).
+            epoch = self.get_dependency_epoch()
+
+        if self._meta.cache_list and not self._meta.stream_list:
+            cache_key = self.get_list_cache_key(request, **kwargs)
+            dependencies = set()
+            response = self.get_cached_response(request, cache_key)
+
+            if response is not None:
+                return response
+
+        objects = self.obj_get_list(request=request, **self.remove_api_resource_names(kwargs))
+        etag, last_modified = None, None
+
+        # The validators can cost a query, so only find them when they'll be
+        # checked, cached or sent.
+        if cache_key is not None or self._meta.list_validators or self.is_conditional(request):
+            etag, last_modified = self.get_list_validators(request, objects)
+
+        not_modified = self.check_not_modified(request, etag, last_modified)
+
+        if not_modified is not None:
+            return not_modified
+
+        sorted_objects = self.apply_sorting(objects, options=request.GET)
+
+        paginator_kwargs = {}
+
+        # Only handed over when set, since custom paginators may not take it.
+        if self._meta.count_strategy is not None:
+            paginator_kwargs['count_strategy'] = self._meta.count_strategy
+
+        paginator = self._meta.paginator_class(request.GET, sorted_objects, resource_uri=self.get_resource_list_uri(), limit=self._meta.limit, max_limit=self._meta.max_limit, collection_name=self._meta.collection_name, **paginator_kwargs)
+        to_be_serialized = paginator.page()
+
+        if self._meta.stream_list:
+            # Dehydrate lazily, as the response is written out.
+            to_be_serialized['objects'] = self.full_dehydrate_stream(request, to_be_serialized['objects'])
+            to_be_serialized = self.alter_list_data_to_serialize(request, to_be_serialized)
+            response = self.create_streaming_response(request, to_be_serialized)
+            return self.set_validator_headers(response, etag, last_modified)
+
+        # Dehydrate the bundles in preparation for serialization.
+        bundles = [self.build_bundle(obj=obj, request=request) for obj in to_be_serialized['objects']]
+        bundles = self.full_dehydrate_many(bundles, epoch, dependencies)
+        to_be_serialized['objects'] = bundles
+        to_be_serialized = self.alter_list_data_to_serialize(request, to_be_serialized)
+        response = self.create_response(request, to_be_serialized)
+
+        if cache_key is not None:
+            self.set_cached_response(cache_key, response, etag, last_modified, dependencies, epoch)
+
+        return self.set_validator_headers(response, etag, last_modified)
+
+    def build_etag(self, request, *bits):
+        """
+        Builds an ``ETag`` (unquoted) for the response to the ``request``
+        from the provided validator ``bits``.
+
+        The path, query string, format & user are mixed in, since each of
+        them can change the representation.
+        """
+        bits = (self._meta.resource_name,) + self.get_request_signature(request) + bits
+        return md5(repr(bits)).hexdigest()
+
+    def get_request_signature(self, request):
+        """
+        Returns a normalized tuple of everything about the ``request`` that
+        can change the response: the path, the format, the GET parameters
+        (sorted, with their values as unicode) & the user.
+        """
+        get_lists = getattr(request.GET, 'lists', request.GET.items)
+        params = []
+
+        for key, values in get_lists():
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+
+            params.append((force_unicode(key), [force_unicode(value) for value in values]))
+
+        return (request.path, self.determine_format(request), sorted(params), self.get_cache_scope(request))
+
+    def get_cache_scope(self, request):
+        """
+        Returns what about the requesting user can change the response, for
+        use in cache keys & ``ETags``.
+
+        By default, this is the user's ``pk``, so users never share cached
+        responses. If your ``Authorization`` shows everyone the same data
+        (or the same data per group, etc.), return something coarser to
+        share entries between users.
+        """
+        user = getattr(request, 'user', None)
+        return getattr(user, 'pk', None)
+
+    def get_object_version(self, obj):
+        """
+        Returns a token that changes whenever the ``obj`` does, built from
+        ``Meta.version_attribute`` and/or ``Meta.last_modified_attribute``.
+
+        Returns ``None`` if neither is configured (or set on the object).
+        """
+        version = None
+        last_modified = None
+
+        if self._meta.version_attribute:
+            version = getattr(obj, self._meta.version_attribute, None)
+
+        if self._meta.last_modified_attribute:
+            last_modified = getattr(obj, self._meta.last_modified_attribute, None)
+
+        if version is None and last_modified is None:
+            return None
+
+        return (version, last_modified)
+
+    def get_detail_validators(self, request, obj):
+        """
+        Determines the ``ETag`` & ``Last-Modified`` values for a single
+        object, from the ``Meta.version_attribute`` and/or
+        ``Meta.last_modified_attribute`` on the object.
+
+        Returns ``(None, None)`` if neither is configured (or set on the
+        object).
+        """
+        version = self.get_object_version(obj)
+
+        if version is None:
+            return None, None
+
+        return self.build_etag(request, *version), version[1]
+
+    def get_list_validators(self, request, objects):
+        """
+        Determines the ``ETag`` & ``Last-Modified`` values for a list of
+        objects.
+
+        There's no cheap way to summarize an arbitrary list, so this returns
+        ``(None, None)``. ``ModelResource`` includes a version that uses a
+        single aggregate query.
+        """
+        return None, None
+
+    def is_conditional(self, request):
+        """
+        Checks if the ``request`` has an ``If-None-Match`` or
+        ``If-Modified-Since`` header.
+        """
+        return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+    def check_not_modified(self, request, etag, last_modified):
+        """
+        Checks the ``If-None-Match`` & ``If-Modified-Since`` headers against
+        the validators.
+
+        Returns a ``HttpNotModified`` (304 Not Modified) if the client's
+        copy is current, otherwise ``None``.
+        """
+        if etag is None and last_modified is None:
+            return None
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since.
+            etags = parse_etags(if_none_match)
+
+            if etag is None or not (etag in etags or '*' in etags):
+                return None
+        else:
+            if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+
+            if not if_modified_since or last_modified is None:
+                return None
+
+            if_modified_since = parse_http_date_safe(if_modified_since)
+
+            if if_modified_since is None or int(datetime_to_timestamp(last_modified)) > if_modified_since:
+                return None
+
+        return self.set_validator_headers(http.HttpNotModified(), etag, last_modified)
+
+    def set_validator_headers(self, response, etag, last_modified):
+        """
+        Adds the ``ETag`` & ``Last-Modified`` headers to the response, where
+        available.
+        """
+        if etag is not None:
+            response['ETag'] = quote_etag(etag)
+
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(datetime_to_timestamp(last_modified))
+
+        return response
+
+    def iter_objects(self, objects):
+        """
+        Iterates over the ``objects`` for a streaming list response without
+        keeping them all in memory.
+
+        Uses ``iterator()`` when available, so a ``QuerySet`` doesn't fill
+        its result cache.
         """
-        # TODO: Uncached for now. Invalidation that works for everyone may be
-        #       impossible.
-        objects = self.obj_get_list(request=request, **self.remove_api_resource_names(kwargs))
-        sorted_objects = self.apply_sorting(objects, options=request.GET)
+        if hasattr(objects, 'iterator'):
+            return objects.iterator()
 
-        paginator = self._meta.paginator_class(request.GET, sorted_objects, resource_uri=self.get_resource_list_uri(), limit=self._meta.limit, max_limit=self._meta.max_limit, collection_name=self._meta.collection_name)
-        to_be_serialized = paginator.page()
+        return iter(objects)
 
-        # Dehydrate the bundles in preparation for serialization.
-        bundles = [self.build_bundle(obj=obj, request=request) for obj in to_be_serialized['objects']]
-        to_be_serialized['objects'] = [self.full_dehydrate(bundle) for bundle in bundles]
-        to_be_serialized = self.alter_list_data_to_serialize(request, to_be_serialized)
-        return self.create_response(request, to_be_serialized)
+    def full_dehydrate_stream(self, request, objects):
+        """
+        Lazily builds & dehydrates a bundle for each of the ``objects``.
+
+        Used by ``get_list`` when ``Meta.stream_list = True``.
+        """
+        for obj in self.iter_objects(objects):
+            yield self.full_dehydrate(self.build_bundle(obj=obj, request=request))
 
     def get_detail(self, request, **kwargs):
         """
@@ -1057,19 +2259,58 @@ class Resource(object):
         Calls ``cached_obj_get/obj_get`` to provide the data, then handles that result
         set and serializes it.
 
+        If ``Meta.cache_detail = True``, the serialized response is cached
+        (see ``get_detail_cache_key``). The object is still fetched with
+        ``obj_get`` first, so the authorization limits are applied before a
+        cached response is served.
+
         Should return a HttpResponse (200 OK).
         """
+        cache_key = None
+        epoch = None
+        obj_get = self.cached_obj_get
+
+        if self._meta.cache_detail:
+            # Read before any data is (see ``get_dependency_epoch``).
+            epoch = self.get_dependency_epoch()
+            # Not from ``cached_obj_get``, which skips the authorization
+            # limits on a hit.
+            obj_get = self.obj_get
+
         try:
-            obj = self.cached_obj_get(request=request, **self.remove_api_resource_names(kwargs))
+            obj = obj_get(request=request, **self.remove_api_resource_names(kwargs))
         except ObjectDoesNotExist:
             return http.HttpNotFound()
         except MultipleObjectsReturned:
             return http.HttpMultipleChoices("More than one resource is found at this URI.")
 
+        etag, last_modified = self.get_detail_validators(request, obj)
+        not_modified = self.check_not_modified(request, etag, last_modified)
+
+        if not_modified is not None:
+            return not_modified
+
+        if self._meta.cache_detail:
+            cache_key = self.get_detail_cache_key(request, obj, **kwargs)
+            response = self.get_cached_response(request, cache_key)
+
+            if response is not None:
+                return response
+
         bundle = self.build_bundle(obj=obj, request=request)
         bundle = self.full_dehydrate(bundle)
+        dependencies = None
+
+        if cache_key is not None:
+            dependencies = self.get_dependencies(bundle)
+
         bundle = self.alter_detail_data_to_serialize(request, bundle)
-        return self.create_response(request, bundle)
+        response = self.create_response(request, bundle)
+
+        if cache_key is not None:
+            self.set_cached_response(cache_key, response, etag, last_modified, dependencies, epoch)
+
+        return self.set_validator_headers(response, etag, last_modified)
 
     def put_list(self, request, **kwargs):
         """
@@ -1091,6 +2332,7 @@ class Resource(object):
             raise BadRequest("Invalid data sent.")
 
         self.obj_delete_list(request=request, **self.remove_api_resource_names(kwargs))
+        self.invalidate_cache()
         bundles_seen = []
 
         for object_data in deserialized['objects']:
@@ -1107,6 +2349,8 @@ class Resource(object):
             self.obj_create(bundle, request=request, **self.remove_api_resource_names(kwargs))
             bundles_seen.append(bundle)
 
+        self.invalidate_cache()
+
         if not self._meta.always_return_data:
             return http.HttpNoContent()
         else:
@@ -1141,6 +2385,7 @@ class Resource(object):
 
         try:
             updated_bundle = self.obj_update(bundle, request=request, **self.remove_api_resource_names(kwargs))
+            self.invalidate_cache(updated_bundle.obj, **self.remove_api_resource_names(kwargs))
 
             if not self._meta.always_return_data:
                 return http.HttpNoContent()
@@ -1150,6 +2395,7 @@ class Resource(object):
                 return self.create_response(request, updated_bundle, response_class=http.HttpAccepted)
         except (NotFound, MultipleObjectsReturned):
             updated_bundle = self.obj_create(bundle, request=request, **self.remove_api_resource_names(kwargs))
+            self.invalidate_cache(updated_bundle.obj, **self.remove_api_resource_names(kwargs))
             location = self.get_resource_uri(updated_bundle)
 
             if not self._meta.always_return_data:
@@ -1175,6 +2421,7 @@ class Resource(object):
         bundle = self.build_bundle(data=dict_strip_unicode_keys(deserialized), request=request)
         self.is_valid(bundle, request)
         updated_bundle = self.obj_create(bundle, request=request, **self.remove_api_resource_names(kwargs))
+        self.invalidate_cache(updated_bundle.obj)
         location = self.get_resource_uri(updated_bundle)
 
         if not self._meta.always_return_data:
@@ -1204,6 +2451,7 @@ class Resource(object):
         If the resources are deleted, return ``HttpNoContent`` (204 No Content).
         """
         self.obj_delete_list(request=request, **self.remove_api_resource_names(kwargs))
+        self.invalidate_cache()
         return http.HttpNoContent()
 
     def delete_detail(self, request, **kwargs):
@@ -1217,6 +2465,7 @@ class Resource(object):
         """
         try:
             self.obj_delete(request=request, **self.remove_api_resource_names(kwargs))
+            self.invalidate_cache(**self.remove_api_resource_names(kwargs))
             return http.HttpNoContent()
         except NotFound:
             return http.HttpNotFound()
@@ -1286,6 +2535,7 @@ class Resource(object):
                     bundle = self.full_dehydrate(bundle)
                     bundle = self.alter_detail_data_to_serialize(request, bundle)
                     self.update_in_place(request, bundle, data)
+                    self.invalidate_cache(bundle.obj)
                 except (ObjectDoesNotExist, MultipleObjectsReturned):
                     # The object referenced by resource_uri doesn't exist,
                     # so this is a create-by-PUT equivalent.
@@ -1308,7 +2558,10 @@ class Resource(object):
         for uri in deserialized.get('deleted_objects', []):
             obj = self.get_via_uri(uri, request=request)
             self.obj_delete(request=request, _obj=obj)
+            self.invalidate_cache(obj)
 
+        # Covers any objects created above.
+        self.invalidate_cache()
         return http.HttpAccepted()
 
     def patch_detail(self, request, **kwargs):
@@ -1342,6 +2595,7 @@ class Resource(object):
         # Now update the bundle in-place.
         deserialized = self.deserialize(request, request.raw_post_data, format=request.META.get('CONTENT_TYPE', 'application/json'))
         self.update_in_place(request, bundle, deserialized)
+        self.invalidate_cache(bundle.obj, **self.remove_api_resource_names(kwargs))
         return http.HttpAccepted()
 
     def update_in_place(self, request, original_bundle, new_data):
@@ -1367,48 +2621,59 @@ class Resource(object):
         Should return a HttpResponse (200 OK).
         """
         self.method_check(request, allowed=['get'])
+        self.ip_throttle_check(request)
         self.is_authenticated(request)
-        self.throttle_check(request)
-        self.log_throttled_access(request)
-        return self.create_response(request, self.build_schema())
+        throttle_status = self.consume_throttle(request, 'schema', **kwargs)
+        response = self.create_response(request, self.build_schema())
+        self.add_throttle_headers(response, throttle_status)
+        return response
 
     def get_multiple(self, request, **kwargs):
         """
         Returns a serialized list of resources based on the identifiers
         from the URL.
 
-        Calls ``obj_get`` to fetch only the objects requested. This method
-        only responds to HTTP GET.
+        Calls ``obj_get_many`` to fetch only the objects requested. This
+        method only responds to HTTP GET.
 
         Should return a HttpResponse (200 OK).
         """
         self.method_check(request, allowed=['get'])
+        self.ip_throttle_check(request)
         self.is_authenticated(request)
-        self.throttle_check(request)
+        slot = self.acquire_concurrency_slot(request)
 
-        # Rip apart the list then iterate.
-        obj_pks = kwargs.get('pk_list', '').split(';')
-        objects = []
-        not_found = []
+        try:
+            throttle_status = self.consume_throttle(request, 'multiple', **kwargs)
 
-        for pk in obj_pks:
-            try:
-                obj = self.obj_get(request, pk=pk)
-                bundle = self.build_bundle(obj=obj, request=request)
+            # Rip apart the list, fetch everything at once, then iterate.
+            obj_pks = kwargs.get('pk_list', '').split(';')
+            found = self.obj_get_many(request, pk_list=obj_pks)
+            objects = []
+            not_found = []
+
+            for pk in obj_pks:
+                if not pk in found:
+                    not_found.append(pk)
+                    continue
+
+                bundle = self.build_bundle(obj=found[pk], request=request)
                 bundle = self.full_dehydrate(bundle)
                 objects.append(bundle)
-            except ObjectDoesNotExist:
-                not_found.append(pk)
 
-        object_list = {
-            'objects': objects,
-        }
+            object_list = {
+                'objects': objects,
+            }
+
+            if len(not_found):
+                object_list['not_found'] = not_found
 
-        if len(not_found):
-            object_list['not_found'] = not_found
+            response = self.create_response(request, object_list)
+        finally:
+            self.release_concurrency_slot(slot)
 
-        self.log_throttled_access(request)
-        return self.create_response(request, object_list)
+        self.add_throttle_headers(response, throttle_status)
+        return response
 
 
 class ModelDeclarativeMetaclass(DeclarativeMetaclass):
@@ -1436,6 +2701,10 @@ class ModelDeclarativeMetaclass(DeclarativeMetaclass):
         # Add in the new fields.
         new_class.base_fields.update(new_class.get_fields(include_fields, excludes))
 
+        # ``NoCache`` never stores anything, so there's nothing to invalidate.
+        if getattr(new_class._meta, 'cache_list', False) or getattr(new_class._meta, 'cache_detail', False) or getattr(new_class._meta, 'cache_fragments', False) or type(new_class._meta.cache) is not NoCache:
+            new_class.connect_cache_signals()
+
         if getattr(new_class._meta, 'include_absolute_url', True):
             if not 'absolute_url' in new_class.base_fields:
                 new_class.base_fields['absolute_url'] = fields.CharField(attribute='get_absolute_url', readonly=True)
@@ -1737,6 +3006,441 @@ class ModelResource(Resource):
         """
         return self._meta.queryset._clone()
 
+    @classmethod
+    def build_related_query_plan(cls):
+        """
+        Determines which relations ``full_dehydrate`` will touch & returns
+        a tuple of ``(select_related, prefetch_related)`` lookup lists.
+
+        Walks every field's ``attribute`` (following ``__`` traversals) as
+        well as the fields of any nested ``full=True`` resources. Single-valued
+        relations reached without crossing a multi-valued one are joined via
+        ``select_related``, while anything past a ``ManyToManyField`` or
+        reverse ``ForeignKey`` is loaded via ``prefetch_related``.
+        """
+        select_related = []
+        prefetch_related = []
+
+        if cls._meta.object_class is not None:
+            cls._plan_related_fields(cls.base_fields, cls._meta.object_class, [], False, select_related, prefetch_related, [cls])
+
+        return select_related, prefetch_related
+
+    @classmethod
+    def _plan_related_fields(cls, resource_fields, model, prefix, is_many, select_related, prefetch_related, seen):
+        field_names = resource_fields.keys()
+        field_names.sort()
+
+        for field_name in field_names:
+            field_object = resource_fields[field_name]
+            attribute = getattr(field_object, 'attribute', None)
+
+            if not isinstance(attribute, basestring):
+                continue
+
+            attrs = attribute.split(LOOKUP_SEP)
+            path = list(prefix)
+            path_is_many = is_many
+            current_model = model
+
+            for attr in attrs:
+                relation_type, related_model = cls._related_model_for(current_model, attr)
+
+                if relation_type is None:
+                    break
+
+                path.append(attr)
+                path_is_many = path_is_many or relation_type == 'many'
+                current_model = related_model
+
+                if path_is_many:
+                    lookups = prefetch_related
+                else:
+                    lookups = select_related
+
+                lookup = LOOKUP_SEP.join(path)
+
+                if not lookup in lookups:
+                    lookups.append(lookup)
+            else:
+                # The whole attribute resolved to relations. If the related
+                # resource gets nested in full, plan its fields as well.
+                if not getattr(field_object, 'is_related', False) or not field_object.full:
+                    continue
+
+                related_class = field_object.to_class
+
+                if related_class in seen:
+                    # Self-referential (or otherwise cyclic) nesting.
+                    continue
+
+                cls._plan_related_fields(related_class.base_fields, current_model, path, path_is_many, select_related, prefetch_related, seen + [related_class])
+
+    @classmethod
+    def _related_model_for(cls, model, attr):
+        """
+        Given a model & an attribute name, returns a tuple of the type of the
+        relation (``'one'`` or ``'many'``) & the related model.
+
+        Returns ``(None, None)`` if the attribute isn't a relation that can be
+        loaded ahead of time.
+        """
+        opts = model._meta
+
+        try:
+            field, field_model, direct, m2m = opts.get_field_by_name(attr)
+        except FieldDoesNotExist:
+            field, direct = None, False
+
+        if field is not None and direct:
+            if getattr(field, 'rel', None) is None:
+                return None, None
+
+            if m2m:
+                return 'many', field.rel.to
+
+            return 'one', field.rel.to
+
+        # Reverse relations are accessed by their accessor name, which isn't
+        # necessarily the name ``get_field_by_name`` knows them by.
+        for related in opts.get_all_related_objects():
+            if related.get_accessor_name() == attr:
+                if not related.field.rel.multiple:
+                    # Reverse ``OneToOneField``. Leave these be.
+                    return None, None
+
+                return 'many', related.model
+
+        for related in opts.get_all_related_many_to_many_objects():
+            if related.get_accessor_name() == attr:
+                return 'many', related.model
+
+        return None, None
+
+    @classmethod
+    def connect_cache_signals(cls):
+        """
+        Connects ``invalidate_cache`` to the ``post_save`` & ``post_delete``
+        signals of ``Meta.queryset.model``, so cached data for the resource
+        expires as soon as the data changes.
+
+        Called when the class is created if ``Meta.cache_list = True``,
+        ``Meta.cache_detail = True`` or ``Meta.cache`` is anything but
+        ``NoCache``.
+
+        The dependency signals (see ``connect_dependency_signals``) are
+        connected too. Related resources may not be importable yet, so that
+        waits until the next model instance is created (any change comes
+        after one).
+        """
+        if not cls in _pending_dependency_resources:
+            _pending_dependency_resources.append(cls)
+
+        post_init.connect(connect_pending_dependency_signals, weak=False, dispatch_uid='tastypie.connect_dependency_signals')
+
+        if cls._meta.queryset is None:
+            return
+
+        model = cls._meta.queryset.model
+
+        def invalidate(sender, instance=None, **kwargs):
+            fields.get_shared_resource(cls).invalidate_cache(instance)
+
+        dispatch_uid = 'tastypie.invalidate_cache.%s.%s' % (cls.__module__, cls.__name__)
+        post_save.connect(invalidate, sender=model, weak=False, dispatch_uid=dispatch_uid)
+        post_delete.connect(invalidate, sender=model, weak=False, dispatch_uid=dispatch_uid)
+
+    @classmethod
+    def connect_dependency_signals(cls):
+        """
+        Connects receivers to the ``post_save`` & ``post_delete`` signals of
+        each model the resource depends on (see ``get_dependency_graph``) &
+        to the ``m2m_changed`` signal of each ``through`` model. They call
+        ``invalidate_dependencies`` with whatever the change touched (see
+        ``get_changed_dependencies`` & ``get_changed_memberships``).
+
+        The receivers are connected per model (with ``sender``), once for
+        every resource depending on it. No other model's changes run them.
+        """
+        embedded, fallbacks, memberships, links = cls.get_dependency_index()
+
+        for model in embedded | fallbacks | set(links.keys()):
+            dependent_resources = _dependent_resources.setdefault(model, [])
+
+            if not cls in dependent_resources:
+                dependent_resources.append(cls)
+
+            dispatch_uid = 'tastypie.invalidate_dependencies.%s' % get_model_label(model)
+            post_save.connect(invalidate_object_dependencies, sender=model, weak=False, dispatch_uid=dispatch_uid)
+            post_delete.connect(invalidate_object_dependencies, sender=model, weak=False, dispatch_uid=dispatch_uid)
+
+            if not model in links:
+                continue
+
+            _dependency_links.setdefault(model, set()).update([attname for link_field, attname, m2m_field in links[model]])
+            post_init.connect(remember_dependency_links, sender=model, weak=False, dispatch_uid=dispatch_uid)
+
+            for link_field, attname, m2m_field in links[model]:
+                if m2m_field is not None:
+                    m2m_changed.connect(invalidate_membership_dependencies, sender=model, weak=False, dispatch_uid=dispatch_uid)
+
+    @classmethod
+    def get_dependency_index(cls):
+        """
+        Rearranges the ``get_dependency_graph`` by model, for the signals &
+        ``get_object_dependencies``.
+
+        Returns a tuple of the set of models embedded through ``full=True``
+        fields, the set of models of the to-many relations that couldn't be
+        worked out, a dictionary of each model to the memberships (see
+        ``get_membership``) of its to-many relations & a dictionary of each
+        model holding memberships to a list of ``(link field, attname,
+        ManyToManyField)``.
+
+        Built once per resource class.
+        """
+        if not '_dependency_index' in cls.__dict__:
+            embedded = set()
+            fallbacks = set()
+            memberships = {}
+            links = {}
+
+            for resource_class, related_fields in cls.get_dependency_graph().items():
+                parent_model = get_resource_model(resource_class)
+
+                for field_name, to_class, full, many, membership in related_fields:
+                    model = get_resource_model(to_class)
+
+                    if full and model is not None:
+                        embedded.add(model)
+
+                    if not many:
+                        continue
+
+                    if membership is None:
+                        if model is not None:
+                            fallbacks.add(model)
+
+                        continue
+
+                    link_model, link_field, m2m_field = membership
+                    memberships.setdefault(parent_model, []).append(membership)
+                    link = (link_field, link_model._meta.get_field(link_field).attname, m2m_field)
+
+                    if not link in links.setdefault(link_model, []):
+                        links[link_model].append(link)
+
+            cls._dependency_index = (embedded, fallbacks, memberships, links)
+
+        return cls._dependency_index
+
+    def get_object_dependencies(self, obj):
+        """
+        Returns the cache keys of the versions (see ``get_dependencies``) of
+        the related objects loaded onto ``obj`` (by ``select_related``/
+        ``prefetch_related``, at any depth) that the resource embeds, along
+        with those of the membership of each one's to-many relations.
+        """
+        embedded, fallbacks, memberships, links = self.get_dependency_index()
+        dependencies = set([self.get_dependency_cache_key(get_model_label(model)) for model in fallbacks])
+        seen = set([id(obj)])
+        pending = [obj]
+
+        while pending:
+            instance = pending.pop()
+
+            if instance.pk is not None:
+                for link_model, link_field, m2m_field in memberships.get(instance.__class__, []):
+                    dependencies.add(self.get_membership_cache_key(get_model_label(link_model), link_field, instance.pk))
+
+                if instance is not obj and instance.__class__ in embedded:
+                    dependencies.add(self.get_dependency_cache_key(get_model_label(instance), instance.pk))
+
+            related = []
+
+            for name, value in instance.__dict__.items():
+                if name == '_prefetched_objects_cache':
+                    for prefetched in value.values():
+                        related.extend(getattr(prefetched, '_result_cache', None) or [])
+                elif name.endswith('_cache') and hasattr(value, '_meta') and hasattr(value, 'pk'):
+                    related.append(value)
+
+            for related_obj in related:
+                if not id(related_obj) in seen:
+                    seen.add(id(related_obj))
+                    pending.append(related_obj)
+
+        return dependencies
+
+    def get_changed_dependencies(self, sender, instance):
+        """
+        Returns the cache keys of the versions (see ``get_dependencies``) a
+        save or delete of ``instance`` (of the ``sender`` model) touches:
+        its own, if the resource embeds it, & the membership of the
+        relations it links to (through its old & new ``ForeignKey``).
+        """
+        embedded, fallbacks, memberships, links = self.get_dependency_index()
+        label = get_model_label(sender)
+        keys = set()
+
+        if sender in embedded and instance.pk is not None:
+            keys.add(self.get_dependency_cache_key(label, instance.pk))
+
+        if sender in fallbacks:
+            keys.add(self.get_dependency_cache_key(label))
+
+        # Remembered by ``remember_dependency_links``.
+        originals = instance.__dict__.get('_tastypie_links', {})
+
+        for link_field, attname, m2m_field in links.get(sender, []):
+            for pk in set([getattr(instance, attname), originals.get(attname)]):
+                if pk is not None:
+                    keys.add(self.get_membership_cache_key(label, link_field, pk))
+
+        return keys
+
+    def get_changed_memberships(self, sender, instance, action, reverse, pk_set):
+        """
+        Returns the cache keys of the membership versions (see
+        ``get_dependencies``) an ``m2m_changed`` signal from the ``through``
+        model ``sender`` touches.
+
+        The changed side is known from the signal, except when clearing from
+        the other side, where it's looked up before the links are gone.
+        """
+        embedded, fallbacks, memberships, links = self.get_dependency_index()
+        label = get_model_label(sender)
+        keys = set()
+
+        for link_field, attname, m2m_field in links.get(sender, []):
+            if m2m_field is None:
+                continue
+
+            if reverse:
+                instance_field = m2m_field.m2m_reverse_field_name()
+            else:
+                instance_field = m2m_field.m2m_field_name()
+
+            other_field = m2m_field.m2m_field_name()
+
+            if other_field == link_field:
+                other_field = m2m_field.m2m_reverse_field_name()
+
+            # Links between objects of the same model go both ways.
+            symmetrical = m2m_field.rel.symmetrical and m2m_field.rel.to == m2m_field.model
+            pks = set()
+
+            if instance_field == link_field or symmetrical:
+                if action in ('post_add', 'post_remove', 'post_clear'):
+                    pks.add(instance.pk)
+
+            if instance_field == other_field or symmetrical:
+                if action in ('post_add', 'post_remove'):
+                    pks.update(pk_set or [])
+                elif action == 'pre_clear':
+                    pks.update(sender._default_manager.filter(**{other_field: instance.pk}).values_list(link_field, flat=True))
+
+            for pk in pks:
+                keys.add(self.get_membership_cache_key(label, link_field, pk))
+
+        return keys
+
+    def apply_related_query_plan(self, object_list):
+        """
+        Applies the lookups from ``build_related_query_plan`` to the provided
+        ``QuerySet``, so that dehydrating a page of objects costs a fixed
+        number of queries.
+
+        The plan is built once per resource class & reused from then on.
+        Disabled by setting ``Meta.plan_related_queries = False``.
+        """
+        if not self._meta.plan_related_queries:
+            return object_list
+
+        if not hasattr(object_list, 'select_related'):
+            # Not a ``QuerySet``. Nothing we can do.
+            return object_list
+
+        klass = self.__class__
+
+        if not '_related_query_plan' in klass.__dict__:
+            klass._related_query_plan = klass.build_related_query_plan()
+
+        select_related, prefetch_related = klass._related_query_plan
+
+        if select_related:
+            object_list = object_list.select_related(*select_related)
+
+        # ``prefetch_related`` only exists in Django 1.4+.
+        if prefetch_related and hasattr(object_list, 'prefetch_related'):
+            object_list = object_list.prefetch_related(*prefetch_related)
+
+        return object_list
+
+    def iter_objects(self, objects):
+        """
+        A ORM-specific implementation of ``iter_objects``.
+
+        ``iterator()`` skips ``prefetch_related``, so objects are read in
+        chunks of ``Meta.stream_chunk_size`` & the prefetching is done one
+        chunk at a time.
+        """
+        lookups = getattr(objects, '_prefetch_related_lookups', None)
+
+        if not hasattr(objects, 'iterator') or not lookups:
+            return super(ModelResource, self).iter_objects(objects)
+
+        return self._iter_prefetched_chunks(objects.iterator(), lookups)
+
+    def _iter_prefetched_chunks(self, iterator, lookups):
+        chunk_size = max(1, self._meta.stream_chunk_size)
+
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+
+            if not chunk:
+                break
+
+            prefetch_related_objects(chunk, lookups)
+
+            for obj in chunk:
+                yield obj
+
+    def get_list_validators(self, request, objects):
+        """
+        A ORM-specific implementation of ``get_list_validators``.
+
+        Summarizes the filtered ``QuerySet`` with one aggregate query: the
+        ``COUNT(*)`` & the ``MAX()`` of the primary key (so insertions &
+        deletions are noticed), the ``MAX()`` of the
+        ``Meta.last_modified_attribute`` & the ``SUM()`` of the
+        ``Meta.version_attribute`` (so a bump to any object is noticed).
+
+        Only the ``ETag`` is returned. The ``MAX()`` of the
+        ``Meta.last_modified_attribute`` doesn't change when an object is
+        deleted, so on its own it can't answer ``If-Modified-Since``.
+        """
+        if not self._meta.last_modified_attribute and not self._meta.version_attribute:
+            return None, None
+
+        if not hasattr(objects, 'aggregate'):
+            return super(ModelResource, self).get_list_validators(request, objects)
+
+        aggregates = {
+            'count': Count('pk'),
+            'latest_pk': Max('pk'),
+        }
+
+        if self._meta.last_modified_attribute:
+            aggregates['last_modified'] = Max(self._meta.last_modified_attribute)
+
+        if self._meta.version_attribute:
+            aggregates['version'] = Sum(self._meta.version_attribute)
+
+        summary = objects.aggregate(**aggregates)
+        etag = self.build_etag(request, summary['count'], summary['latest_pk'], summary.get('version'), summary.get('last_modified'))
+        return etag, None
+
     def obj_get_list(self, request=None, **kwargs):
         """
         A ORM-specific implementation of ``obj_get_list``.
@@ -1756,6 +3460,7 @@ class ModelResource(Resource):
 
         try:
             base_object_list = self.apply_filters(request, applicable_filters)
+            base_object_list = self.apply_related_query_plan(base_object_list)
             return self.apply_authorization_limits(request, base_object_list)
         except ValueError:
             raise BadRequest("Invalid resource lookup data provided (mismatched type).")
@@ -1769,6 +3474,7 @@ class ModelResource(Resource):
         """
         try:
             base_object_list = self.get_object_list(request).filter(**kwargs)
+            base_object_list = self.apply_related_query_plan(base_object_list)
             object_list = self.apply_authorization_limits(request, base_object_list)
             stringified_kwargs = ', '.join(["%s=%s" % (k, v) for k, v in kwargs.items()])
 
@@ -1781,6 +3487,44 @@ class ModelResource(Resource):
         except ValueError:
             raise NotFound("Invalid resource lookup data provided (mismatched type).")
 
+    def obj_get_many(self, request=None, pk_list=None):
+        """
+        A ORM-specific implementation of ``obj_get_many``.
+
+        Fetches all the objects in ``pk_list`` with a single ``pk__in`` query,
+        applying the related query plan & the authorization limits once for
+        the whole batch.
+
+        If ``obj_get`` has been overridden (i.e. to filter further or check
+        each object), it's called once per identifier instead, so the
+        override still applies.
+        """
+        if self.__class__.obj_get.im_func is not ModelResource.obj_get.im_func:
+            return super(ModelResource, self).obj_get_many(request, pk_list=pk_list)
+
+        pk_field = self._meta.object_class._meta.pk
+        lookup = {}
+
+        for pk in pk_list or []:
+            try:
+                lookup[pk] = pk_field.to_python(pk)
+            except ValidationError:
+                # Can't possibly match. It'll be reported as not found.
+                continue
+
+        if not lookup:
+            return {}
+
+        try:
+            base_object_list = self.get_object_list(request).filter(pk__in=set(lookup.values()))
+            base_object_list = self.apply_related_query_plan(base_object_list)
+            object_list = self.apply_authorization_limits(request, base_object_list)
+            found = dict([(obj.pk, obj) for obj in object_list])
+        except ValueError:
+            raise NotFound("Invalid resource lookup data provided (mismatched type).")
+
+        return dict([(pk, found[value]) for pk, value in lookup.items() if value in found])
+
     def obj_create(self, bundle, request=None, **kwargs):
         """
         A ORM-specific implementation of ``obj_create``.
@@ -1975,7 +3719,9 @@ class ModelResource(Resource):
         """
         Handles generating a resource URI for a single resource.
 
-        Uses the model's ``pk`` in order to create the URI.
+        Uses the model's ``pk`` in order to create the URI. The URI is
+        compiled into a template once, so only the ``pk`` gets filled in per
+        object.
         """
         kwargs = {
             'resource_name': self._meta.resource_name,
@@ -1989,7 +3735,7 @@ class ModelResource(Resource):
         if self._meta.api_name is not None:
             kwargs['api_name'] = self._meta.api_name
 
-        return self._build_reverse_url("api_dispatch_detail", kwargs=kwargs)
+        return self._build_templated_url("api_dispatch_detail", kwargs=kwargs, placeholder='pk')
 
 
 class NamespacedModelResource(ModelResource):
@@ -2001,6 +3747,154 @@ class NamespacedModelResource(ModelResource):
         return reverse(namespaced, args=args, kwargs=kwargs)
 
 
+def get_model_label(model):
+    """
+    Returns the ``app_label.modelname`` of a model (or model instance).
+    """
+    return "%s.%s" % (model._meta.app_label, model._meta.object_name.lower())
+
+
+def get_resource_model(resource_class):
+    """
+    Returns the model of a resource class's ``Meta.queryset``, or ``None``.
+    """
+    return getattr(getattr(resource_class._meta, 'queryset', None), 'model', None)
+
+
+def get_membership(model, attribute):
+    """
+    Given a model & the attribute of one of its to-many relations, returns
+    where the membership of the relation is stored: a tuple of the model
+    holding it (the child model of a reverse ``ForeignKey`` or the
+    ``through`` model of a ``ManyToManyField``), the name of its
+    ``ForeignKey`` to ``model`` & the ``ManyToManyField`` (or ``None``).
+
+    Returns ``None`` if the attribute isn't a to-many relation.
+    """
+    opts = model._meta
+
+    try:
+        field, field_model, direct, m2m = opts.get_field_by_name(attribute)
+    except FieldDoesNotExist:
+        field, direct, m2m = None, False, False
+
+    if direct and m2m:
+        return (field.rel.through, field.m2m_field_name(), field)
+
+    # Reverse relations are accessed by their accessor name, which isn't
+    # necessarily the name ``get_field_by_name`` knows them by.
+    for related in opts.get_all_related_objects():
+        if related.get_accessor_name() == attribute and related.field.rel.multiple:
+            return (related.model, related.field.name, None)
+
+    for related in opts.get_all_related_many_to_many_objects():
+        if related.get_accessor_name() == attribute:
+            return (related.field.rel.through, related.field.m2m_reverse_field_name(), related.field)
+
+    return None
+
+
+def connect_pending_dependency_signals(sender, instance=None, **kwargs):
+    """
+    Connects the dependency signals of the resource classes created since
+    the last call (see ``ModelResource.connect_dependency_signals``), then
+    stops listening to ``post_init`` until there are more.
+    """
+    post_init.disconnect(dispatch_uid='tastypie.connect_dependency_signals')
+
+    while _pending_dependency_resources:
+        _pending_dependency_resources.pop(0).connect_dependency_signals()
+
+    # Too late for its own ``post_init``.
+    remember_dependency_links(sender, instance)
+
+
+def remember_dependency_links(sender, instance=None, **kwargs):
+    """
+    Remembers the values of the ``ForeignKey`` fields of ``instance`` that
+    memberships depend on, so the old one is known when they change.
+    """
+    attnames = _dependency_links.get(sender)
+
+    if attnames:
+        instance.__dict__['_tastypie_links'] = dict([(attname, instance.__dict__.get(attname)) for attname in attnames])
+
+
+def invalidate_object_dependencies(sender, instance=None, **kwargs):
+    """
+    Expires what depended on ``instance``, for every resource depending on
+    its model (see ``ModelResource.get_changed_dependencies``).
+    """
+    for resource_class in _dependent_resources.get(sender, []):
+        resource = fields.get_shared_resource(resource_class)
+        resource.invalidate_dependencies(resource.get_changed_dependencies(sender, instance))
+
+    remember_dependency_links(sender, instance)
+
+
+def invalidate_membership_dependencies(sender, instance=None, action=None, reverse=False, pk_set=None, **kwargs):
+    """
+    Expires what depended on the membership changed by an ``m2m_changed``
+    signal, for every resource depending on the ``through`` model (see
+    ``ModelResource.get_changed_memberships``).
+    """
+    for resource_class in _dependent_resources.get(sender, []):
+        resource = fields.get_shared_resource(resource_class)
+        resource.invalidate_dependencies(resource.get_changed_memberships(sender, instance, action, reverse, pk_set))
+
+
+def fragment_data(data):
+    """
+    Copies dehydrated ``data`` for caching, swapping any nested ``Bundle``
+    (from ``full=True`` related fields) for one holding just its data.
+
+    The originals carry the object & the request, which may not pickle.
+    """
+    if isinstance(data, Bundle):
+        return Bundle(data=fragment_data(data.data))
+
+    if isinstance(data, dict):
+        return dict([(key, fragment_data(value)) for key, value in data.items()])
+
+    if isinstance(data, (list, tuple)):
+        return [fragment_data(value) for value in data]
+
+    return data
+
+
+class ClosingIterator(object):
+    """
+    Wraps the content of a streaming response, calling ``on_close`` (once)
+    when the response is closed or the content runs out, whichever is first.
+    """
+    def __init__(self, iterable, on_close):
+        self.iterable = iterable
+        self.iterator = iter(iterable)
+        self.on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        try:
+            return self.iterator.next()
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        if self.on_close is None:
+            return
+
+        on_close, self.on_close = self.on_close, None
+
+        try:
+            if hasattr(self.iterable, 'close'):
+                self.iterable.close()
+        finally:
+            on_close()
+
+
 # Based off of ``piston.utils.coerce_put_post``. Similarly BSD-licensed.
 # And no, the irony is not lost on me.
 def convert_post_to_VERB(request, verb):
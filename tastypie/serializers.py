@@ -154,25 +154,49 @@ class Serializer(object):
 
         return data.isoformat()
 
-    def serialize(self, bundle, format='application/json', options={}):
-        """
-        Given some data and a format, calls the correct method to serialize
-        the data and returns the result.
+    def get_desired_format(self, format):
         """
-        desired_format = None
+        Given a MIME type, determines the short format name with a ``to_``
+        method available for it.
 
+        Raises ``UnsupportedFormat`` if there isn't one.
+        """
         for short_format, long_format in self.content_types.items():
             if format == long_format:
                 if hasattr(self, "to_%s" % short_format):
-                    desired_format = short_format
-                    break
+                    return short_format
 
-        if desired_format is None:
-            raise UnsupportedFormat("The format indicated '%s' had no available serialization method. Please check your ``formats`` and ``content_types`` on your Serializer." % format)
+        raise UnsupportedFormat("The format indicated '%s' had no available serialization method. Please check your ``formats`` and ``content_types`` on your Serializer." % format)
 
+    def serialize(self, bundle, format='application/json', options={}):
+        """
+        Given some data and a format, calls the correct method to serialize
+        the data and returns the result.
+        """
+        desired_format = self.get_desired_format(format)
         serialized = getattr(self, "to_%s" % desired_format)(bundle, options)
         return serialized
 
+    def serialize_stream(self, bundle, format='application/json', options={}):
+        """
+        Given some data and a format, returns an iterable of chunks of the
+        serialized data, suitable for a streaming response.
+
+        Any iterators within the data (such as a generator of bundles for
+        the ``objects``) are only consumed as the chunks are, so the data
+        never has to be in memory all at once.
+
+        Calls ``to_<format>_stream`` if available. Other formats fall back to
+        serializing everything at once via ``serialize``.
+        """
+        desired_format = self.get_desired_format(format)
+        method = getattr(self, "to_%s_stream" % desired_format, None)
+
+        if method is None:
+            return [self.serialize(materialize(bundle), format, options)]
+
+        return method(bundle, options)
+
     def deserialize(self, content, format='application/json'):
         """
         Given some data and a format, calls the correct method to deserialize
@@ -331,6 +355,45 @@ class Serializer(object):
         data = self.to_simple(data, options)
         return simplejson.dumps(data, cls=json.DjangoJSONEncoder, sort_keys=True)
 
+    def to_json_stream(self, data, options=None):
+        """
+        Given some Python data, produces JSON output in chunks.
+
+        Iterators within the data are written out one item at a time. The
+        output is the same as ``to_json``.
+        """
+        options = options or {}
+
+        if isinstance(data, dict) and contains_iterator(data):
+            yield '{'
+
+            for index, key in enumerate(sorted(data.keys())):
+                prefix = ''
+
+                if index:
+                    prefix = ', '
+
+                yield '%s%s: ' % (prefix, simplejson.dumps(key))
+
+                for chunk in self.to_json_stream(data[key], options):
+                    yield chunk
+
+            yield '}'
+        elif is_iterator(data):
+            yield '['
+
+            for index, item in enumerate(data):
+                serialized = self.to_json(item, options)
+
+                if index:
+                    serialized = ', %s' % serialized
+
+                yield serialized
+
+            yield ']'
+        else:
+            yield self.to_json(data, options)
+
     def from_json(self, content):
         """
         Given some JSON data, returns a Python dictionary of the decoded data.
@@ -345,6 +408,19 @@ class Serializer(object):
         options = options or {}
         return '%s(%s)' % (options['callback'], self.to_json(data, options))
 
+    def to_jsonp_stream(self, data, options=None):
+        """
+        Given some Python data, produces JSON output in chunks, wrapped in the
+        provided callback.
+        """
+        options = options or {}
+        yield '%s(' % options['callback']
+
+        for chunk in self.to_json_stream(data, options):
+            yield chunk
+
+        yield ')'
+
     def to_xml(self, data, options=None):
         """
         Given some Python data, produces XML output.
@@ -356,6 +432,56 @@ class Serializer(object):
 
         return tostring(self.to_etree(data, options), xml_declaration=True, encoding='utf-8')
 
+    def to_xml_stream(self, data, options=None):
+        """
+        Given some Python data, produces XML output in chunks.
+
+        Iterators within the data are written out one element at a time.
+        """
+        options = options or {}
+
+        if lxml is None:
+            raise ImproperlyConfigured("Usage of the XML aspects requires lxml.")
+
+        return self.to_etree_stream(data, options, declaration=True)
+
+    def to_etree_stream(self, data, options=None, name=None, depth=0, declaration=False):
+        """
+        Given some data, produces chunks of the XML output, consuming any
+        iterators within the data as it goes.
+
+        Mirrors the structure produced by ``to_etree``.
+        """
+        if declaration:
+            yield "<?xml version='1.0' encoding='utf-8'?>\n"
+
+        if is_iterator(data):
+            if name:
+                yield '<%s type="list">' % name
+            else:
+                name = 'objects'
+                yield '<objects>'
+
+            for item in data:
+                yield tostring(self.to_etree(item, options, depth=depth+1), encoding='utf-8', xml_declaration=False)
+
+            yield '</%s>' % name
+        elif isinstance(data, dict) and contains_iterator(data):
+            if depth == 0:
+                name = name or 'response'
+                yield '<%s>' % name
+            else:
+                name = name or 'object'
+                yield '<%s type="hash">' % name
+
+            for (key, value) in data.iteritems():
+                for chunk in self.to_etree_stream(value, options, name=key, depth=depth+1):
+                    yield chunk
+
+            yield '</%s>' % name
+        else:
+            yield tostring(self.to_etree(data, options, name=name, depth=depth), encoding='utf-8', xml_declaration=False)
+
     def from_xml(self, content):
         """
         Given some XML data, returns a Python dictionary of the decoded data.
@@ -426,6 +552,42 @@ class Serializer(object):
         """
         pass
 
+def is_iterator(data):
+    """
+    Determines if the data is a (lazy) iterator, such as a generator, rather
+    than a list-like object.
+    """
+    return hasattr(data, '__iter__') and hasattr(data, 'next')
+
+
+def contains_iterator(data):
+    """
+    Determines if a dictionary holds any iterators, at any depth.
+    """
+    for value in data.itervalues():
+        if is_iterator(value):
+            return True
+
+        if isinstance(value, dict) and contains_iterator(value):
+            return True
+
+    return False
+
+
+def materialize(data):
+    """
+    Replaces any iterators within the data (at any depth within
+    dictionaries) with lists, for formats that can't be streamed.
+    """
+    if is_iterator(data):
+        return [materialize(item) for item in data]
+
+    if isinstance(data, dict):
+        return dict((key, materialize(value)) for (key, value) in data.iteritems())
+
+    return data
+
+
 def get_type_string(data):
     """
     Translates a Python data type into a string format.
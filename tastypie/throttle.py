@@ -1,5 +1,12 @@
+import atexit
+import logging
+import math
+import os
+import threading
 import time
 from django.core.cache import cache
+from django.core.signals import request_finished
+from tastypie.cache import LRUCache
 
 
 class BaseThrottle(object):
@@ -18,8 +25,15 @@ class BaseThrottle(object):
           1 hour).
         * ``expiration`` - the length of time to retain the times the user
           has accessed the api in the cache. Default is 604800 (1 week).
+        * ``per_resource`` - whether the user gets a separate limit for each
+          resource. Default is ``False``.
+        * ``per_method`` - whether the user gets a separate limit for each
+          HTTP method. Default is ``False``.
+    
+    Requests count as one access each, unless the resource passes a
+    ``cost`` (see ``Resource.get_throttle_cost``).
     """
-    def __init__(self, throttle_at=150, timeframe=3600, expiration=None):
+    def __init__(self, throttle_at=150, timeframe=3600, expiration=None, per_resource=False, per_method=False):
         self.throttle_at = throttle_at
         # In seconds, please.
         self.timeframe = timeframe
@@ -29,6 +43,8 @@ class BaseThrottle(object):
             expiration = 604800
         
         self.expiration = int(expiration)
+        self.per_resource = per_resource
+        self.per_method = per_method
     
     def convert_identifier_to_key(self, identifier):
         """
@@ -44,6 +60,22 @@ class BaseThrottle(object):
         safe_string = ''.join(bits)
         return "%s_accesses" % safe_string
     
+    def get_bucket(self, identifier, resource_name=None, request_method=None, **kwargs):
+        """
+        Returns the identifier the access is counted against: the user's,
+        narrowed to the resource and/or HTTP method if ``per_resource`` or
+        ``per_method`` are set.
+        """
+        bits = [identifier]
+        
+        if self.per_resource and resource_name:
+            bits.append(resource_name)
+        
+        if self.per_method and request_method:
+            bits.append(request_method)
+        
+        return '_'.join(bits)
+    
     def should_be_throttled(self, identifier, **kwargs):
         """
         Returns whether or not the user has exceeded their throttle limit.
@@ -60,6 +92,60 @@ class BaseThrottle(object):
         Does nothing in this implementation.
         """
         pass
+    
+    def consume(self, identifier, **kwargs):
+        """
+        Decides whether the user should be throttled & records their access,
+        in one step. Returns ``True`` if they should be throttled (in which
+        case nothing is recorded), otherwise ``False``.
+        
+        This calls ``should_be_throttled``, then ``accessed``, so throttles
+        that only implement those keep working. Subclasses override it to do
+        both in a single trip to the cache.
+        
+        Subclasses may also fill in a ``status`` dictionary, if passed one,
+        from what they read (see ``get_status``).
+        """
+        if self.should_be_throttled(identifier, **kwargs):
+            return True
+        
+        self.accessed(identifier, **kwargs)
+        return False
+    
+    def has_custom_checks(self, klass):
+        """
+        Returns whether ``should_be_throttled`` or ``accessed`` have been
+        overridden in a subclass of ``klass``.
+        
+        If so, the combined ``consume`` of ``klass`` would skip them, so it
+        should fall back to calling them instead.
+        """
+        for name in ('should_be_throttled', 'accessed'):
+            if getattr(self.__class__, name).im_func is not getattr(klass, name).im_func:
+                return True
+        
+        return False
+    
+    def update_status(self, status, remaining, reset, retry_after=None):
+        """
+        Fills in the ``status`` dictionary passed to ``consume`` (if any)
+        with:
+        
+            * ``limit`` - ``throttle_at``.
+            * ``remaining`` - how many more accesses the user may make.
+            * ``reset`` - when (as a Unix timestamp) more become available.
+            * ``retry_after`` - if they're throttled, how many seconds until
+              they may try again.
+        """
+        if status is None:
+            return
+        
+        status['limit'] = int(self.throttle_at)
+        status['remaining'] = max(0, int(remaining))
+        status['reset'] = int(math.ceil(reset))
+        
+        if retry_after is not None:
+            status['retry_after'] = max(1, int(math.ceil(retry_after)))
 
 
 class CacheThrottle(BaseThrottle):
@@ -76,17 +162,16 @@ class CacheThrottle(BaseThrottle):
         Returns ``False`` if the user should NOT be throttled or ``True`` if
         the user should be throttled.
         """
-        key = self.convert_identifier_to_key(identifier)
+        key = self.convert_identifier_to_key(self.get_bucket(identifier, **kwargs))
         
         # Make sure something is there.
         cache.add(key, [])
         
         # Weed out anything older than the timeframe.
-        minimum_time = int(time.time()) - int(self.timeframe)
-        times_accessed = [access for access in cache.get(key) if access >= minimum_time]
+        times_accessed, total_cost = self.get_recent_accesses(cache.get(key))
         cache.set(key, times_accessed, self.expiration)
         
-        if len(times_accessed) >= int(self.throttle_at):
+        if total_cost >= int(self.throttle_at):
             # Throttle them.
             return True
         
@@ -99,10 +184,106 @@ class CacheThrottle(BaseThrottle):
         
         Stores the current timestamp in the "accesses" list within the cache.
         """
-        key = self.convert_identifier_to_key(identifier)
+        key = self.convert_identifier_to_key(self.get_bucket(identifier, **kwargs))
         times_accessed = cache.get(key, [])
-        times_accessed.append(int(time.time()))
+        times_accessed.append(self.make_access(kwargs.get('cost', 1)))
         cache.set(key, times_accessed, self.expiration)
+    
+    def consume(self, identifier, **kwargs):
+        """
+        Decides whether the user should be throttled & records their access,
+        reading & writing the "accesses" list just once.
+        """
+        if self.has_custom_checks(CacheThrottle):
+            return super(CacheThrottle, self).consume(identifier, **kwargs)
+        
+        return self._consume(identifier, **kwargs)
+    
+    def get_recent_accesses(self, times_accessed):
+        """
+        Weeds out anything older than the timeframe from an "accesses" list.
+        Returns the rest, plus their total cost.
+        
+        Accesses are stored as timestamps or, if they cost more than one,
+        ``(timestamp, cost)`` pairs.
+        """
+        minimum_time = int(time.time()) - int(self.timeframe)
+        recent = []
+        total_cost = 0
+        
+        for access in times_accessed:
+            accessed, cost = self.split_access(access)
+            
+            if accessed >= minimum_time:
+                recent.append(access)
+                total_cost += cost
+        
+        return recent, total_cost
+    
+    def split_access(self, access):
+        """
+        Returns the timestamp & cost of an entry in the "accesses" list.
+        """
+        if isinstance(access, tuple):
+            return access
+        
+        return access, 1
+    
+    def make_access(self, cost=1):
+        """
+        Returns an entry for the "accesses" list, for an access now.
+        """
+        if cost == 1:
+            return int(time.time())
+        
+        return (int(time.time()), cost)
+    
+    def _consume(self, identifier, **kwargs):
+        cost = kwargs.get('cost', 1)
+        key = self.convert_identifier_to_key(self.get_bucket(identifier, **kwargs))
+        times_accessed, total_cost = self.get_recent_accesses(cache.get(key, []))
+        
+        if total_cost >= int(self.throttle_at):
+            self.update_accesses_status(kwargs.get('status'), times_accessed, total_cost, throttled=True)
+            return True
+        
+        times_accessed.append(self.make_access(cost))
+        cache.set(key, times_accessed, self.expiration)
+        self.update_accesses_status(kwargs.get('status'), times_accessed, total_cost + cost)
+        return False
+    
+    def update_accesses_status(self, status, times_accessed, total_cost, throttled=False):
+        """
+        Fills in the ``status`` from the user's recent accesses.
+        
+        More become available as each access falls out of the timeframe, so
+        ``reset`` is when the oldest does. If they're throttled, they may try
+        again once enough have to take them under the limit.
+        """
+        if status is None:
+            return
+        
+        now = int(time.time())
+        # Accesses are kept while they're no older than the timeframe.
+        lifetime = int(self.timeframe) + 1
+        reset = now + lifetime
+        retry_after = None
+        
+        if times_accessed:
+            reset = self.split_access(times_accessed[0])[0] + lifetime
+        
+        if throttled:
+            remaining_cost = total_cost
+            
+            for access in times_accessed:
+                accessed, cost = self.split_access(access)
+                remaining_cost -= cost
+                
+                if remaining_cost < int(self.throttle_at):
+                    retry_after = accessed + lifetime - now
+                    break
+        
+        self.update_status(status, int(self.throttle_at) - total_cost, reset, retry_after)
 
 
 class CacheDBThrottle(CacheThrottle):
@@ -112,7 +293,43 @@ class CacheDBThrottle(CacheThrottle):
     
     This is useful for tracking/aggregating usage through time, to possibly
     build a statistics interface or a billing mechanism.
+    
+    By default, each access is written as it happens. Accepts a few more
+    optional kwargs to buffer them in process & write them in batches
+    instead::
+    
+        * ``buffer_size`` - the number of accesses to buffer before writing
+          them. Default is 0 (don't buffer).
+        * ``flush_interval`` - how often (in seconds) to write out buffered
+          accesses, however few. Default is 5 seconds.
+        * ``max_buffer_size`` - the most accesses to hold (i.e. while the
+          database is down). Past this, the oldest are dropped. Default is
+          10000.
+        * ``flush_thread`` - whether to write them from a background thread
+          every ``flush_interval`` seconds. If ``False``, it's only checked at
+          the end of each request. Default is ``True``.
+    
+    Whatever is left is written when the process exits.
     """
+    # The most rows to write per ``bulk_create`` (some databases, like SQLite,
+    # limit the size of a query).
+    flush_batch_size = 100
+    
+    def __init__(self, throttle_at=150, timeframe=3600, expiration=None, buffer_size=0, flush_interval=5, max_buffer_size=10000, flush_thread=True, per_resource=False, per_method=False):
+        super(CacheDBThrottle, self).__init__(throttle_at=throttle_at, timeframe=timeframe, expiration=expiration, per_resource=per_resource, per_method=per_method)
+        self.buffer_size = int(buffer_size)
+        self.flush_interval = flush_interval
+        self.max_buffer_size = max(int(max_buffer_size), self.buffer_size)
+        self.flush_thread = flush_thread
+        self.dropped = 0
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.time()
+        self._retry_at = 0
+        self._pid = None
+        self._registered = False
+    
     def accessed(self, identifier, **kwargs):
         """
         Handles recording the user's access.
@@ -120,13 +337,449 @@ class CacheDBThrottle(CacheThrottle):
         Does everything the ``CacheThrottle`` class does, plus logs the
         access within the database using the ``ApiAccess`` model.
         """
+        super(CacheDBThrottle, self).accessed(identifier, **kwargs)
+        self.log_access(identifier, **kwargs)
+    
+    def consume(self, identifier, **kwargs):
+        """
+        Decides whether the user should be throttled & records their access,
+        like ``CacheThrottle``, plus logs the access within the database.
+        """
+        if self.has_custom_checks(CacheDBThrottle):
+            return BaseThrottle.consume(self, identifier, **kwargs)
+        
+        if self._consume(identifier, **kwargs):
+            return True
+        
+        self.log_access(identifier, **kwargs)
+        return False
+    
+    def log_access(self, identifier, **kwargs):
+        """
+        Logs the access within the database using the ``ApiAccess`` model.
+        """
         # Do the import here, instead of top-level, so that the model is
         # only required when using this throttling mechanism.
         from tastypie.models import ApiAccess
-        super(CacheDBThrottle, self).accessed(identifier, **kwargs)
-        # Write out the access to the DB for logging purposes.
-        ApiAccess.objects.create(
+        
+        if not self.buffer_size:
+            # Write out the access to the DB for logging purposes.
+            ApiAccess.objects.create(
+                identifier=identifier,
+                url=kwargs.get('url', ''),
+                request_method=kwargs.get('request_method', '')
+            )
+            return
+        
+        # ``bulk_create`` skips ``ApiAccess.save``, so set the time here.
+        self.buffer_access(ApiAccess(
             identifier=identifier,
             url=kwargs.get('url', ''),
-            request_method=kwargs.get('request_method', '')
-        )
+            request_method=kwargs.get('request_method', ''),
+            accessed=int(time.time())
+        ))
+    
+    def buffer_access(self, access):
+        """
+        Adds an unsaved ``ApiAccess`` to the buffer, writing the buffer out
+        once it holds ``buffer_size`` accesses.
+        """
+        self._buffer_lock.acquire()
+        
+        try:
+            if self._pid != os.getpid():
+                self._start()
+            
+            self._buffer.append(access)
+            self._trim_buffer()
+            # After a failed write, wait for ``flush_if_due`` to retry.
+            full = len(self._buffer) >= self.buffer_size and time.time() >= self._retry_at
+        finally:
+            self._buffer_lock.release()
+        
+        if full:
+            self.flush()
+    
+    def flush_if_due(self, **kwargs):
+        """
+        Writes out the buffered accesses if the oldest have been held for
+        ``flush_interval`` seconds.
+        
+        Connected to Django's ``request_finished`` signal.
+        """
+        if self._buffer and time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self):
+        """
+        Writes out the buffered accesses, ``flush_batch_size`` at a time.
+        
+        If writing fails, the accesses that weren't written are put back to
+        be tried again after ``flush_interval`` seconds. Returns the number
+        written.
+        """
+        self._flush_lock.acquire()
+        
+        try:
+            self._buffer_lock.acquire()
+            
+            try:
+                accesses, self._buffer = self._buffer, []
+                self._last_flush = time.time()
+            finally:
+                self._buffer_lock.release()
+            
+            written = 0
+            
+            try:
+                while written < len(accesses):
+                    batch = accesses[written:written + self.flush_batch_size]
+                    self.save_accesses(batch)
+                    written += len(batch)
+                
+                self._retry_at = 0
+            except Exception:
+                # Put back first, so nothing is lost if logging fails too.
+                self._retry_at = time.time() + self.flush_interval
+                self._requeue(accesses[written:])
+                log = logging.getLogger('django.request.tastypie')
+                log.exception('Failed to write %d API accesses.' % (len(accesses) - written))
+            
+            return written
+        finally:
+            self._flush_lock.release()
+    
+    def save_accesses(self, accesses):
+        """
+        Writes a batch of unsaved ``ApiAccess`` objects to the database.
+        
+        Uses ``bulk_create`` where available (Django 1.4+), otherwise one
+        ``INSERT`` per access in a single transaction.
+        """
+        from django.db import models, transaction
+        from tastypie.models import ApiAccess
+        
+        if hasattr(ApiAccess.objects, 'bulk_create'):
+            ApiAccess.objects.bulk_create(accesses)
+            return
+        
+        def insert_all():
+            for access in accesses:
+                # Skips ``ApiAccess.save``, which would overwrite the time.
+                models.Model.save(access, force_insert=True)
+        
+        transaction.commit_on_success(insert_all)()
+    
+    def _requeue(self, accesses):
+        self._buffer_lock.acquire()
+        
+        try:
+            self._buffer[0:0] = accesses
+            self._trim_buffer()
+        finally:
+            self._buffer_lock.release()
+    
+    def _trim_buffer(self):
+        # Drop the oldest accesses, rather than grow without bound.
+        overflow = len(self._buffer) - self.max_buffer_size
+        
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+    
+    def _start(self):
+        # Called on the first buffered access in each process. A forked
+        # worker inherits its parent's buffer (which the parent writes) but
+        # not its thread.
+        self._pid = os.getpid()
+        self._buffer = []
+        self._last_flush = time.time()
+        
+        if not self._registered:
+            self._registered = True
+            atexit.register(self.flush)
+            request_finished.connect(self.flush_if_due, weak=False, dispatch_uid='tastypie.throttle.flush.%s' % id(self))
+        
+        if self.flush_thread:
+            thread = threading.Thread(target=self._run)
+            thread.setDaemon(True)
+            thread.start()
+    
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self._flush_in_background()
+    
+    def _flush_in_background(self):
+        # Anything unwritten has been put back by ``flush`` for the next
+        # attempt, so log the error & keep the thread going.
+        try:
+            self.flush_if_due()
+        except Exception:
+            log = logging.getLogger('django.request.tastypie')
+            log.exception('Failed to flush the buffered API accesses.')
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    A throttling mechanism that counts accesses in the cache, in constant
+    time per request.
+    
+    Keeps a counter per user for each ``timeframe``-long window. The last
+    ``timeframe`` seconds are approximated by the current window's count,
+    plus the previous window's weighted by how much of it they overlap.
+    
+    Counting uses ``cache.incr``, which is atomic on backends that support
+    it (i.e. memcached). Counters expire after two windows, so
+    ``expiration`` is unused.
+    """
+    def __init__(self, throttle_at=150, timeframe=3600, expiration=None, per_resource=False, per_method=False):
+        super(SlidingWindowThrottle, self).__init__(throttle_at=throttle_at, timeframe=timeframe, expiration=expiration, per_resource=per_resource, per_method=per_method)
+        self.previous_counts = LRUCache(size=10000)
+    
+    def get_window_keys(self, identifier, **kwargs):
+        """
+        Returns the cache keys of the current & previous windows' counters,
+        plus the weight of the previous window.
+        """
+        now = time.time()
+        timeframe = int(self.timeframe)
+        window = int(now // timeframe)
+        key = self.convert_identifier_to_key(self.get_bucket(identifier, **kwargs))
+        weight = 1.0 - (now - window * timeframe) / float(timeframe)
+        return "%s_%s" % (key, window), "%s_%s" % (key, window - 1), weight
+    
+    def get_count(self, counts, current_key, previous_key, weight):
+        """
+        Estimates the number of accesses in the last ``timeframe`` seconds
+        from the windows' ``counts``.
+        """
+        return counts.get(current_key, 0) + counts.get(previous_key, 0) * weight
+    
+    def should_be_throttled(self, identifier, **kwargs):
+        """
+        Returns whether or not the user has exceeded their throttle limit.
+        
+        Reads both windows' counters at once.
+        
+        Returns ``False`` if the user should NOT be throttled or ``True`` if
+        the user should be throttled.
+        """
+        current_key, previous_key, weight = self.get_window_keys(identifier, **kwargs)
+        counts = cache.get_many([current_key, previous_key])
+        return self.get_count(counts, current_key, previous_key, weight) >= int(self.throttle_at)
+    
+    def accessed(self, identifier, **kwargs):
+        """
+        Handles recording the user's access.
+        
+        Increments the current window's counter (by the access' ``cost``).
+        """
+        current_key, previous_key, weight = self.get_window_keys(identifier, **kwargs)
+        self.increment(current_key, kwargs.get('cost', 1))
+    
+    def consume(self, identifier, **kwargs):
+        """
+        Decides whether the user should be throttled & records their access.
+        
+        Increments the current window's counter first, then takes it back if
+        they're over the limit, so an allowed request costs one round trip.
+        The previous window's count no longer changes, so it's remembered in
+        process.
+        """
+        if self.has_custom_checks(SlidingWindowThrottle):
+            return super(SlidingWindowThrottle, self).consume(identifier, **kwargs)
+        
+        cost = kwargs.get('cost', 1)
+        current_key, previous_key, weight = self.get_window_keys(identifier, **kwargs)
+        current = self.increment(current_key, cost)
+        previous = self.previous_counts.get(previous_key)
+        
+        if previous is None:
+            previous = cache.get(previous_key, 0)
+            self.previous_counts.set(previous_key, previous, int(self.timeframe))
+        
+        # Don't count this request against itself.
+        counts = {current_key: current - cost, previous_key: previous}
+        
+        if self.get_count(counts, current_key, previous_key, weight) >= int(self.throttle_at):
+            try:
+                cache.decr(current_key, cost)
+            except ValueError:
+                # The counter expired (or was evicted) in the meantime, so
+                # there's nothing to take back.
+                pass
+            
+            self.update_window_status(kwargs.get('status'), current - cost, previous, throttled=True)
+            return True
+        
+        self.update_window_status(kwargs.get('status'), current, previous)
+        return False
+    
+    def update_window_status(self, status, current, previous, throttled=False):
+        """
+        Fills in the ``status`` from the windows' counts.
+        
+        The counters roll over at the end of the current window, which is
+        the ``reset``. If they're throttled, they may try again once the
+        previous window's share of the count (or, if this window alone is
+        over the limit, this one's once it's the previous) has shrunk enough.
+        """
+        if status is None:
+            return
+        
+        now = time.time()
+        timeframe = int(self.timeframe)
+        throttle_at = int(self.throttle_at)
+        start = int(now // timeframe) * timeframe
+        count = current + previous * (1.0 - (now - start) / float(timeframe))
+        retry_after = None
+        
+        if throttled:
+            if current < throttle_at:
+                retry_at = start + (1.0 - (throttle_at - current) / float(previous)) * timeframe
+            else:
+                retry_at = start + timeframe + (1.0 - throttle_at / float(current)) * timeframe
+            
+            # They're let through once the count is strictly under the
+            # limit, so the first whole second after.
+            retry_after = math.floor(retry_at - now) + 1
+        
+        self.update_status(status, math.floor(throttle_at - count), start + timeframe, retry_after)
+    
+    def increment(self, key, delta=1):
+        """
+        Atomically adds ``delta`` to a counter, creating it if needed.
+        Returns the new value.
+        """
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            # The first access in the window. If another request beats us
+            # to creating it, count on top of theirs.
+            if cache.add(key, delta, int(self.timeframe) * 2):
+                return delta
+            
+            return cache.incr(key, delta)
+
+
+class ConcurrencyThrottle(BaseThrottle):
+    """
+    A throttling mechanism that limits how many requests a user may have in
+    flight at once, rather than how many they make over time.
+    
+    Used as ``Meta.concurrency_throttle`` (alongside a ``Meta.throttle``).
+    Keeps a counter per user in the cache, bumped with ``cache.incr`` as
+    each request starts & taken back as it finishes. Not every backend's
+    ``incr`` keeps the timeout, so the counter's expiry time is kept
+    alongside it (see ``get_expiry_key``).
+    
+    Accepts a number of optional kwargs::
+    
+        * ``max_concurrent`` - the most requests a user may have in flight
+          at once. Default is 4.
+        * ``wait`` - how long (in seconds) a request over the limit waits for
+          a slot before it's rejected. Default is 0 (reject it right away).
+        * ``timeout`` - how long (in seconds) a counter lives. Slots leaked
+          by requests that never finish (i.e. when a worker is killed) are
+          recovered once it expires, so it should be longer than any
+          request. Default is 300 seconds.
+        * ``per_resource`` & ``per_method`` - as with the other throttles.
+    """
+    poll_interval = 0.05
+    
+    def __init__(self, max_concurrent=4, wait=0, timeout=300, per_resource=False, per_method=False):
+        super(ConcurrencyThrottle, self).__init__(throttle_at=max_concurrent, timeframe=timeout, expiration=timeout, per_resource=per_resource, per_method=per_method)
+        self.max_concurrent = max_concurrent
+        self.wait = wait
+        self.timeout = timeout
+    
+    def get_key(self, identifier, **kwargs):
+        """
+        Returns the cache key of the user's in-flight counter.
+        """
+        return "%s_inflight" % self.convert_identifier_to_key(self.get_bucket(identifier, **kwargs))
+    
+    def get_expiry_key(self, key):
+        """
+        Returns the cache key holding the time the counter at ``key`` expires.
+        
+        It's only ever added, never updated, so its own timeout holds on
+        every backend.
+        """
+        return "%s_expires" % key
+    
+    def acquire(self, identifier, **kwargs):
+        """
+        Claims one of the user's slots for a request that's starting.
+        
+        Returns ``True`` if they're under the limit (& the request should go
+        ahead), or ``False`` if no slot came free within ``wait`` seconds.
+        """
+        key = self.get_key(identifier, **kwargs)
+        deadline = time.time() + float(self.wait)
+        
+        while True:
+            if self.increment(key) <= int(self.max_concurrent):
+                return True
+            
+            # Over the limit. Take it back.
+            self.decrement(key)
+            
+            if time.time() >= deadline:
+                return False
+            
+            time.sleep(self.poll_interval)
+    
+    def release(self, identifier, **kwargs):
+        """
+        Gives back the slot of a request that's finished.
+        """
+        self.decrement(self.get_key(identifier, **kwargs))
+    
+    def in_flight(self, identifier, **kwargs):
+        """
+        Returns how many requests the user has in flight.
+        """
+        key = self.get_key(identifier, **kwargs)
+        expiry_key = self.get_expiry_key(key)
+        values = cache.get_many([key, expiry_key])
+        
+        if self.has_expired(values.get(expiry_key)):
+            return 0
+        
+        return values.get(key, 0)
+    
+    def has_expired(self, expires):
+        return expires is None or time.time() >= expires
+    
+    def increment(self, key):
+        expiry_key = self.get_expiry_key(key)
+        expires = cache.get(expiry_key)
+        
+        if self.has_expired(expires):
+            # Start a new counter, forgetting any slots leaked by the old
+            # one. Only one request gets to.
+            if expires is not None:
+                cache.delete(expiry_key)
+            
+            if cache.add(expiry_key, time.time() + int(self.timeout), int(self.timeout)):
+                cache.set(key, 0, int(self.timeout))
+        
+        try:
+            return cache.incr(key)
+        except ValueError:
+            if cache.add(key, 1, int(self.timeout)):
+                return 1
+            
+            return cache.incr(key)
+    
+    def decrement(self, key):
+        try:
+            if cache.decr(key) < 0:
+                # The counter expired while requests were in flight, so
+                # they're releasing slots the new one never counted.
+                cache.set(key, 0, int(self.timeout))
+        except ValueError:
+            # It expired (taking any leaked slots with it).
+            pass
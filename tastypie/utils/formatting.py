@@ -1,5 +1,7 @@
+import calendar
 import email
 import datetime
+import time
 from django.utils import dateformat
 from tastypie.utils.timezone import make_aware, make_naive, aware_datetime
 
@@ -33,3 +35,15 @@ def format_time(t):
     # again, workaround dateformat input requirement
     dt = aware_datetime(2000, 1, 1, t.hour, t.minute, t.second)
     return dateformat.format(dt, 'H:i:s O')
+
+def datetime_to_timestamp(dt):
+    """
+    Converts a date/datetime into seconds since the epoch.
+
+    Naive values are taken to be in the local timezone, as Django stores
+    them when ``USE_TZ`` is off.
+    """
+    if getattr(dt, 'tzinfo', None) is not None and dt.utcoffset() is not None:
+        return calendar.timegm(dt.utctimetuple())
+
+    return time.mktime(dt.timetuple())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Measures the per-object cost of ``Resource.full_dehydrate``.
+
+Compares the compiled dehydrate plan against the ``full_dehydrate`` &
+``ApiField.dehydrate`` that shipped before it (which looked up
+``dehydrate_FOO``, re-flagged related fields & re-split ``attribute`` for
+every object). No database is needed. Run from this directory with::
+
+    PYTHONPATH=..:. python benchmark_dehydrate.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+
+from tastypie import fields
+from tastypie.bundle import Bundle
+from tastypie.exceptions import ApiFieldError
+from tastypie.resources import Resource
+from tastypie.utils import aware_datetime
+
+
+class Author(object):
+    username = 'johndoe'
+    email = 'john@example.com'
+
+
+class Entry(object):
+    def __init__(self, pk):
+        self.pk = pk
+        self.title = 'Entry #%s' % pk
+        self.slug = 'entry-%s' % pk
+        self.content = 'Lorem ipsum dolor sit amet. ' * 4
+        self.view_count = pk * 3
+        self.rating = 4.5
+        self.is_active = True
+        self.created = aware_datetime(2010, 3, 30, 20, 5)
+        self.tags = ['abc', 'def']
+        self.author = Author()
+
+
+class EntryResource(Resource):
+    title = fields.CharField(attribute='title')
+    slug = fields.CharField(attribute='slug')
+    content = fields.CharField(attribute='content')
+    view_count = fields.IntegerField(attribute='view_count')
+    rating = fields.FloatField(attribute='rating')
+    is_active = fields.BooleanField(attribute='is_active')
+    created = fields.DateTimeField(attribute='created')
+    tags = fields.ListField(attribute='tags')
+    author = fields.CharField(attribute='author__username')
+    author_email = fields.CharField(attribute='author__email')
+    constant = fields.IntegerField(default=20)
+
+    class Meta:
+        object_class = Entry
+        resource_name = 'entries'
+        include_resource_uri = False
+
+    def dehydrate_title(self, bundle):
+        return bundle.data['title'].upper()
+
+
+def legacy_field_dehydrate(field_object, bundle):
+    # ``ApiField.dehydrate`` before the plan was compiled.
+    if field_object.attribute is not None:
+        # Check for `__` in the field for looking through the relation.
+        attrs = field_object.attribute.split('__')
+        current_object = bundle.obj
+
+        for attr in attrs:
+            previous_object = current_object
+            current_object = getattr(current_object, attr, None)
+
+            if current_object is None:
+                if field_object.has_default():
+                    current_object = field_object._default
+                    break
+                elif field_object.null:
+                    current_object = None
+                    break
+                else:
+                    raise ApiFieldError("The object '%r' has an empty attribute '%s' and doesn't allow a default or null value." % (previous_object, attr))
+
+        if callable(current_object):
+            current_object = current_object()
+
+        return field_object.convert(current_object)
+
+    if field_object.has_default():
+        return field_object.convert(field_object.default)
+    else:
+        return None
+
+
+def legacy_full_dehydrate(resource, bundle):
+    # ``Resource.full_dehydrate`` before the plan was compiled.
+    for field_name, field_object in resource.fields.items():
+        # A touch leaky but it makes URI resolution work.
+        if getattr(field_object, 'dehydrated_type', None) == 'related':
+            field_object.api_name = resource._meta.api_name
+            field_object.resource_name = resource._meta.resource_name
+
+        bundle.data[field_name] = legacy_field_dehydrate(field_object, bundle)
+
+        # Check for an optional method to do further dehydration.
+        method = getattr(resource, "dehydrate_%s" % field_name, None)
+
+        if method:
+            bundle.data[field_name] = method(bundle)
+
+    return resource.dehydrate(bundle)
+
+
+def main(iterations=20000):
+    resource = EntryResource()
+    objects = [Entry(pk) for pk in range(100)]
+
+    def run(dehydrate):
+        for obj in objects:
+            dehydrate(Bundle(obj=obj))
+
+    timings = [
+        ('legacy', lambda: run(lambda bundle: legacy_full_dehydrate(resource, bundle))),
+        ('full_dehydrate', lambda: run(resource.full_dehydrate)),
+    ]
+    repeats = max(1, iterations // len(objects))
+
+    for label, func in timings:
+        best = min(timeit.repeat(func, number=repeats, repeat=3))
+        per_object = best / (repeats * len(objects)) * 1000000
+        print "%-16s %8.2f us/object" % (label, per_object)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
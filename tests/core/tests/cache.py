@@ -1,7 +1,13 @@
+import os
+import shutil
+import tempfile
+import threading
 import time
 from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
 from django.test import TestCase
-from tastypie.cache import NoCache, SimpleCache
+from django.utils import unittest
+from tastypie.cache import NoCache, SimpleCache, LRUCache, TwoTierCache, MmapCache
 
 
 class NoCacheTestCase(TestCase):
@@ -28,6 +34,20 @@ class NoCacheTestCase(TestCase):
         self.assertEqual(cache.get('foo'), None)
         self.assertEqual(cache.get('moof'), None)
 
+    def test_delete(self):
+        cache.set('foo', 'bar', 60)
+
+        no_cache = NoCache()
+        no_cache.delete('foo')
+        # It's a no-op, so the underlying cache is left alone.
+        self.assertEqual(cache.get('foo'), 'bar')
+
+    def test_get_many_set_many(self):
+        no_cache = NoCache()
+        no_cache.set_many({'foo': 'bar'})
+        self.assertEqual(cache.get('foo'), None)
+        self.assertEqual(no_cache.get_many(['foo']), {})
+
 
 class SimpleCacheTestCase(TestCase):
     def tearDown(self):
@@ -56,3 +76,405 @@ class SimpleCacheTestCase(TestCase):
         # Check expiration.
         time.sleep(2)
         self.assertEqual(cache.get('moof'), None)
+
+    def test_delete(self):
+        simple_cache = SimpleCache()
+        simple_cache.set('foo', 'bar')
+        simple_cache.delete('foo')
+        simple_cache.delete('moof')
+
+        self.assertEqual(simple_cache.get('foo'), None)
+        self.assertEqual(cache.get('foo'), None)
+
+    def test_get_many_set_many(self):
+        simple_cache = SimpleCache()
+        self.assertEqual(simple_cache.get_many(['foo', 'moof']), {})
+
+        simple_cache.set_many({'foo': 'bar', 'moof': 'baz'})
+        self.assertEqual(cache.get('foo'), 'bar')
+        self.assertEqual(simple_cache.get_many(['foo', 'moof', 'nope']), {'foo': 'bar', 'moof': 'baz'})
+
+
+class LRUCacheTestCase(TestCase):
+    def test_get_set_delete(self):
+        lru_cache = LRUCache()
+        self.assertEqual(lru_cache.get('foo'), None)
+
+        lru_cache.set('foo', {'bar': 1})
+        self.assertEqual(lru_cache.get('foo'), {'bar': 1})
+
+        # Callers get their own copy.
+        lru_cache.get('foo')['bar'] = 2
+        self.assertEqual(lru_cache.get('foo'), {'bar': 1})
+
+        lru_cache.delete('foo')
+        lru_cache.delete('moof')
+        self.assertEqual(lru_cache.get('foo'), None)
+        self.assertEqual(lru_cache.stats(), {'hits': 3, 'misses': 2, 'evictions': 0, 'expirations': 0, 'size': 0})
+
+    def test_eviction(self):
+        lru_cache = LRUCache(size=2)
+        lru_cache.set('a', 1)
+        lru_cache.set('b', 2)
+        # Touch 'a', so 'b' is the least recently used.
+        self.assertEqual(lru_cache.get('a'), 1)
+        lru_cache.set('c', 3)
+
+        self.assertEqual(lru_cache.get('b'), None)
+        self.assertEqual(lru_cache.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+        self.assertEqual(lru_cache.evictions, 1)
+
+        # Overwriting doesn't evict.
+        lru_cache.set('c', 4)
+        self.assertEqual(lru_cache.get('c'), 4)
+        self.assertEqual(lru_cache.stats()['size'], 2)
+        self.assertEqual(lru_cache.evictions, 1)
+
+    def test_expiration(self):
+        lru_cache = LRUCache(max_timeout=1)
+        lru_cache.set_many({'foo': 'bar', 'moof': 'baz'}, timeout=None)
+        lru_cache.set('short', 'lived', timeout=0)
+
+        self.assertEqual(lru_cache.get('short'), None)
+        self.assertEqual(lru_cache.get('foo'), 'bar')
+
+        # ``max_timeout`` caps even "forever".
+        time.sleep(1.1)
+        self.assertEqual(lru_cache.get_many(['foo', 'moof']), {})
+        self.assertEqual(lru_cache.expirations, 3)
+        self.assertEqual(lru_cache.stats()['size'], 0)
+
+
+class TwoTierCacheTestCase(TestCase):
+    def tearDown(self):
+        cache.delete('foo')
+        cache.delete('moof')
+        super(TwoTierCacheTestCase, self).tearDown()
+
+    def test_get(self):
+        cache.set('foo', 'bar', 60)
+        two_tier_cache = TwoTierCache()
+
+        self.assertEqual(two_tier_cache.get('foo'), 'bar')
+        self.assertEqual(two_tier_cache.get('moof'), None)
+
+        # The second read is served locally, even once the shared copy is gone.
+        cache.delete('foo')
+        self.assertEqual(two_tier_cache.get('foo'), 'bar')
+
+        stats = two_tier_cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['shared_hits'], 1)
+        self.assertEqual(stats['shared_misses'], 1)
+
+    def test_set_delete(self):
+        two_tier_cache = TwoTierCache()
+        two_tier_cache.set('foo', 'bar')
+        self.assertEqual(cache.get('foo'), 'bar')
+        self.assertEqual(two_tier_cache.local.get('foo'), 'bar')
+
+        two_tier_cache.delete('foo')
+        self.assertEqual(cache.get('foo'), None)
+        self.assertEqual(two_tier_cache.get('foo'), None)
+
+    def test_local_timeout(self):
+        two_tier_cache = TwoTierCache(local_timeout=1)
+        two_tier_cache.set('foo', 'bar')
+        # Another process changes it.
+        cache.set('foo', 'baz', 60)
+        self.assertEqual(two_tier_cache.get('foo'), 'bar')
+
+        time.sleep(1.1)
+        self.assertEqual(two_tier_cache.get('foo'), 'baz')
+
+    def test_get_many_set_many(self):
+        two_tier_cache = TwoTierCache()
+        two_tier_cache.set_many({'foo': 'bar'})
+        cache.set('moof', 'baz', 60)
+
+        self.assertEqual(two_tier_cache.get_many(['foo', 'moof', 'nope']), {'foo': 'bar', 'moof': 'baz'})
+        self.assertEqual(two_tier_cache.local.get('moof'), 'baz')
+        self.assertEqual(two_tier_cache.shared_hits, 1)
+        self.assertEqual(two_tier_cache.shared_misses, 1)
+
+
+class GetOrSetTestCase(TestCase):
+    def tearDown(self):
+        cache.delete('foo')
+        cache.delete('foo:lock')
+        super(GetOrSetTestCase, self).tearDown()
+
+    def test_no_cache(self):
+        calls = []
+        no_cache = NoCache()
+        self.assertEqual(no_cache.get_or_set('foo', lambda: calls.append(1) or 'bar'), 'bar')
+        self.assertEqual(no_cache.get_or_set('foo', lambda: calls.append(1) or 'bar'), 'bar')
+        self.assertEqual(len(calls), 2)
+
+    def test_concurrent_misses(self):
+        simple_cache = SimpleCache()
+        calls = []
+        results = []
+
+        def expensive_query():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'bar'
+
+        def worker():
+            results.append(simple_cache.get_or_set('foo', expensive_query))
+
+        workers = [threading.Thread(target=worker) for i in range(5)]
+
+        for thread in workers:
+            thread.start()
+
+        for thread in workers:
+            thread.join()
+
+        # Only one worker ran the query; the rest waited for it.
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['bar'] * 5)
+        self.assertEqual(cache.get('foo:lock'), None)
+
+    def test_serves_stale(self):
+        simple_cache = SimpleCache()
+        # An expired value, being rebuilt elsewhere.
+        cache.set('foo', ('old', time.time() - 1, 0.01), 60)
+        self.assertTrue(simple_cache.add('foo:lock', 1))
+        self.assertFalse(simple_cache.add('foo:lock', 1))
+
+        self.assertEqual(simple_cache.get_or_set('foo', lambda: 'new'), 'old')
+
+        simple_cache.delete('foo:lock')
+        self.assertEqual(simple_cache.get_or_set('foo', lambda: 'new'), 'new')
+        self.assertEqual(simple_cache.get_or_set('foo', lambda: 'newer'), 'new')
+
+    def test_lock_wait(self):
+        simple_cache = SimpleCache(lock_wait=0.1)
+        simple_cache.add('foo:lock', 1)
+
+        # Nothing to serve & the rebuild is taking too long.
+        self.assertEqual(simple_cache.get_or_set('foo', lambda: 'bar'), 'bar')
+        # The lock holder still gets to store it.
+        self.assertEqual(cache.get('foo'), None)
+
+    def test_callback_errors(self):
+        simple_cache = SimpleCache()
+
+        def broken():
+            raise ValueError("Nope.")
+
+        self.assertRaises(ValueError, simple_cache.get_or_set, 'foo', broken)
+        self.assertEqual(cache.get('foo:lock'), None)
+
+    def test_should_refresh(self):
+        simple_cache = SimpleCache()
+        now = time.time()
+        self.assertTrue(simple_cache.should_refresh(now - 1, 0.01))
+        self.assertFalse(simple_cache.should_refresh(now + 60, 0))
+        # Slow to build & about to expire.
+        self.assertTrue(simple_cache.should_refresh(now + 1, 1000000))
+
+        simple_cache = SimpleCache(early_refresh=0)
+        self.assertFalse(simple_cache.should_refresh(now + 1, 1000000))
+
+    def test_subclass_without_super(self):
+        class LegacyCache(SimpleCache):
+            def __init__(self, prefix):
+                self.prefix = prefix
+
+        legacy_cache = LegacyCache('legacy')
+        self.assertEqual(legacy_cache.lock_timeout, 10)
+        self.assertEqual(legacy_cache.get_or_set('foo', lambda: 'bar'), 'bar')
+        self.assertEqual(legacy_cache.get_or_set('foo', lambda: 'baz'), 'bar')
+
+        # Only the provided settings are overridden.
+        simple_cache = SimpleCache(lock_wait=0.5)
+        self.assertEqual(simple_cache.lock_wait, 0.5)
+        self.assertEqual(simple_cache.stale_timeout, 60)
+
+    def test_lru_cache(self):
+        lru_cache = LRUCache()
+        self.assertTrue(lru_cache.add('foo:lock', 1, timeout=0))
+        # Expired, so it can be taken again.
+        self.assertTrue(lru_cache.add('foo:lock', 1))
+        self.assertFalse(lru_cache.add('foo:lock', 1))
+        lru_cache.delete('foo:lock')
+
+        self.assertEqual(lru_cache.get_or_set('foo', lambda: 'bar'), 'bar')
+        self.assertEqual(lru_cache.get_or_set('foo', lambda: 'baz'), 'bar')
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'MmapCache requires a Unix platform')
+class MmapCacheTestCase(TestCase):
+    def setUp(self):
+        super(MmapCacheTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache')
+        self.mmap_cache = MmapCache(self.path, slots=64, ways=4)
+
+    def tearDown(self):
+        self.mmap_cache.close()
+        shutil.rmtree(self.directory)
+        super(MmapCacheTestCase, self).tearDown()
+
+    def in_child(self, func):
+        # Runs ``func`` in a new process, with its own ``MmapCache``.
+        # Returns the pid, to pass to ``wait``.
+        pid = os.fork()
+
+        if pid == 0:
+            status = 1
+
+            try:
+                mmap_cache = MmapCache(self.path, slots=64, ways=4)
+
+                if func(mmap_cache):
+                    status = 0
+            finally:
+                os._exit(status)
+
+        return pid
+
+    def wait(self, pid):
+        # Returns whether the child's ``func`` returned something truthy.
+        return os.waitpid(pid, 0)[1] == 0
+
+    def test_get_set_delete(self):
+        self.assertEqual(self.mmap_cache.get('foo'), None)
+        self.mmap_cache.set('foo', {'bar': 1})
+        self.assertEqual(self.mmap_cache.get('foo'), {'bar': 1})
+        self.mmap_cache.set(u'f\xf6\xf6', 'baz')
+        self.assertEqual(self.mmap_cache.get(u'f\xf6\xf6'), 'baz')
+
+        # Overly long keys are hashed.
+        self.mmap_cache.set('x' * 300, 'long')
+        self.assertEqual(self.mmap_cache.get('x' * 300), 'long')
+
+        # As are values too big for a slot, but they aren't stored.
+        self.mmap_cache.set('foo', 'x' * 5000)
+        self.assertEqual(self.mmap_cache.get('foo'), None)
+
+        self.mmap_cache.delete(u'f\xf6\xf6')
+        self.assertEqual(self.mmap_cache.get(u'f\xf6\xf6'), None)
+        self.assertEqual(self.mmap_cache.get_many(['x' * 300, 'nope']), {'x' * 300: 'long'})
+
+        self.mmap_cache.clear()
+        self.assertEqual(self.mmap_cache.stats()['size'], 0)
+
+    def test_expiration(self):
+        self.mmap_cache.set('foo', 'bar', timeout=1)
+        self.mmap_cache.set('moof', 'baz', timeout=None)
+        self.assertEqual(self.mmap_cache.get('foo'), 'bar')
+
+        time.sleep(1.1)
+        self.assertEqual(self.mmap_cache.get('foo'), None)
+        self.assertEqual(self.mmap_cache.get('moof'), 'baz')
+        self.assertEqual(self.mmap_cache.expirations, 1)
+
+        # Expired keys can be added again.
+        self.assertTrue(self.mmap_cache.add('foo', 'new'))
+        self.assertFalse(self.mmap_cache.add('foo', 'newer'))
+
+    def test_eviction(self):
+        # Fill well past capacity.
+        for i in range(200):
+            self.mmap_cache.set('key-%s' % i, i)
+
+        stats = self.mmap_cache.stats()
+        self.assertEqual(stats['size'], 64)
+        self.assertEqual(stats['evictions'], 136)
+        self.assertEqual(self.mmap_cache.get('key-199'), 199)
+
+        # The recently used key survives its bucket filling up.
+        key, key_hash, bucket = self.mmap_cache._locate('key-199')
+        same_bucket = [i for i in range(200, 5000) if self.mmap_cache._locate('key-%s' % i)[2] == bucket]
+
+        for i in same_bucket[:10]:
+            self.mmap_cache.get('key-199')
+            self.mmap_cache.set('key-%s' % i, i)
+
+        self.assertEqual(self.mmap_cache.get('key-199'), 199)
+
+    def test_add_too_big(self):
+        self.mmap_cache.set('foo', 'bar')
+        # ``add`` never removes an existing entry, even if it can't store.
+        self.assertFalse(self.mmap_cache.add('foo', 'x' * 5000))
+        self.assertEqual(self.mmap_cache.get('foo'), 'bar')
+
+    def test_settings_change(self):
+        self.mmap_cache.set('foo', 'bar')
+        # Resizing could crash the processes that have it mapped.
+        self.assertRaises(ImproperlyConfigured, MmapCache, self.path, slots=128, ways=4)
+        self.assertRaises(ImproperlyConfigured, MmapCache, self.path, slots=64, ways=8)
+        self.assertEqual(os.path.getsize(self.path), 64 + 64 * 4096)
+        self.assertEqual(self.mmap_cache.get('foo'), 'bar')
+
+    def test_unsafe_files(self):
+        self.assertRaises(TypeError, MmapCache)
+        self.assertRaises(ImproperlyConfigured, MmapCache, '')
+
+        # Symlinks are never followed.
+        link = os.path.join(self.directory, 'link')
+        os.symlink(self.path, link)
+        self.assertRaises(ImproperlyConfigured, MmapCache, link, slots=64, ways=4)
+
+        # Nor are files others can write to used.
+        os.chmod(self.path, 0666)
+        self.assertRaises(ImproperlyConfigured, MmapCache, self.path, slots=64, ways=4)
+        os.chmod(self.path, 0600)
+
+        # Or anything but a regular file.
+        fifo = os.path.join(self.directory, 'fifo')
+        os.mkfifo(fifo, 0600)
+        self.assertRaises(ImproperlyConfigured, MmapCache, fifo, slots=64, ways=4)
+
+    def test_shared_locks(self):
+        # Instances on the same file in one process share their thread locks,
+        # since the ``fcntl`` locks are the process'.
+        other = MmapCache(self.path, slots=64, ways=4)
+        self.assertTrue(other._thread_locks is self.mmap_cache._thread_locks)
+        other.set('foo', 'bar')
+        other.close()
+        self.assertEqual(self.mmap_cache.get('foo'), 'bar')
+
+        elsewhere = MmapCache(os.path.join(self.directory, 'elsewhere'), slots=64, ways=4)
+        self.assertFalse(elsewhere._thread_locks is self.mmap_cache._thread_locks)
+        elsewhere.close()
+
+    def test_shared_between_processes(self):
+        self.mmap_cache.set('foo', 'bar')
+        pid = self.in_child(lambda mmap_cache: mmap_cache.get('foo') == 'bar' and mmap_cache.set('moof', 'baz') is None)
+        self.assertTrue(self.wait(pid))
+        self.assertEqual(self.mmap_cache.get('moof'), 'baz')
+
+    def test_concurrent_processes(self):
+        def worker(mmap_cache):
+            for i in range(100):
+                mmap_cache.set('%s-%s' % (os.getpid(), i), i)
+
+            return True
+
+        pids = [self.in_child(worker) for i in range(4)]
+        self.assertEqual([self.wait(pid) for pid in pids], [True] * 4)
+
+        # Every slot holds an intact value.
+        self.assertEqual(self.mmap_cache.stats()['size'], 64)
+
+        for pid in pids:
+            for i in range(100):
+                value = self.mmap_cache.get('%s-%s' % (pid, i))
+                self.assertTrue(value in (None, i))
+
+    def test_concurrent_add(self):
+        # Only one process can take the lock.
+        pids = [self.in_child(lambda mmap_cache: mmap_cache.add('lock', os.getpid())) for i in range(8)]
+        results = [self.wait(pid) for pid in pids]
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(self.mmap_cache.get('lock'), pids[results.index(True)])
+
+    def test_get_or_set(self):
+        self.assertEqual(self.mmap_cache.get_or_set('foo', lambda: 'bar'), 'bar')
+        pid = self.in_child(lambda mmap_cache: mmap_cache.get_or_set('foo', lambda: 'baz') == 'bar')
+        self.assertTrue(self.wait(pid))
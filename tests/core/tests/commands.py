@@ -1,8 +1,9 @@
+import time
 from django.contrib.auth.models import User
 from django.core.management import call_command
 from django.db import models
 from django.test import TestCase
-from tastypie.models import ApiKey, create_api_key
+from tastypie.models import ApiAccess, ApiAccessRollup, ApiKey, create_api_key
 
 
 class BackfillApiKeysTestCase(TestCase):
@@ -33,3 +34,103 @@ class BackfillApiKeysTestCase(TestCase):
             ApiKey.objects.get(user=new_user)
         except ApiKey.DoesNotExist:
             self.fail("No key means the command didn't work.")
+
+
+class RollupApiAccessTestCase(TestCase):
+    def setUp(self):
+        super(RollupApiAccessTestCase, self).setUp()
+        # The start of an hour, two days ago.
+        self.hour = int(time.time()) - 2 * 86400
+        self.hour -= self.hour % 3600
+
+    def create_access(self, identifier, url, request_method, accessed):
+        # ``ApiAccess.save`` overwrites ``accessed``, so set it afterwards.
+        access = ApiAccess.objects.create(identifier=identifier, url=url, request_method=request_method)
+        ApiAccess.objects.filter(pk=access.pk).update(accessed=accessed)
+
+    def get_rollups(self):
+        return [(rollup.identifier, rollup.hour, rollup.resource, rollup.request_method, rollup.count) for rollup in ApiAccessRollup.objects.order_by('hour', 'identifier', 'resource', 'request_method')]
+
+    def test_command(self):
+        self.create_access('daniel', '/api/v1/notes/', 'get', self.hour)
+        self.create_access('daniel', '/api/v1/notes/1/?format=json', 'get', self.hour + 60)
+        self.create_access('daniel', '/api/v1/notes/2/', 'put', self.hour + 3599)
+        self.create_access('cody', '/api/v1/users/', 'get', self.hour + 10)
+        self.create_access('cody', '/not/an/api/', 'get', self.hour + 10)
+        self.create_access('daniel', '/api/v1/notes/', 'get', self.hour + 5 * 3600 + 1)
+        # Not over yet.
+        self.create_access('daniel', '/api/v1/notes/', 'get', int(time.time()))
+
+        call_command('rollup_api_access', verbosity=0)
+        self.assertEqual(self.get_rollups(), [
+            (u'cody', self.hour, u'/not/an/api/', u'get', 1),
+            (u'cody', self.hour, u'v1/users', u'get', 1),
+            (u'daniel', self.hour, u'v1/notes', u'get', 2),
+            (u'daniel', self.hour, u'v1/notes', u'put', 1),
+            (u'daniel', self.hour + 5 * 3600, u'v1/notes', u'get', 1),
+        ])
+        self.assertEqual(ApiAccess.objects.count(), 7)
+
+        # Incremental.
+        self.create_access('daniel', '/api/v1/notes/', 'get', self.hour + 6 * 3600)
+        call_command('rollup_api_access', verbosity=0)
+        self.assertEqual(ApiAccessRollup.objects.count(), 6)
+        self.assertEqual(ApiAccessRollup.objects.get(hour=self.hour + 6 * 3600).count, 1)
+
+        call_command('rollup_api_access', verbosity=0)
+        self.assertEqual(ApiAccessRollup.objects.count(), 6)
+
+    def test_late_accesses(self):
+        self.create_access('daniel', '/api/v1/notes/', 'get', self.hour)
+        self.create_access('daniel', '/api/v1/notes/', 'get', self.hour + 3600)
+        call_command('rollup_api_access', verbosity=0)
+        self.assertEqual(self.get_rollups(), [
+            (u'daniel', self.hour, u'v1/notes', u'get', 1),
+            (u'daniel', self.hour + 3600, u'v1/notes', u'get', 1),
+        ])
+
+        # Written after their hours were rolled up (i.e. a retried batch).
+        self.create_access('daniel', '/api/v1/notes/', 'get', self.hour + 10)
+        self.create_access('daniel', '/api/v1/notes/', 'put', self.hour + 20)
+        self.create_access('cody', '/api/v1/notes/', 'get', self.hour - 3600)
+        call_command('rollup_api_access', verbosity=0)
+        self.assertEqual(self.get_rollups(), [
+            (u'cody', self.hour - 3600, u'v1/notes', u'get', 1),
+            (u'daniel', self.hour, u'v1/notes', u'get', 2),
+            (u'daniel', self.hour, u'v1/notes', u'put', 1),
+            (u'daniel', self.hour + 3600, u'v1/notes', u'get', 1),
+        ])
+
+        # Counted once, even if their hour's other accesses were pruned.
+        call_command('rollup_api_access', keep_days=0, verbosity=0)
+        # Bar the newest, so its id isn't reused.
+        self.assertEqual(ApiAccess.objects.count(), 1)
+        self.create_access('daniel', '/api/v1/notes/', 'get', self.hour + 30)
+        call_command('rollup_api_access', verbosity=0)
+        call_command('rollup_api_access', verbosity=0)
+        self.assertEqual(ApiAccessRollup.objects.get(identifier='daniel', hour=self.hour, request_method='get').count, 3)
+
+    def test_prune(self):
+        self.create_access('daniel', '/api/v1/notes/', 'get', self.hour - 3 * 86400)
+        self.create_access('daniel', '/api/v1/notes/', 'get', self.hour)
+        self.create_access('daniel', '/api/v1/notes/', 'get', int(time.time()))
+
+        # Old accesses are rolled up before they go.
+        call_command('rollup_api_access', keep_days=1, verbosity=0)
+        self.assertEqual(ApiAccess.objects.count(), 1)
+        self.assertEqual(ApiAccessRollup.objects.count(), 2)
+
+        # Accesses that haven't been rolled up are kept.
+        call_command('rollup_api_access', keep_days=0, delay=3600, verbosity=0)
+        self.assertEqual(ApiAccess.objects.count(), 1)
+
+        # As is everything, by default.
+        self.create_access('daniel', '/api/v1/notes/', 'get', self.hour - 3 * 86400)
+        self.create_access('daniel', '/api/v1/notes/', 'get', int(time.time()))
+        call_command('rollup_api_access', verbosity=0)
+        self.assertEqual(ApiAccess.objects.count(), 3)
+
+        # Late accesses are rolled up before they're pruned.
+        call_command('rollup_api_access', keep_days=1, verbosity=0)
+        self.assertEqual(ApiAccess.objects.count(), 2)
+        self.assertEqual(ApiAccessRollup.objects.get(hour=self.hour - 3 * 86400).count, 2)
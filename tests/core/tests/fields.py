@@ -10,7 +10,7 @@ from tastypie.exceptions import ApiFieldError, NotFound
 from tastypie.fields import (
     NOT_PROVIDED, ApiField, CharField, FileField, IntegerField, FloatField,
     DecimalField, ListField, DictField, BooleanField, TimeField, DateField,
-    DateTimeField, ToOneField, ToManyField
+    DateTimeField, ToOneField, ToManyField, get_shared_resource
 )
 from tastypie.resources import ModelResource
 
@@ -40,6 +40,15 @@ class ApiFieldTestCase(TestCase):
         self.assertEqual(field_2.readonly, True)
         self.assertEqual(field_2.help_text, 'Foo.')
 
+    def test_get_attribute_bits(self):
+        field_1 = ApiField(attribute='author__username')
+        self.assertEqual(field_1.get_attribute_bits(), ['author', 'username'])
+        self.assertTrue(field_1.get_attribute_bits() is field_1.get_attribute_bits())
+
+        # Reassigning the attribute is picked up.
+        field_1.attribute = 'title'
+        self.assertEqual(field_1.get_attribute_bits(), ['title'])
+
     def test_dehydrated_type(self):
         field_1 = ApiField()
         self.assertEqual(field_1.dehydrated_type, 'string')
@@ -86,6 +95,32 @@ class ApiFieldTestCase(TestCase):
         field_6 = ApiField(attribute='what_time_is_it', default=True)
         self.assertEqual(field_6.dehydrate(bundle), aware_datetime(2010, 4, 1, 0, 48))
 
+    def test_compile_dehydrate(self):
+        note = Note.objects.get(pk=1)
+        bundle = Bundle(obj=note)
+
+        # Matches ``dehydrate`` in every case.
+        field_list = [
+            ApiField(),
+            ApiField(default=True),
+            ApiField(attribute='foo', default=True),
+            ApiField(attribute='foo', null=True),
+            ApiField(attribute='title', default=True),
+            ApiField(attribute='what_time_is_it', default=True),
+            CharField(attribute='author__username'),
+            IntegerField(attribute='author__foo', default='5'),
+            DateTimeField(attribute='created'),
+        ]
+
+        for field in field_list:
+            self.assertEqual(field.compile_dehydrate()(bundle), field.dehydrate(bundle))
+
+        self.assertRaises(ApiFieldError, ApiField(attribute='foo').compile_dehydrate(), bundle)
+
+        # Overridden ``dehydrate`` methods are used as-is.
+        field = ToOneField('core.tests.fields.UserResource', 'author')
+        self.assertEqual(field.compile_dehydrate(), field.dehydrate)
+
     def test_convert(self):
         field_1 = ApiField()
         self.assertEqual(field_1.convert('foo'), 'foo')
@@ -660,6 +695,27 @@ class ToOneFieldTestCase(TestCase):
         self.assertEqual(user_bundle.data['username'], u'johndoe')
         self.assertEqual(user_bundle.data['email'], u'john@doe.com')
 
+    def test_get_related_resource(self):
+        field_1 = ToOneField(UserResource, 'author')
+        field_2 = ToOneField(UserResource, 'author', full=True)
+        related_1 = field_1.get_related_resource(User.objects.get(pk=1))
+        related_2 = field_1.get_related_resource(User.objects.get(pk=2))
+        self.assertTrue(isinstance(related_1, UserResource))
+
+        # One shared instance per class, rather than one per related object.
+        self.assertTrue(related_1 is related_2)
+        self.assertTrue(field_2.get_related_resource(None) is related_1)
+        self.assertTrue(get_shared_resource(UserResource) is related_1)
+
+        field_2.build_related_resource('/api/v1/users/1/')
+        self.assertTrue(field_2.fk_resource is related_1)
+
+        # Full dehydration uses the object from the bundle.
+        note_1 = Note.objects.get(pk=1)
+        note_4 = Note.objects.get(pk=4)
+        self.assertEqual(field_2.dehydrate(Bundle(obj=note_1)).data['username'], u'johndoe')
+        self.assertEqual(field_2.dehydrate(Bundle(obj=note_4)).data['username'], u'janedoe')
+
     def test_hydrate(self):
         note = Note()
         bundle = Bundle(obj=note)
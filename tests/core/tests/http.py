@@ -3,7 +3,7 @@ from django.test import TestCase
 from tastypie.http import (
     HttpCreated, HttpAccepted, HttpNoContent, HttpSeeOther, HttpNotModified,
     HttpBadRequest, HttpUnauthorized, HttpNotFound, HttpMethodNotAllowed,
-    HttpConflict, HttpGone, HttpNotImplemented
+    HttpConflict, HttpGone, HttpTooManyRequests, HttpNotImplemented
 )
 
 
@@ -38,3 +38,7 @@ class HttpTestCase(TestCase):
         self.assertEqual(gone.status_code, 410)
         not_implemented = HttpNotImplemented()
         self.assertEqual(not_implemented.status_code, 501)
+
+    def test_too_many_requests(self):
+        too_many_requests = HttpTooManyRequests()
+        self.assertEqual(too_many_requests.status_code, 429)
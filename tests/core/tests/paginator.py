@@ -3,7 +3,7 @@ from django.conf import settings
 from django.http import QueryDict
 from django.test import TestCase
 from tastypie.exceptions import BadRequest
-from tastypie.paginator import Paginator
+from tastypie.paginator import Paginator, CursorPaginator, ExactCount, SkippedCount, CachedCount, EstimatedCount
 from core.models import Note
 from django.db import reset_queries
 
@@ -197,3 +197,184 @@ class PaginatorTestCase(TestCase):
         self.assertEqual(meta['next'], None)
         self.assertEqual(meta['total_count'], 6)
         self.assertEqual(len(paginator.page()['notes']), 6)
+
+
+class CountStrategyTestCase(TestCase):
+    fixtures = ['note_testdata.json']
+
+    def setUp(self):
+        super(CountStrategyTestCase, self).setUp()
+        self.data_set = Note.objects.all()
+
+    def test_exact(self):
+        paginator = Paginator({}, self.data_set, resource_uri='/api/v1/notes/', limit=2, offset=0, count_strategy=ExactCount())
+        meta = paginator.page()['meta']
+        self.assertEqual(meta['total_count'], 6)
+        self.assertFalse('total_count_exact' in meta)
+
+    def test_skipped(self):
+        paginator = Paginator({}, self.data_set, resource_uri='/api/v1/notes/', limit=2, offset=2, count_strategy=SkippedCount())
+        # Just the one query for the page, no ``COUNT(*)``.
+        self.assertNumQueries(1, paginator.page)
+        page = paginator.page()
+        self.assertEqual(len(page['objects']), 2)
+        self.assertEqual(page['meta']['total_count'], None)
+        self.assertEqual(page['meta']['total_count_exact'], False)
+        self.assertEqual(page['meta']['previous'], '/api/v1/notes/?limit=2&offset=0')
+        self.assertEqual(page['meta']['next'], '/api/v1/notes/?limit=2&offset=4')
+
+        paginator = Paginator({}, self.data_set, resource_uri='/api/v1/notes/', limit=2, offset=4, count_strategy=SkippedCount())
+        page = paginator.page()
+        self.assertEqual(len(page['objects']), 2)
+        self.assertEqual(page['meta']['next'], None)
+
+        paginator = Paginator({}, self.data_set, resource_uri='/api/v1/notes/', limit=0, offset=0, count_strategy=SkippedCount())
+        page = paginator.page()
+        self.assertEqual(len(page['objects']), 6)
+        self.assertFalse('next' in page['meta'])
+
+    def test_client_opt_out(self):
+        request = QueryDict('count=false', mutable=True)
+        paginator = Paginator(request, self.data_set, resource_uri='/api/v1/notes/', limit=2, offset=0)
+        meta = paginator.page()['meta']
+        self.assertEqual(meta['total_count'], None)
+        self.assertEqual(meta['total_count_exact'], False)
+        self.assertTrue('count=false' in meta['next'])
+
+        request = QueryDict('count=true', mutable=True)
+        paginator = Paginator(request, self.data_set, resource_uri='/api/v1/notes/', limit=2, offset=0)
+        self.assertEqual(paginator.page()['meta']['total_count'], 6)
+
+    def test_cached(self):
+        strategy = CachedCount(timeout=60)
+        strategy.cache.set(strategy.get_cache_key(self.data_set), None)
+        paginator = Paginator({}, self.data_set, limit=2, offset=0, count_strategy=strategy)
+        self.assertEqual(paginator.get_total_count(), (6, False))
+        # A hit reports the same as the miss that filled it.
+        self.assertEqual(paginator.get_total_count(), (6, False))
+
+        Note.objects.create(title='Stale', slug='stale')
+        # Ordering doesn't matter, but filters do.
+        paginator = Paginator({}, Note.objects.order_by('-title'), limit=2, offset=0, count_strategy=strategy)
+        self.assertEqual(paginator.get_total_count(), (6, False))
+        paginator = Paginator({}, Note.objects.filter(is_active=True), limit=2, offset=0, count_strategy=strategy)
+        self.assertEqual(paginator.get_total_count(), (5, False))
+
+        paginator = Paginator({}, Note.objects.filter(pk__in=[]), limit=2, offset=0, count_strategy=strategy)
+        self.assertEqual(paginator.get_total_count(), (0, True))
+
+        paginator = Paginator({}, ['foo', 'bar'], limit=2, offset=0, count_strategy=strategy)
+        self.assertEqual(paginator.get_total_count(), (2, True))
+
+    def test_estimated(self):
+        strategy = EstimatedCount(threshold=100)
+        paginator = Paginator({}, self.data_set, limit=2, offset=0, count_strategy=strategy)
+        # SQLite has no estimate, so it's always exact.
+        self.assertEqual(strategy.get_estimate(self.data_set), None)
+        self.assertEqual(paginator.get_total_count(), (6, True))
+
+        strategy.get_estimate = lambda objects: 50
+        self.assertEqual(paginator.get_total_count(), (6, True))
+
+        strategy.get_estimate = lambda objects: 5000
+        self.assertEqual(paginator.get_total_count(), (5000, False))
+        self.assertEqual(paginator.page()['meta']['total_count_exact'], False)
+
+
+class CursorPaginatorTestCase(TestCase):
+    fixtures = ['note_testdata.json']
+
+    def setUp(self):
+        super(CursorPaginatorTestCase, self).setUp()
+        # Several notes share a ``created``, so the pk has to break ties.
+        self.data_set = Note.objects.order_by('-created')
+        self.expected = list(Note.objects.order_by('-created', 'pk'))
+
+    def get_page(self, query_string, objects=None):
+        request = QueryDict(query_string, mutable=True)
+
+        if objects is None:
+            objects = self.data_set
+
+        paginator = CursorPaginator(request, objects, resource_uri='/api/v1/notes/', limit=2)
+        return paginator.page()
+
+    def follow(self, uri):
+        return self.get_page(uri.split('?', 1)[1])
+
+    def test_get_ordering(self):
+        paginator = CursorPaginator({}, self.data_set)
+        ordering = [(field.name, descending) for field, descending in paginator.get_ordering()]
+        self.assertEqual(ordering, [('created', True), ('id', False)])
+
+        paginator = CursorPaginator({}, Note.objects.all())
+        self.assertEqual([(field.name, descending) for field, descending in paginator.get_ordering()], [('id', False)])
+
+        paginator = CursorPaginator({}, Note.objects.order_by('-pk', 'title'))
+        self.assertEqual([(field.name, descending) for field, descending in paginator.get_ordering()], [('id', True)])
+
+        # Relations, nullable fields & non-``QuerySets`` can't be paginated by key.
+        self.assertEqual(CursorPaginator({}, Note.objects.order_by('author__username')).get_ordering(), None)
+        self.assertEqual(CursorPaginator({}, Note.objects.order_by('author')).get_ordering(), None)
+        self.assertEqual(CursorPaginator({}, ['foo', 'bar']).get_ordering(), None)
+
+    def test_page_forwards_and_backwards(self):
+        page = self.get_page('')
+        self.assertEqual(page['objects'], self.expected[0:2])
+        self.assertEqual(page['meta']['limit'], 2)
+        self.assertEqual(page['meta']['total_count'], 6)
+        self.assertEqual(page['meta']['previous'], None)
+        self.assertTrue('offset' not in page['meta'])
+        self.assertTrue('cursor=' in page['meta']['next'])
+
+        page2 = self.follow(page['meta']['next'])
+        self.assertEqual(page2['objects'], self.expected[2:4])
+
+        page3 = self.follow(page2['meta']['next'])
+        self.assertEqual(page3['objects'], self.expected[4:6])
+        self.assertEqual(page3['meta']['next'], None)
+
+        back = self.follow(page3['meta']['previous'])
+        self.assertEqual(back['objects'], self.expected[2:4])
+        self.assertNotEqual(back['meta']['previous'], None)
+        self.assertNotEqual(back['meta']['next'], None)
+
+        first = self.follow(back['meta']['previous'])
+        self.assertEqual(first['objects'], self.expected[0:2])
+        self.assertEqual(first['meta']['previous'], None)
+        self.assertEqual(self.follow(first['meta']['next'])['objects'], self.expected[2:4])
+
+    def test_page_cost(self):
+        page = self.get_page('')
+        page2 = self.follow(page['meta']['next'])
+        next_uri = page2['meta']['next']
+
+        # One query for the page (no ``OFFSET``) & one for the count.
+        self.assertNumQueries(2, lambda: self.follow(next_uri))
+
+    def test_page_keeps_params(self):
+        page = self.get_page('format=json&is_active=true')
+        self.assertTrue('format=json' in page['meta']['next'])
+        self.assertTrue('limit=2' in page['meta']['next'])
+
+    def test_fallback(self):
+        # A client-supplied ``order_by``/``offset`` uses regular pagination.
+        page = self.get_page('order_by=title')
+        self.assertEqual(page['meta']['offset'], 0)
+        self.assertTrue('offset=2' in page['meta']['next'])
+        self.assertTrue('cursor' not in page['meta']['next'])
+
+        page = self.get_page('offset=2')
+        self.assertEqual(page['meta']['offset'], 2)
+        self.assertEqual(list(page['objects']), self.expected[2:4])
+
+        page = self.get_page('', objects=Note.objects.order_by('author__username'))
+        self.assertEqual(page['meta']['offset'], 0)
+
+        page = self.get_page('', objects=['foo', 'bar', 'baz'])
+        self.assertEqual(page['objects'], ['foo', 'bar'])
+        self.assertTrue('offset=2' in page['meta']['next'])
+
+    def test_invalid_cursor(self):
+        self.assertRaises(BadRequest, self.get_page, 'cursor=abc')
+        self.assertRaises(BadRequest, self.get_page, 'cursor=eyJiIjowLCJ2IjpbXX0=')
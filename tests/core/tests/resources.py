@@ -2,6 +2,7 @@ from decimal import Decimal
 import base64
 import copy
 import datetime
+import time
 
 from django import forms
 from django.conf import settings
@@ -10,7 +11,7 @@ from django.core import mail
 from django.core.cache import cache
 from django.core.exceptions import FieldError, MultipleObjectsReturned
 from django.core.urlresolvers import reverse
-from django.http import HttpRequest, QueryDict, Http404
+from django.http import HttpRequest, HttpResponse, QueryDict, Http404
 from django.test import TestCase
 from django.utils import unittest
 from django.utils import simplejson as json
@@ -20,11 +21,12 @@ from tastypie import fields
 from tastypie.authentication import BasicAuthentication
 from tastypie.authorization import Authorization
 from tastypie.bundle import Bundle
+from tastypie.cache import SimpleCache
 from tastypie.exceptions import InvalidFilterError, InvalidSortError, ImmediateHttpResponse, BadRequest, NotFound
 from tastypie.paginator import Paginator
 from tastypie.resources import Resource, ModelResource, ALL, ALL_WITH_RELATIONS, convert_post_to_put, convert_post_to_patch
 from tastypie.serializers import Serializer, lxml
-from tastypie.throttle import CacheThrottle
+from tastypie.throttle import CacheThrottle, ConcurrencyThrottle
 from tastypie.utils import aware_datetime, make_naive, now
 from tastypie.validation import Validation, FormValidation
 from core.models import Note, Subject, MediaBit, AutoNowNote
@@ -333,6 +335,41 @@ class ResourceTestCase(TestCase):
         self.assertEqual(another_bundle_1.data['owed'], Decimal('102.57'))
         self.assertEqual(another_bundle_1.data['bar'], "But sometimes I'm not ignored!")
 
+    def test_get_dehydrate_plan(self):
+        basic = BasicResource()
+        related_fields, steps = basic.get_dehydrate_plan()
+        self.assertEqual(related_fields, [])
+        self.assertEqual([step[0] for step in steps], basic.fields.keys())
+
+        hooks = dict([(field_name, method) for field_name, field_dehydrate, method in steps])
+        self.assertEqual(hooks['name'], None)
+        self.assertEqual(hooks['date_joined'], basic.dehydrate_date_joined)
+        self.assertEqual(hooks['resource_uri'], basic.dehydrate_resource_uri)
+
+        # Compiled once...
+        self.assertTrue(basic.get_dehydrate_plan()[1] is steps)
+        self.assertTrue(BasicResource().get_dehydrate_plan()[1] is not steps)
+
+        # ...but rebuilt if the fields change.
+        basic.fields['extra'] = fields.CharField(default='extra')
+        self.assertEqual(basic.fields.dehydrate_plan, None)
+        related_fields, steps = basic.get_dehydrate_plan()
+        self.assertTrue('extra' in [step[0] for step in steps])
+
+        test_object = TestObject()
+        test_object.name = 'Daniel'
+        bundle = basic.full_dehydrate(basic.build_bundle(obj=test_object))
+        self.assertEqual(bundle.data['extra'], 'extra')
+
+        # Or if a field gets replaced in place.
+        basic.fields['extra'] = fields.CharField(default='replaced')
+        bundle = basic.full_dehydrate(basic.build_bundle(obj=test_object))
+        self.assertEqual(bundle.data['extra'], 'replaced')
+
+        del(basic.fields['extra'])
+        bundle = basic.full_dehydrate(basic.build_bundle(obj=test_object))
+        self.assertFalse('extra' in bundle.data)
+
     def test_full_hydrate(self):
         basic = BasicResource()
         basic_bundle_1 = Bundle(data={
@@ -754,6 +791,18 @@ class CustomPageNoteResource(NoteResource):
         queryset = Note.objects.all()
 
 
+class OldStylePaginator(Paginator):
+    def __init__(self, request_data, objects, resource_uri=None, limit=None, offset=0, max_limit=1000, collection_name='objects'):
+        super(OldStylePaginator, self).__init__(request_data, objects, resource_uri=resource_uri, limit=limit, offset=offset, max_limit=max_limit, collection_name=collection_name)
+
+
+class OldStylePageNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'oldpagey'
+        paginator_class = OldStylePaginator
+        queryset = Note.objects.all()
+
+
 class AlwaysUserNoteResource(NoteResource):
     class Meta:
         resource_name = 'noteish'
@@ -799,6 +848,62 @@ class ThrottledNoteResource(NoteResource):
         throttle = CacheThrottle(throttle_at=2, timeframe=5, expiration=5)
 
 
+class ConsumeCountingThrottle(CacheThrottle):
+    def __init__(self, *args, **kwargs):
+        super(ConsumeCountingThrottle, self).__init__(*args, **kwargs)
+        self.consumed = []
+
+    def consume(self, identifier, **kwargs):
+        self.consumed.append((identifier, kwargs))
+        return super(ConsumeCountingThrottle, self).consume(identifier, **kwargs)
+
+
+class ConsumeThrottledNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'throttlednotes'
+        queryset = Note.objects.filter(is_active=True)
+        throttle = ConsumeCountingThrottle(throttle_at=2, timeframe=5, expiration=5)
+
+
+class CustomThrottleCheckNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'throttlednotes'
+        queryset = Note.objects.filter(is_active=True)
+        throttle = ConsumeCountingThrottle(throttle_at=2, timeframe=5, expiration=5)
+
+    def __init__(self, *args, **kwargs):
+        super(CustomThrottleCheckNoteResource, self).__init__(*args, **kwargs)
+        self.checked = 0
+
+    def throttle_check(self, request):
+        self.checked += 1
+        return super(CustomThrottleCheckNoteResource, self).throttle_check(request)
+
+
+class ConcurrencyThrottledNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'notes'
+        queryset = Note.objects.filter(is_active=True)
+        concurrency_throttle = ConcurrencyThrottle(max_concurrent=1)
+
+    def get_list(self, request, **kwargs):
+        self.in_flight = self._meta.concurrency_throttle.in_flight('noaddr_nohost')
+
+        if request.GET.get('fail'):
+            raise ValueError('Failed.')
+
+        return super(ConcurrencyThrottledNoteResource, self).get_list(request, **kwargs)
+
+
+class StreamingConcurrencyThrottledNoteResource(ConcurrencyThrottledNoteResource):
+    class Meta:
+        resource_name = 'notes'
+        queryset = Note.objects.filter(is_active=True)
+        concurrency_throttle = ConcurrencyThrottle(max_concurrent=1)
+        throttle = CacheThrottle(throttle_at=10)
+        stream_list = True
+
+
 class BasicAuthNoteResource(NoteResource):
     class Meta:
         resource_name = 'notes'
@@ -806,6 +911,15 @@ class BasicAuthNoteResource(NoteResource):
         authentication = BasicAuthentication()
 
 
+class IPThrottledNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'notes'
+        queryset = Note.objects.filter(is_active=True)
+        authentication = BasicAuthentication()
+        ip_throttle = CacheThrottle(throttle_at=2, timeframe=5, expiration=5)
+        ip_throttle_header = 'HTTP_X_FORWARDED_FOR'
+
+
 class NoUriNoteResource(ModelResource):
     class Meta:
         queryset = Note.objects.filter(is_active=True)
@@ -899,6 +1013,192 @@ class NullableMediaBitResource(ModelResource):
         resource_name = 'nullablemediabit'
 
 
+class ReverseCountingSubjectResource(ModelResource):
+    class Meta:
+        queryset = Subject.objects.all()
+        resource_name = 'subjects'
+        api_name = 'v1'
+
+    def _build_reverse_url(self, name, args=None, kwargs=None):
+        self.reversed = getattr(self, 'reversed', 0) + 1
+        return super(ReverseCountingSubjectResource, self)._build_reverse_url(name, args=args, kwargs=kwargs)
+
+
+class NestedNoteSubjectResource(ModelResource):
+    notes = fields.ToManyField(YetAnotherRelatedNoteResource, 'notes', full=True)
+
+    class Meta:
+        queryset = Subject.objects.all()
+        resource_name = 'nestedsubjects'
+
+
+class UriSubjectResource(SubjectResource):
+    def get_resource_uri(self, bundle_or_obj):
+        return '/api/v1/subjects/%s/' % bundle_or_obj.obj.id
+
+
+class PlannedRelatedNoteResource(ModelResource):
+    author = fields.ForeignKey(UserResource, 'author', full=True)
+    subjects = fields.ManyToManyField(UriSubjectResource, 'subjects')
+
+    class Meta:
+        queryset = Note.objects.all()
+        resource_name = 'relatednotes'
+
+    def get_resource_uri(self, bundle_or_obj):
+        return '/api/v1/relatednotes/%s/' % bundle_or_obj.obj.id
+
+
+class CostThrottledNoteResource(PlannedRelatedNoteResource):
+    class Meta:
+        queryset = Note.objects.all()
+        resource_name = 'relatednotes'
+        max_limit = 50
+        throttle = ConsumeCountingThrottle(throttle_at=200, timeframe=5, expiration=5)
+        throttle_by_cost = True
+        throttle_method_costs = {'post': 5, 'delete': 0.5}
+
+
+class UnplannedRelatedNoteResource(PlannedRelatedNoteResource):
+    class Meta:
+        queryset = Note.objects.all()
+        resource_name = 'relatednotes'
+        plan_related_queries = False
+
+
+class StreamingNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'notes'
+        queryset = Note.objects.filter(is_active=True)
+        stream_list = True
+
+
+class ConditionalNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'notes'
+        queryset = Note.objects.filter(is_active=True)
+        last_modified_attribute = 'updated'
+        list_validators = True
+
+
+class VersionedNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'notes'
+        queryset = Note.objects.filter(is_active=True)
+        version_attribute = 'id'
+        list_validators = True
+
+
+class SameVersionNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'notes'
+        queryset = Note.objects.filter(is_active=True)
+        # Every object has the same version.
+        version_attribute = 'is_active'
+
+
+class CachedListNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'cachedlistnotes'
+        queryset = Note.objects.filter(is_active=True)
+        cache = SimpleCache()
+        cache_list = True
+        last_modified_attribute = 'updated'
+
+
+class CachedDetailNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'cacheddetailnotes'
+        queryset = Note.objects.filter(is_active=True)
+        cache = SimpleCache()
+        authorization = Authorization()
+
+
+class CachedResponseNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'cachedresponsenotes'
+        queryset = Note.objects.filter(is_active=True)
+        cache = SimpleCache()
+        cache_detail = True
+        last_modified_attribute = 'updated'
+
+
+class UnversionedCachedResponseNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'unversionedcachedresponsenotes'
+        queryset = Note.objects.filter(is_active=True)
+        cache = SimpleCache()
+        cache_detail = True
+
+    def get_cache_scope(self, request):
+        # Everyone sees the same notes.
+        return None
+
+
+class HidingCachedResponseNoteResource(UnversionedCachedResponseNoteResource):
+    hidden = []
+
+    def apply_authorization_limits(self, request, object_list):
+        return object_list.exclude(pk__in=self.hidden)
+
+
+class FragmentCachedNoteResource(PlannedRelatedNoteResource):
+    class Meta:
+        queryset = Note.objects.all()
+        resource_name = 'relatednotes'
+        cache = SimpleCache()
+        cache_fragments = True
+        last_modified_attribute = 'updated'
+
+
+class DependentNoteResource(PlannedRelatedNoteResource):
+    class Meta:
+        queryset = Note.objects.all()
+        resource_name = 'relatednotes'
+        cache = SimpleCache()
+        cache_list = True
+        cache_detail = True
+
+
+class UriMediaBitResource(ModelResource):
+    class Meta:
+        queryset = MediaBit.objects.all()
+        resource_name = 'mediabits'
+
+    def get_resource_uri(self, bundle_or_obj):
+        return '/api/v1/mediabits/%s/' % bundle_or_obj.obj.id
+
+
+class MediaBitsNoteResource(ModelResource):
+    media_bits = fields.ToManyField(UriMediaBitResource, 'media_bits', full=True)
+    subjects = fields.ManyToManyField(UriSubjectResource, 'subjects')
+
+    class Meta:
+        queryset = Note.objects.filter(pk=1)
+        resource_name = 'mediabitnotes'
+        cache = SimpleCache()
+        cache_list = True
+
+    def get_resource_uri(self, bundle_or_obj):
+        return '/api/v1/mediabitnotes/%s/' % bundle_or_obj.obj.id
+
+
+class UnversionedFragmentCachedNoteResource(NoteResource):
+    class Meta:
+        queryset = Note.objects.filter(is_active=True)
+        resource_name = 'unversionedfragmentnotes'
+        cache = SimpleCache()
+        cache_fragments = True
+
+
+class StreamingRelatedNoteResource(PlannedRelatedNoteResource):
+    class Meta:
+        queryset = Note.objects.all()
+        resource_name = 'relatednotes'
+        stream_list = True
+        stream_chunk_size = 2
+
+
 class ReadOnlyRelatedNoteResource(ModelResource):
     author = fields.ToOneField(UserResource, 'author', readonly=True)
     my_property = fields.CharField(attribute='my_property', null=True, readonly=True)
@@ -1003,6 +1303,20 @@ class PerObjectNoteResource(NoteResource):
 # End per object authorization bits.
 
 
+class OwnObjGetNoteResource(NoteResource):
+    class Meta:
+        resource_name = 'notes'
+        queryset = Note.objects.filter(is_active=True)
+
+    def obj_get(self, request=None, **kwargs):
+        obj = super(OwnObjGetNoteResource, self).obj_get(request, **kwargs)
+
+        if obj.title.startswith('Another'):
+            raise Note.DoesNotExist("Hidden.")
+
+        return obj
+
+
 class ModelResourceTestCase(TestCase):
     fixtures = ['note_testdata.json']
     urls = 'core.tests.field_urls'
@@ -1220,6 +1534,31 @@ class ModelResourceTestCase(TestCase):
             'pk': 1,
         }), '/notes/1/')
 
+    def test_get_resource_uri_template(self):
+        resource = ReverseCountingSubjectResource()
+        self.assertEqual(resource.get_resource_uri(self.subject_1), '/api/v1/subjects/%s/' % self.subject_1.pk)
+        self.assertEqual(resource.reversed, 1)
+
+        # The compiled template matches what ``reverse`` would build.
+        for pk in [self.subject_2.pk, 12345, u'abc-def_9']:
+            bundle = Bundle(obj=Subject(pk=pk))
+            self.assertEqual(resource.get_resource_uri(bundle), reverse('api_dispatch_detail', kwargs={
+                'api_name': 'v1',
+                'resource_name': 'subjects',
+                'pk': pk,
+            }))
+
+        self.assertEqual(resource.reversed, 1)
+
+        # Values the template can't vouch for still go through ``reverse``.
+        self.assertEqual(resource.get_resource_uri(Bundle(obj=Subject(pk=u'a/b'))), '/api/v1/subjects/a/b/')
+        self.assertEqual(resource.reversed, 2)
+
+        # The list URI is only reversed once as well.
+        self.assertEqual(resource.get_resource_list_uri(), '/api/v1/subjects/')
+        self.assertEqual(resource.get_resource_list_uri(), '/api/v1/subjects/')
+        self.assertEqual(resource.reversed, 3)
+
     def test_get_via_uri(self):
         resource = NoteResource(api_name='v1')
         note_1 = resource.get_via_uri('/api/v1/notes/1/')
@@ -1980,6 +2319,28 @@ class ModelResourceTestCase(TestCase):
         self.assertEqual(related_obj.title, u'First Post!')
         self.assertEqual(list(related_obj.subjects.values_list('id', flat=True)), [1, 2])
 
+    def test_obj_get_many(self):
+        note = NoteResource()
+        self.assertEqual(note.obj_get_many(pk_list=[]), {})
+
+        # Inactive, missing & malformed pks are all simply left out.
+        found = note.obj_get_many(pk_list=['1', '2', '3', '7', 'abc'])
+        self.assertEqual(sorted(found.keys()), ['1', '2'])
+        self.assertEqual(found['1'].title, u'First Post!')
+        self.assertEqual(found['2'].title, u'Another Post')
+
+        self.assertNumQueries(1, note.obj_get_many, pk_list=['1', '2', '4', '6'])
+
+        # Authorization limits still apply.
+        per_object = PerObjectNoteResource()
+        found = per_object.obj_get_many(pk_list=['1', '2', '4'])
+        self.assertEqual(sorted(found.keys()), ['1', '2'])
+
+        # As does an overridden ``obj_get``.
+        own_obj_get = OwnObjGetNoteResource()
+        found = own_obj_get.obj_get_many(pk_list=['1', '2', '3', '4'])
+        self.assertEqual(sorted(found.keys()), ['1', '4'])
+
     def test_uri_fields(self):
         with_abs_url = WithAbsoluteURLNoteResource()
         with_abs_url_obj = with_abs_url.obj_get(pk=1)
@@ -2137,6 +2498,528 @@ class ModelResourceTestCase(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.content, '{"objects": [{"content": "This is my very first post using my shiny new API. Pretty sweet, huh?", "created": "2010-03-30T20:05:00", "id": "1", "is_active": true, "resource_uri": "/api/v1/notes/1/", "slug": "first-post", "title": "First Post!", "updated": "2010-03-30T20:05:00"}, {"content": "The dog ate my cat today. He looks seriously uncomfortable.", "created": "2010-03-31T20:05:00", "id": "2", "is_active": true, "resource_uri": "/api/v1/notes/2/", "slug": "another-post", "title": "Another Post", "updated": "2010-03-31T20:05:00"}, {"content": "My neighborhood\'s been kinda weird lately, especially after the lava flow took out the corner store. Granny can hardly outrun the magma with her walker.", "created": "2010-04-01T20:05:00", "id": "4", "is_active": true, "resource_uri": "/api/v1/notes/4/", "slug": "recent-volcanic-activity", "title": "Recent Volcanic Activity.", "updated": "2010-04-01T20:05:00"}, {"content": "Man, the second eruption came on fast. Granny didn\'t have a chance. On the upshot, I was able to save her walker and I got a cool shawl out of the deal!", "created": "2010-04-02T10:05:00", "id": "6", "is_active": true, "resource_uri": "/api/v1/notes/6/", "slug": "grannys-gone", "title": "Granny\'s Gone", "updated": "2010-04-02T10:05:00"}]}')
 
+        # Order is preserved & everything is fetched in a single query.
+        resp = resource.get_multiple(request, pk_list='6;abc;1')
+        self.assertEqual(resp.status_code, 200)
+        data = json.loads(resp.content)
+        self.assertEqual([obj['id'] for obj in data['objects']], ['6', '1'])
+        self.assertEqual(data['not_found'], ['abc'])
+        self.assertNumQueries(1, resource.get_multiple, request, pk_list='1;2;4;6')
+
+    def test_build_related_query_plan(self):
+        self.assertEqual(NoteResource.build_related_query_plan(), ([], []))
+        self.assertEqual(VeryCustomNoteResource.build_related_query_plan(), (['author'], []))
+        self.assertEqual(RelatedNoteResource.build_related_query_plan(), (['author'], ['subjects']))
+        self.assertEqual(AnotherSubjectResource.build_related_query_plan(), ([], ['notes']))
+        self.assertEqual(NestedNoteSubjectResource.build_related_query_plan(), ([], ['notes', 'notes__author', 'notes__subjects']))
+
+    @unittest.skipUnless(hasattr(Note.objects.all(), 'prefetch_related'), "Requires Django 1.4+ for 'prefetch_related'.")
+    def test_get_list_related_queries(self):
+        request = HttpRequest()
+        request.GET = {'format': 'json', 'limit': 0}
+        request.method = 'GET'
+
+        for note in Note.objects.all():
+            note.subjects.add(self.subject_1)
+
+        # Count + page + the prefetched subjects, regardless of page size.
+        resource = PlannedRelatedNoteResource()
+        self.assertNumQueries(3, resource.get_list, request)
+
+        # Without the plan, each note costs a query for the author & another
+        # for the subjects.
+        resource = UnplannedRelatedNoteResource()
+        self.assertNumQueries(2 + 2 * Note.objects.count(), resource.get_list, request)
+
+        planned = json.loads(PlannedRelatedNoteResource().get_list(request).content)
+        unplanned = json.loads(UnplannedRelatedNoteResource().get_list(request).content)
+        self.assertEqual(planned, unplanned)
+
+    def test_get_list_old_style_paginator(self):
+        # Paginators that don't take a ``count_strategy`` still work.
+        resource = OldStylePageNoteResource()
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        resp = resource.get_list(request)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(json.loads(resp.content)['meta']['total_count'], 6)
+
+    def test_get_list_streaming(self):
+        request = HttpRequest()
+        request.method = 'GET'
+
+        request.GET = {'format': 'json', 'limit': 0}
+
+        # Only the count runs up front. The objects are read as the response
+        # is written out.
+        responses = []
+        self.assertNumQueries(1, lambda: responses.append(StreamingNoteResource().get_list(request)))
+        resp = responses[0]
+        self.assertEqual(resp.status_code, 200)
+        body = []
+        self.assertNumQueries(1, lambda: body.extend(resp))
+        self.assertEqual(''.join(body), NoteResource().get_list(request).content)
+
+        if lxml is not None:
+            # Field order follows ``dict`` ordering, so compare the parsed data.
+            serializer = Serializer()
+            request.GET = {'format': 'xml', 'limit': 0}
+            streamed = StreamingNoteResource().get_list(request).content.replace('response', 'request')
+            expected = NoteResource().get_list(request).content.replace('response', 'request')
+            self.assertEqual(serializer.from_xml(streamed), serializer.from_xml(expected))
+
+        request.GET = {'format': 'jsonp', 'callback': 'myCallback', 'limit': 2, 'offset': 1}
+        resp = StreamingNoteResource().get_list(request)
+        self.assertEqual(resp.content, NoteResource().get_list(request).content)
+
+    @unittest.skipUnless(hasattr(Note.objects.all(), 'prefetch_related'), "Requires Django 1.4+ for 'prefetch_related'.")
+    def test_get_list_streaming_related_queries(self):
+        request = HttpRequest()
+        request.GET = {'format': 'json', 'limit': 0}
+        request.method = 'GET'
+
+        for note in Note.objects.all():
+            note.subjects.add(self.subject_1)
+
+        # Count + page + the prefetched subjects for each chunk of two.
+        resource = StreamingRelatedNoteResource()
+        chunks = (Note.objects.count() + 1) // 2
+        self.assertNumQueries(2 + chunks, lambda: resource.get_list(request).content)
+
+        streamed = json.loads(resource.get_list(request).content)
+        planned = json.loads(PlannedRelatedNoteResource().get_list(request).content)
+        self.assertEqual(streamed, planned)
+
+    def test_get_detail_conditional(self):
+        resource = ConditionalNoteResource()
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        resp = resource.get_detail(request, pk=1)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+        self.assertTrue(etag.startswith('"'))
+        # The fixture times are in ``TIME_ZONE`` (America/Chicago).
+        self.assertEqual(resp['Last-Modified'], 'Wed, 31 Mar 2010 01:05:00 GMT')
+
+        # Matching validators skip dehydration entirely.
+        def fail(bundle):
+            self.fail("Shouldn't dehydrate.")
+
+        resource.full_dehydrate = fail
+        request.META = {'HTTP_IF_NONE_MATCH': etag}
+        resp = resource.get_detail(request, pk=1)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+        self.assertEqual(resp.content, '')
+
+        request.META = {'HTTP_IF_MODIFIED_SINCE': 'Wed, 31 Mar 2010 01:05:00 GMT'}
+        self.assertEqual(resource.get_detail(request, pk=1).status_code, 304)
+        request.META = {'HTTP_IF_NONE_MATCH': '*'}
+        self.assertEqual(resource.get_detail(request, pk=1).status_code, 304)
+        del resource.full_dehydrate
+
+        request.META = {'HTTP_IF_MODIFIED_SINCE': 'Wed, 31 Mar 2010 01:04:59 GMT'}
+        self.assertEqual(resource.get_detail(request, pk=1).status_code, 200)
+        # If-None-Match wins over If-Modified-Since.
+        request.META = {'HTTP_IF_NONE_MATCH': '"abc"', 'HTTP_IF_MODIFIED_SINCE': 'Wed, 31 Mar 2010 01:05:00 GMT'}
+        self.assertEqual(resource.get_detail(request, pk=1).status_code, 200)
+
+        if lxml is not None:
+            # The format is part of the representation.
+            request.META = {'HTTP_IF_NONE_MATCH': etag}
+            request.GET = {'format': 'xml'}
+            resp = resource.get_detail(request, pk=1)
+            self.assertEqual(resp.status_code, 200)
+            self.assertNotEqual(resp['ETag'], etag)
+
+        # Saving bumps ``updated``.
+        request.GET = {'format': 'json'}
+        Note.objects.get(pk=1).save()
+        resp = resource.get_detail(request, pk=1)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+        # Nothing is configured by default.
+        request.META = {}
+        resp = NoteResource().get_detail(request, pk=1)
+        self.assertFalse(resp.has_header('ETag'))
+        self.assertFalse(resp.has_header('Last-Modified'))
+
+        resp = VersionedNoteResource().get_detail(request, pk=1)
+        self.assertTrue(resp.has_header('ETag'))
+        self.assertFalse(resp.has_header('Last-Modified'))
+
+    def test_get_list_conditional(self):
+        resource = ConditionalNoteResource()
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        resp = resource.get_list(request)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+        # The latest change can't tell if an object's been deleted, so lists
+        # only get an ``ETag``.
+        self.assertFalse(resp.has_header('Last-Modified'))
+
+        # Only the aggregate query runs.
+        request.META = {'HTTP_IF_NONE_MATCH': etag}
+        self.assertNumQueries(1, resource.get_list, request)
+        resp = resource.get_list(request)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        # Different pages are different representations.
+        request.GET = {'format': 'json', 'limit': 2}
+        self.assertEqual(resource.get_list(request).status_code, 200)
+
+        # Deleting a note changes the count, even if not the ``MAX()``.
+        request.GET = {'format': 'json'}
+        Note.objects.get(pk=2).delete()
+        resp = resource.get_list(request)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+        request.META = {'HTTP_IF_MODIFIED_SINCE': 'Fri, 02 Apr 2010 15:05:00 GMT'}
+        self.assertEqual(resource.get_list(request).status_code, 200)
+
+        request.META = {'HTTP_IF_NONE_MATCH': resp['ETag']}
+        resp = VersionedNoteResource().get_list(request)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.has_header('Last-Modified'))
+        request.META = {'HTTP_IF_NONE_MATCH': resp['ETag']}
+        self.assertEqual(VersionedNoteResource().get_list(request).status_code, 304)
+
+        request.META = {}
+        self.assertFalse(NoteResource().get_list(request).has_header('ETag'))
+
+    def test_get_list_conditional_lazy(self):
+        resource = SameVersionNoteResource()
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        # Without ``Meta.list_validators``, unconditional requests skip the
+        # aggregate query (leaving the count & page).
+        self.assertNumQueries(2, resource.get_list, request)
+        self.assertFalse(resource.get_list(request).has_header('ETag'))
+
+        # Conditional requests still get them.
+        request.META = {'HTTP_IF_NONE_MATCH': '"nope"'}
+        resp = resource.get_list(request)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+        request.META = {'HTTP_IF_NONE_MATCH': etag}
+        self.assertEqual(resource.get_list(request).status_code, 304)
+
+        # Swapping one object for another with the same version changes it.
+        Note.objects.get(pk=2).delete()
+        Note.objects.create(title='Swapped', slug='swapped', is_active=True)
+        resp = resource.get_list(request)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_get_list_cached(self):
+        resource = CachedListNoteResource()
+        resource.bump_cache_generation()
+        request = HttpRequest()
+        request.GET = {'format': 'json', 'limit': '2'}
+        request.method = 'GET'
+
+        resp = resource.get_list(request)
+        self.assertEqual(resp.status_code, 200)
+        content = resp.content
+
+        # Served from the cache, with no queries at all.
+        self.assertNumQueries(0, resource.get_list, request)
+        resp = resource.get_list(request)
+        self.assertEqual(resp.content, content)
+        self.assertEqual(resp['Content-Type'], 'application/json; charset=utf-8')
+        self.assertTrue(resp.has_header('ETag'))
+
+        # The key is normalized...
+        request.GET = {'limit': 2, 'format': 'json'}
+        self.assertNumQueries(0, resource.get_list, request)
+
+        # ...but anything that changes the response misses.
+        request.GET = {'format': 'json', 'limit': '1'}
+        self.assertNotEqual(resource.get_list(request).content, content)
+
+        if lxml is not None:
+            request.GET = {'format': 'xml', 'limit': '2'}
+            self.assertTrue(resource.get_list(request).content.startswith('<?xml'))
+
+        request.GET = {'format': 'json', 'limit': '2'}
+        request.user = User.objects.get(username='johndoe')
+        self.assertNumQueries(3, resource.get_list, request)
+        del request.user
+
+        # Conditional requests still get a 304.
+        request.META = {'HTTP_IF_NONE_MATCH': resp['ETag']}
+        self.assertEqual(resource.get_list(request).status_code, 304)
+        request.META = {}
+
+        # Saving any note starts a new generation.
+        generation = resource.get_cache_generation()
+        note = Note.objects.get(pk=1)
+        note.title = 'Updated'
+        note.save()
+        self.assertNotEqual(resource.get_cache_generation(), generation)
+        resp = resource.get_list(request)
+        self.assertNotEqual(resp.content, content)
+        self.assertTrue('"Updated"' in resp.content)
+
+        generation = resource.get_cache_generation()
+        note.delete()
+        self.assertNotEqual(resource.get_cache_generation(), generation)
+        self.assertFalse('"Updated"' in resource.get_list(request).content)
+
+    def test_get_detail_cached(self):
+        resource = CachedResponseNoteResource()
+        cache.clear()
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        dehydrated = []
+        full_dehydrate = resource.full_dehydrate
+        resource.full_dehydrate = lambda bundle: dehydrated.append(bundle.obj.pk) or full_dehydrate(bundle)
+
+        resp = resource.get_detail(request, pk=1)
+        self.assertEqual(resp.status_code, 200)
+        content = resp.content
+
+        # A hit returns the stored bytes without dehydrating anything.
+        resp = resource.get_detail(request, pk=1)
+        self.assertEqual(resp.content, content)
+        self.assertEqual(resp['Content-Type'], 'application/json; charset=utf-8')
+        self.assertEqual(resp['Last-Modified'], 'Wed, 31 Mar 2010 01:05:00 GMT')
+        self.assertEqual(dehydrated, [1])
+
+        request.META = {'HTTP_IF_NONE_MATCH': resp['ETag']}
+        self.assertEqual(resource.get_detail(request, pk=1).status_code, 304)
+        request.META = {}
+
+        # Other formats & users get their own entries.
+        if lxml is not None:
+            request.GET = {'format': 'xml'}
+            self.assertTrue(resource.get_detail(request, pk=1).content.startswith('<?xml'))
+        else:
+            request.GET = {'format': 'jsonp', 'callback': 'myCallback'}
+            self.assertTrue(resource.get_detail(request, pk=1).content.startswith('myCallback('))
+
+        request.GET = {'format': 'json'}
+        request.user = User.objects.get(username='johndoe')
+        resource.get_detail(request, pk=1)
+        self.assertEqual(dehydrated, [1, 1, 1])
+        del request.user
+
+        # A new version misses.
+        note = Note.objects.get(pk=1)
+        note.title = u'Updated'
+        note.save()
+        self.assertTrue('"Updated"' in resource.get_detail(request, pk=1).content)
+
+    def test_get_detail_cached_unversioned(self):
+        resource = UnversionedCachedResponseNoteResource()
+        cache.clear()
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        content = resource.get_detail(request, pk=1).content
+
+        # Only the object is fetched, & users share entries.
+        dehydrated = []
+        full_dehydrate = resource.full_dehydrate
+        resource.full_dehydrate = lambda bundle: dehydrated.append(bundle.obj.pk) or full_dehydrate(bundle)
+        request.user = User.objects.get(username='johndoe')
+        self.assertNumQueries(1, resource.get_detail, request, pk=1)
+        self.assertEqual(resource.get_detail(request, pk=1).content, content)
+        self.assertEqual(dehydrated, [])
+
+        self.assertEqual(resource.get_detail(request, pk=999).status_code, 404)
+
+        # Without versions, any change starts over.
+        note = Note.objects.get(pk=2)
+        note.title = u'Updated'
+        note.save()
+        resource.get_detail(request, pk=1)
+        self.assertEqual(dehydrated, [1])
+
+    def test_get_detail_cached_authorization(self):
+        resource = HidingCachedResponseNoteResource()
+        cache.clear()
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        self.assertEqual(resource.get_detail(request, pk=1).status_code, 200)
+        self.assertEqual(resource.get_detail(request, pk=1).status_code, 200)
+
+        # Losing access takes effect straight away, despite the cached entry.
+        resource.hidden = [1]
+        self.assertEqual(resource.get_detail(request, pk=1).status_code, 404)
+        resource.hidden = []
+        self.assertEqual(resource.get_detail(request, pk=1).status_code, 200)
+
+    def test_get_list_cached_fragments(self):
+        resource = FragmentCachedNoteResource()
+        cache.clear()
+        dehydrated = []
+        full_dehydrate = resource.full_dehydrate
+        resource.full_dehydrate = lambda bundle: dehydrated.append(bundle.obj.pk) or full_dehydrate(bundle)
+        request = HttpRequest()
+        request.GET = {'format': 'json', 'limit': '4'}
+        request.method = 'GET'
+
+        content = resource.get_list(request).content
+        self.assertEqual(dehydrated, [1, 2, 3, 4])
+
+        # Every object is a hit, including the ``full=True`` authors.
+        self.assertEqual(resource.get_list(request).content, content)
+        self.assertEqual(dehydrated, [1, 2, 3, 4])
+
+        if lxml is not None:
+            request.GET = {'format': 'xml', 'limit': '4'}
+            xml = resource.get_list(request).content
+            serializer = resource._meta.serializer
+            self.assertEqual(serializer.from_xml(xml), serializer.from_xml(PlannedRelatedNoteResource().get_list(request).content))
+
+        request.GET = {'format': 'json', 'limit': '5'}
+        resource.get_list(request)
+        self.assertEqual(dehydrated, [1, 2, 3, 4, 5])
+
+        # Only the changed object misses.
+        note = Note.objects.get(pk=2)
+        note.title = u'Updated'
+        note.save()
+        request.GET = {'format': 'json', 'limit': '4'}
+        self.assertTrue('"Updated"' in resource.get_list(request).content)
+        self.assertEqual(dehydrated, [1, 2, 3, 4, 5, 2])
+
+        # As do other users.
+        request.user = User.objects.get(username='johndoe')
+        resource.get_list(request)
+        self.assertEqual(len(dehydrated), 10)
+        del request.user
+
+        # Changing an author only expires the objects embedding that author.
+        User.objects.get(username='janedoe').save()
+        resource.get_list(request)
+        self.assertEqual(sorted(dehydrated[10:]), [3, 4])
+
+    def test_get_list_cached_fragments_unversioned(self):
+        resource = UnversionedFragmentCachedNoteResource()
+        cache.clear()
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        content = resource.get_list(request).content
+        bundles = [resource.build_bundle(obj=obj) for obj in Note.objects.filter(is_active=True)]
+        self.assertEqual(len(resource._meta.cache.get_many([resource.get_fragment_cache_key(bundle) for bundle in bundles])), 4)
+        self.assertEqual(resource.get_list(request).content, content)
+
+        # Without versions, any change starts over.
+        Note.objects.get(pk=1).save()
+        self.assertEqual(len(resource._meta.cache.get_many([resource.get_fragment_cache_key(bundle) for bundle in bundles])), 0)
+
+    def test_dependency_invalidation(self):
+        resource = DependentNoteResource()
+        cache.clear()
+        # The embedded authors & the (to-many) subjects.
+        embedded, fallbacks, memberships, links = DependentNoteResource.get_dependency_index()
+        self.assertEqual(embedded, set([User]))
+        self.assertEqual(fallbacks, set())
+        self.assertEqual(memberships, {Note: [(Subject.notes.through, 'note', Subject._meta.get_field('notes'))]})
+        self.assertEqual(NoteResource.get_dependency_graph(), {})
+
+        dehydrated = []
+        full_dehydrate = resource.full_dehydrate
+        resource.full_dehydrate = lambda bundle: dehydrated.append(bundle.obj.pk) or full_dehydrate(bundle)
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        resource.get_detail(request, pk=1)
+        resource.get_detail(request, pk=3)
+        list_content = resource.get_list(request).content
+        self.assertEqual(len(dehydrated), 8)
+        resource.get_detail(request, pk=1)
+        resource.get_detail(request, pk=3)
+        self.assertEqual(resource.get_list(request).content, list_content)
+        self.assertEqual(len(dehydrated), 8)
+
+        # Changing an author only expires what embeds that author.
+        user = User.objects.get(username='johndoe')
+        user.email = 'johndoe@example.com'
+        user.save()
+        self.assertTrue('johndoe@example.com' in resource.get_detail(request, pk=1).content)
+        resource.get_detail(request, pk=3)
+        self.assertEqual(dehydrated[8:], [1])
+        self.assertTrue('johndoe@example.com' in resource.get_list(request).content)
+
+        # Changing the subjects of a note only expires what lists them.
+        del(dehydrated[:])
+        subject = Subject.objects.create(name='Testing', url='/testing/')
+        Note.objects.get(pk=3).subjects.add(subject)
+        resource.get_detail(request, pk=1)
+        self.assertEqual(dehydrated, [])
+        self.assertTrue('/api/v1/subjects/%s/' % subject.pk in resource.get_detail(request, pk=3).content)
+        self.assertEqual(dehydrated, [3])
+
+        # Nothing read before a change gets stored after it.
+        epoch = resource.get_dependency_epoch()
+        user.save()
+        cache_key = resource.get_list_cache_key(request)
+        resource.set_cached_response(cache_key, HttpResponse('Stale'), dependencies=set([resource.get_dependency_cache_key('auth.user', user.pk)]), epoch=epoch)
+        self.assertEqual(resource.get_cached_response(request, cache_key), None)
+
+    def test_dependency_invalidation_to_many(self):
+        resource = MediaBitsNoteResource()
+        cache.clear()
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+        MediaBit.objects.filter(note=1).delete()
+        Note.objects.get(pk=1).subjects.clear()
+        MediaBit.objects.create(note_id=1, title='First')
+
+        def get_bits():
+            data = json.loads(resource.get_list(request).content)['objects'][0]
+            return [bit['title'] for bit in data['media_bits']], data['subjects']
+
+        self.assertEqual(get_bits(), ([u'First'], []))
+        self.assertNumQueries(0, get_bits)
+
+        # New related objects (not just changed ones) expire the list.
+        bit = MediaBit.objects.create(note_id=1, title='Second')
+        self.assertEqual(get_bits(), ([u'First', u'Second'], []))
+        bit.title = 'Edited'
+        bit.save()
+        self.assertEqual(get_bits(), ([u'First', u'Edited'], []))
+
+        # Moving one to another note expires the list it left & joined.
+        bit.note_id = 2
+        bit.save()
+        self.assertEqual(get_bits(), ([u'First'], []))
+        bit.note_id = 1
+        bit.save()
+        self.assertEqual(get_bits(), ([u'First', u'Edited'], []))
+        bit.delete()
+        self.assertEqual(get_bits(), ([u'First'], []))
+
+        # As do many-to-many changes, from either side.
+        subject = Subject.objects.create(name='Testing', url='/testing/')
+        self.assertEqual(get_bits(), ([u'First'], []))
+        Note.objects.get(pk=1).subjects.add(subject)
+        self.assertEqual(get_bits(), ([u'First'], [u'/api/v1/subjects/%s/' % subject.pk]))
+        subject.notes.clear()
+        self.assertEqual(get_bits(), ([u'First'], []))
+
     def test_check_throttling(self):
         # Stow.
         old_debug = settings.DEBUG
@@ -2162,7 +3045,7 @@ class ModelResourceTestCase(TestCase):
             resp = resource.dispatch('list', request)
             self.fail()
         except ImmediateHttpResponse, e:
-            self.assertEqual(e.response.status_code, 403)
+            self.assertEqual(e.response.status_code, 429)
             self.assertEqual(len(cache.get('noaddr_nohost_accesses')), 2)
 
         # Throttled.
@@ -2170,17 +3053,224 @@ class ModelResourceTestCase(TestCase):
             resp = resource.dispatch('list', request)
             self.fail()
         except ImmediateHttpResponse, e:
-            self.assertEqual(e.response.status_code, 403)
+            self.assertEqual(e.response.status_code, 429)
             self.assertEqual(len(cache.get('noaddr_nohost_accesses')), 2)
 
         # Check the ``wrap_view``.
         resp = resource.wrap_view('dispatch_list')(request)
-        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(resp.status_code, 429)
         self.assertEqual(len(cache.get('noaddr_nohost_accesses')), 2)
 
         # Restore.
         settings.DEBUG = old_debug
 
+    def test_consume_throttle(self):
+        cache.delete('noaddr_nohost_accesses')
+        resource = ConsumeThrottledNoteResource()
+        self.assertEqual(resource.has_custom_throttle_hooks(), False)
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        # One combined call per request.
+        resp = resource.dispatch('list', request)
+        self.assertEqual(resp.status_code, 200)
+        identifier, kwargs = resource._meta.throttle.consumed[0]
+        self.assertEqual(identifier, 'noaddr_nohost')
+        self.assertEqual(sorted(kwargs.keys()), ['cost', 'request_method', 'resource_name', 'status', 'url'])
+        self.assertEqual((kwargs['url'], kwargs['request_method'], kwargs['resource_name'], kwargs['cost']), ('', 'get', 'throttlednotes', 1))
+        self.assertEqual(len(cache.get('noaddr_nohost_accesses')), 1)
+        self.assertEqual(resp['X-RateLimit-Limit'], '2')
+        self.assertEqual(resp['X-RateLimit-Remaining'], '1')
+        self.assertTrue(int(resp['X-RateLimit-Reset']) > time.time())
+
+        resp = resource.dispatch('list', request)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['X-RateLimit-Remaining'], '0')
+
+        try:
+            resource.dispatch('list', request)
+            self.fail()
+        except ImmediateHttpResponse, e:
+            self.assertEqual(e.response.status_code, 429)
+            self.assertEqual(e.response['X-RateLimit-Remaining'], '0')
+            self.assertTrue(1 <= int(e.response['Retry-After']) <= 6)
+            self.assertEqual(len(resource._meta.throttle.consumed), 3)
+            self.assertEqual(len(cache.get('noaddr_nohost_accesses')), 2)
+
+        cache.delete('noaddr_nohost_accesses')
+
+    def test_ip_throttle_check(self):
+        resource = IPThrottledNoteResource()
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+        request.META['REMOTE_ADDR'] = '10.0.0.1'
+        request.META['HTTP_AUTHORIZATION'] = 'Basic %s' % base64.b64encode('nobody:pass')
+        self.assertEqual(resource.get_client_ip(request), '10.0.0.1')
+
+        # The address added by the proxy is the last one.
+        request.META['HTTP_X_FORWARDED_FOR'] = '1.2.3.4, 192.168.1.1'
+        self.assertEqual(resource.get_client_ip(request), '192.168.1.1')
+        self.assertEqual(NoteResource().get_client_ip(request), '10.0.0.1')
+
+        resp = resource.wrap_view('dispatch_list')(request)
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(len(cache.get('ip_192.168.1.1_accesses')), 1)
+        self.assertNumQueries(1, lambda: resource.wrap_view('dispatch_list')(request))
+
+        # Rejected before authenticating, without any queries.
+        self.assertNumQueries(0, lambda: resource.wrap_view('dispatch_list')(request))
+        resp = resource.wrap_view('dispatch_list')(request)
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(resp['X-RateLimit-Limit'], '2')
+        self.assertTrue(resp.has_header('Retry-After'))
+
+        # Other addresses are unaffected.
+        request.META['HTTP_X_FORWARDED_FOR'] = '192.168.1.2'
+        resp = resource.wrap_view('dispatch_list')(request)
+        self.assertEqual(resp.status_code, 401)
+
+        cache.delete('ip_192.168.1.1_accesses')
+        cache.delete('ip_192.168.1.2_accesses')
+
+    def test_concurrency_throttle(self):
+        resource = ConcurrencyThrottledNoteResource()
+        throttle = resource._meta.concurrency_throttle
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        # Held while the request is handled.
+        resp = resource.dispatch('list', request)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resource.in_flight, 1)
+        self.assertEqual(throttle.in_flight('noaddr_nohost'), 0)
+
+        # Even if it fails.
+        request.GET = {'format': 'json', 'fail': '1'}
+        self.assertRaises(ValueError, resource.dispatch, 'list', request)
+        self.assertEqual(throttle.in_flight('noaddr_nohost'), 0)
+
+        # Over the limit.
+        request.GET = {'format': 'json'}
+        throttle.acquire('noaddr_nohost', resource_name='notes', request_method='get')
+
+        try:
+            resource.dispatch('list', request)
+            self.fail()
+        except ImmediateHttpResponse, e:
+            self.assertEqual(e.response.status_code, 429)
+
+        self.assertEqual(throttle.in_flight('noaddr_nohost'), 1)
+        throttle.release('noaddr_nohost')
+        resp = resource.dispatch('list', request)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_concurrency_throttle_streaming(self):
+        resource = StreamingConcurrencyThrottledNoteResource()
+        throttle = resource._meta.concurrency_throttle
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+        cache.delete('noaddr_nohost_accesses')
+
+        # Held until the response has been written out & closed.
+        resp = resource.dispatch('list', request)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(throttle.in_flight('noaddr_nohost'), 1)
+        self.assertEqual(json.loads(''.join(resp))['meta']['total_count'], 4)
+        self.assertEqual(throttle.in_flight('noaddr_nohost'), 0)
+        resp.close()
+        self.assertEqual(throttle.in_flight('noaddr_nohost'), 0)
+
+        # Or closed without being read.
+        resp = resource.dispatch('list', request)
+        self.assertEqual(throttle.in_flight('noaddr_nohost'), 1)
+        resp.close()
+        self.assertEqual(throttle.in_flight('noaddr_nohost'), 0)
+        self.assertEqual(len(cache.get('noaddr_nohost_accesses')), 2)
+
+        # Requests turned away for having one in flight aren't charged to
+        # the throttle.
+        resp = resource.dispatch('list', request)
+
+        try:
+            resource.dispatch('list', request)
+            self.fail()
+        except ImmediateHttpResponse, e:
+            self.assertEqual(e.response.status_code, 429)
+
+        resp.close()
+        self.assertEqual(throttle.in_flight('noaddr_nohost'), 0)
+        self.assertEqual(len(cache.get('noaddr_nohost_accesses')), 3)
+
+        # Nor are those throttled left holding one.
+        cache.set('noaddr_nohost_accesses', [int(time.time())] * 10)
+
+        try:
+            resource.dispatch('list', request)
+            self.fail()
+        except ImmediateHttpResponse, e:
+            self.assertEqual(e.response.status_code, 429)
+
+        self.assertEqual(throttle.in_flight('noaddr_nohost'), 0)
+        cache.delete('noaddr_nohost_accesses')
+
+    def test_get_throttle_cost(self):
+        request = HttpRequest()
+        request.method = 'GET'
+
+        # Everything costs 1 by default.
+        resource = PlannedRelatedNoteResource()
+        self.assertEqual(resource.get_throttle_cost(request, 'list'), 1)
+
+        # Otherwise, it's per object & ``full=True`` field.
+        resource = CostThrottledNoteResource()
+        self.assertEqual(resource.get_throttle_cost(request, 'list'), 40)
+        self.assertEqual(resource.get_throttle_cost(request, 'detail', pk=1), 2)
+        self.assertEqual(resource.get_throttle_cost(request, 'multiple', pk_list='1;2;3'), 6)
+        self.assertEqual(resource.get_throttle_cost(request, 'schema'), 2)
+
+        request.GET = {'limit': '5'}
+        self.assertEqual(resource.get_throttle_cost(request, 'list'), 10)
+        request.GET = {'limit': '0'}
+        self.assertEqual(resource.get_throttle_cost(request, 'list'), 100)
+
+        request.method = 'POST'
+        self.assertEqual(resource.get_throttle_cost(request, 'list'), 10)
+        request.method = 'DELETE'
+        self.assertEqual(resource.get_throttle_cost(request, 'detail', pk=1), 1)
+
+        # Which the throttle is given.
+        cache.delete('noaddr_nohost_accesses')
+        request.method = 'GET'
+        request.GET = {'format': 'json', 'limit': '2'}
+        resp = resource.dispatch('list', request)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resource._meta.throttle.consumed[-1][1]['cost'], 4)
+        self.assertEqual(cache.get('noaddr_nohost_accesses')[0][1], 4)
+        cache.delete('noaddr_nohost_accesses')
+
+    def test_consume_throttle_custom_hooks(self):
+        cache.delete('noaddr_nohost_accesses')
+        resource = CustomThrottleCheckNoteResource()
+        self.assertEqual(resource.has_custom_throttle_hooks(), True)
+        request = HttpRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'GET'
+
+        # The overridden ``throttle_check`` is used instead (without any
+        # headers).
+        resp = resource.dispatch('list', request)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.has_header('X-RateLimit-Limit'))
+        self.assertEqual(resource.checked, 1)
+        self.assertEqual(resource._meta.throttle.consumed, [])
+        self.assertEqual(len(cache.get('noaddr_nohost_accesses')), 1)
+
+        cache.delete('noaddr_nohost_accesses')
+
     def test_generate_cache_key(self):
         resource = NoteResource()
         self.assertEqual(resource.generate_cache_key(), 'None:notes::')
@@ -2188,6 +3278,20 @@ class ModelResourceTestCase(TestCase):
         self.assertEqual(resource.generate_cache_key(foo='bar', moof='baz'), 'None:notes::foo=bar:moof=baz')
         self.assertEqual(resource.generate_cache_key('abc', '123', foo='bar', moof='baz'), 'None:notes:abc:123:foo=bar:moof=baz')
 
+        # Deterministic, regardless of ``kwargs`` order or value types.
+        self.assertEqual(resource.generate_cache_key('detail', pk=5), 'None:notes:detail:pk=5')
+        self.assertEqual(resource.generate_cache_key('detail', pk=u'5'), 'None:notes:detail:pk=5')
+        self.assertEqual(resource.generate_cache_key(**dict([('z%d' % i, i) for i in range(10)])), resource.generate_cache_key(**dict([('z%d' % i, i) for i in reversed(range(10))])))
+
+        # Keys memcached won't accept are hashed.
+        for kwargs in ({'slug': 'a' * 250}, {'slug': u'\u2603'}, {'title': 'First Post!'}):
+            key = resource.generate_cache_key('detail', **kwargs)
+            self.assertTrue(key.startswith('tastypie:'))
+            self.assertEqual(len(key), 41)
+            self.assertEqual(key, resource.generate_cache_key('detail', **kwargs))
+
+        self.assertNotEqual(resource.generate_cache_key('detail', slug='a' * 250), resource.generate_cache_key('detail', slug='a' * 251))
+
     def test_cached_fetch_list(self):
         resource = NoteResource()
 
@@ -2202,6 +3306,41 @@ class ModelResourceTestCase(TestCase):
         self.assertTrue(isinstance(obj, Note))
         self.assertEqual(obj.title, u'First Post!')
 
+    def test_cached_fetch_detail_invalidation(self):
+        resource = CachedDetailNoteResource()
+        cache.clear()
+
+        obj = resource.cached_obj_get(pk=1)
+        self.assertEqual(obj.title, u'First Post!')
+        self.assertNumQueries(0, resource.cached_obj_get, pk=1)
+        self.assertNumQueries(0, resource.cached_obj_get, pk=u'1')
+
+        # Saving the model evicts it.
+        note = Note.objects.get(pk=1)
+        note.title = u'Edited'
+        note.save()
+        self.assertEqual(resource.cached_obj_get(pk='1').title, u'Edited')
+
+        # Other lookups are evicted by the write methods, which know them.
+        self.assertEqual(resource.cached_obj_get(slug='first-post').title, u'Edited')
+        Note.objects.filter(pk=1).update(title=u'Bulk')
+        self.assertEqual(resource.cached_obj_get(slug='first-post').title, u'Edited')
+        resource.invalidate_cache(slug='first-post')
+        self.assertEqual(resource.cached_obj_get(slug='first-post').title, u'Bulk')
+
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+        request.method = 'PUT'
+        request.raw_post_data = '{"content": "Updated.", "created": "2010-03-30 20:05:00", "is_active": true, "slug": "first-post", "title": "Put", "updated": "2010-03-30 20:05:00"}'
+        resp = resource.put_detail(request, pk='1')
+        self.assertEqual(resp.status_code, 204)
+        self.assertEqual(resource.cached_obj_get(pk=1).title, u'Put')
+
+        request.method = 'DELETE'
+        resp = resource.delete_detail(request, pk='1')
+        self.assertEqual(resp.status_code, 204)
+        self.assertRaises(Note.DoesNotExist, resource.cached_obj_get, pk=1)
+
     def test_configuration(self):
         note = NoteResource()
         self.assertEqual(len(note.fields), 8)
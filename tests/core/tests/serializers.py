@@ -240,6 +240,66 @@ class SerializerTestCase(TestCase):
         options = {'callback': 'myCallback'}
         self.assertEqual(serializer.to_jsonp(sample_1, options), 'myCallback({"age": 27, "date_joined": "2010-03-27", "name": "Daniel"})')
 
+    def get_stream_sample(self, objects):
+        return {
+            'meta': {'limit': 20, 'next': None},
+            'objects': objects,
+        }
+
+    def test_to_json_stream(self):
+        serializer = Serializer()
+        objects = [self.get_sample1(), self.get_sample2()]
+
+        streamed = ''.join(serializer.to_json_stream(self.get_stream_sample(iter(objects))))
+        self.assertEqual(streamed, serializer.to_json(self.get_stream_sample(objects)))
+        self.assertEqual(''.join(serializer.to_json_stream(self.get_stream_sample(iter([])))), '{"meta": {"limit": 20, "next": null}, "objects": []}')
+        # Without any iterators, it's the same as ``to_json``.
+        self.assertEqual(''.join(serializer.to_json_stream(self.get_sample1())), serializer.to_json(self.get_sample1()))
+
+        options = {'callback': 'myCallback'}
+        streamed = ''.join(serializer.to_jsonp_stream(self.get_stream_sample(iter(objects)), options))
+        self.assertEqual(streamed, serializer.to_jsonp(self.get_stream_sample(objects), options))
+
+    def test_to_json_stream_is_lazy(self):
+        serializer = Serializer()
+        seen = []
+
+        def objects():
+            for i in range(3):
+                seen.append(i)
+                yield {'id': i}
+
+        chunks = serializer.serialize_stream(self.get_stream_sample(objects()), 'application/json')
+        self.assertEqual(seen, [])
+
+        chunks = iter(chunks)
+        self.assertEqual(chunks.next(), '{')
+        self.assertEqual(seen, [])
+        self.assertEqual(''.join(chunks), '"meta": {"limit": 20, "next": null}, "objects": [{"id": 0}, {"id": 1}, {"id": 2}]}')
+        self.assertEqual(seen, [0, 1, 2])
+
+    @unittest.skipUnless(lxml, 'lxml not installed')
+    def test_to_xml_stream(self):
+        serializer = Serializer()
+        objects = [self.get_sample1(), self.get_sample2()]
+
+        streamed = ''.join(serializer.to_xml_stream(self.get_stream_sample(iter(objects))))
+        self.assertTrue(streamed.startswith("<?xml version='1.0' encoding='utf-8'?>\n<response>"))
+        expected = serializer.to_xml(self.get_stream_sample(objects))
+        self.assertEqual(serializer.from_xml(streamed.replace('response', 'request')), serializer.from_xml(expected.replace('response', 'request')))
+
+    def test_serialize_stream_fallback(self):
+        serializer = Serializer()
+        objects = [self.get_sample1()]
+
+        # Formats without a ``to_<format>_stream`` are serialized in one go.
+        chunks = serializer.serialize_stream(self.get_stream_sample(iter(objects)), 'text/html')
+        self.assertEqual(chunks, [serializer.to_html(self.get_stream_sample(objects))])
+
+        if yaml is not None:
+            chunks = serializer.serialize_stream(self.get_stream_sample(iter(objects)), 'text/yaml')
+            self.assertEqual(chunks, [serializer.to_yaml(self.get_stream_sample(objects))])
+
     @unittest.skipUnless(biplist, 'biplist not installed')
     def test_to_plist(self):
         serializer = Serializer()
@@ -1,8 +1,48 @@
+import threading
 import time
 from django.core.cache import cache
+from django.db.models import Manager
 from django.test import TestCase
 from tastypie.models import ApiAccess
-from tastypie.throttle import BaseThrottle, CacheThrottle, CacheDBThrottle
+from tastypie import throttle
+from tastypie.throttle import BaseThrottle, CacheThrottle, CacheDBThrottle, SlidingWindowThrottle, ConcurrencyThrottle
+
+
+class CountingThrottle(BaseThrottle):
+    def __init__(self, *args, **kwargs):
+        super(CountingThrottle, self).__init__(*args, **kwargs)
+        self.accesses = []
+
+    def should_be_throttled(self, identifier, **kwargs):
+        return len(self.accesses) >= 1
+
+    def accessed(self, identifier, **kwargs):
+        self.accesses.append((identifier, kwargs))
+
+
+class CustomCacheThrottle(CacheThrottle):
+    def accessed(self, identifier, **kwargs):
+        super(CustomCacheThrottle, self).accessed(identifier, **kwargs)
+        cache.set('custom_accessed', identifier)
+
+
+class FailingCacheDBThrottle(CacheDBThrottle):
+    failures = 0
+
+    def save_accesses(self, accesses):
+        if self.failures:
+            self.failures -= 1
+            raise IOError('The database is down.')
+
+        return super(FailingCacheDBThrottle, self).save_accesses(accesses)
+
+
+class MockTime(object):
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
 
 
 class NoThrottleTestCase(TestCase):
@@ -25,6 +65,17 @@ class NoThrottleTestCase(TestCase):
         self.assertEqual(throttle_1.convert_identifier_to_key('Mr_Pants'), 'Mr_Pants_accesses')
         self.assertEqual(throttle_1.convert_identifier_to_key('%^@@$&!a'), 'a_accesses')
 
+    def test_get_bucket(self):
+        throttle_1 = BaseThrottle()
+        self.assertEqual(throttle_1.get_bucket('daniel', resource_name='notes', request_method='get'), 'daniel')
+
+        throttle_2 = BaseThrottle(per_resource=True)
+        self.assertEqual(throttle_2.get_bucket('daniel', resource_name='notes', request_method='get'), 'daniel_notes')
+        self.assertEqual(throttle_2.get_bucket('daniel'), 'daniel')
+
+        throttle_3 = BaseThrottle(per_resource=True, per_method=True)
+        self.assertEqual(throttle_3.get_bucket('daniel', resource_name='notes', request_method='get'), 'daniel_notes_get')
+
     def test_should_be_throttled(self):
         throttle_1 = BaseThrottle()
         self.assertEqual(throttle_1.should_be_throttled('foobaz'), False)
@@ -33,6 +84,16 @@ class NoThrottleTestCase(TestCase):
         throttle_1 = BaseThrottle()
         self.assertEqual(throttle_1.accessed('foobaz'), None)
 
+    def test_consume(self):
+        throttle_1 = BaseThrottle()
+        self.assertEqual(throttle_1.consume('foobaz'), False)
+
+        # Throttles that only implement the two-phase API still work.
+        throttle_2 = CountingThrottle()
+        self.assertEqual(throttle_2.consume('foobaz', url='/'), False)
+        self.assertEqual(throttle_2.consume('foobaz', url='/'), True)
+        self.assertEqual(throttle_2.accesses, [('foobaz', {'url': '/'})])
+
 
 class CacheThrottleTestCase(TestCase):
     def tearDown(self):
@@ -75,6 +136,59 @@ class CacheThrottleTestCase(TestCase):
         self.assertEqual(len(cache.get('daniel_accesses')), 0)
 
 
+class CacheThrottleConsumeTestCase(TestCase):
+    def tearDown(self):
+        cache.delete('daniel_accesses')
+        cache.delete('custom_accessed')
+
+    def test_consume(self):
+        throttle_1 = CacheThrottle(throttle_at=2, timeframe=5, expiration=2)
+        self.assertEqual(throttle_1.consume('daniel'), False)
+        self.assertEqual(len(cache.get('daniel_accesses')), 1)
+        self.assertEqual(throttle_1.consume('daniel'), False)
+
+        # THROTTLE'D! Which isn't recorded.
+        self.assertEqual(throttle_1.consume('daniel'), True)
+        self.assertEqual(len(cache.get('daniel_accesses')), 2)
+        self.assertEqual(throttle_1.should_be_throttled('daniel'), True)
+
+    def test_consume_cost(self):
+        throttle_1 = CacheThrottle(throttle_at=10, timeframe=5, expiration=2)
+        self.assertEqual(throttle_1.consume('daniel', cost=6), False)
+        self.assertEqual(throttle_1.consume('daniel'), False)
+        self.assertEqual(throttle_1.should_be_throttled('daniel'), False)
+
+        # The last one is allowed, but charged in full.
+        self.assertEqual(throttle_1.consume('daniel', cost=8), False)
+        self.assertEqual(len(cache.get('daniel_accesses')), 3)
+        self.assertEqual(throttle_1.should_be_throttled('daniel'), True)
+        self.assertEqual(throttle_1.consume('daniel'), True)
+
+        throttle_1.accessed('cody', cost=3)
+        self.assertEqual(throttle_1.get_recent_accesses(cache.get('cody_accesses'))[1], 3)
+        cache.delete('cody_accesses')
+
+    def test_consume_buckets(self):
+        throttle_1 = CacheThrottle(throttle_at=1, timeframe=5, expiration=2, per_method=True)
+        self.assertEqual(throttle_1.consume('daniel', request_method='get'), False)
+        self.assertEqual(throttle_1.consume('daniel', request_method='get'), True)
+        self.assertEqual(throttle_1.consume('daniel', request_method='post'), False)
+        self.assertEqual(throttle_1.should_be_throttled('daniel', request_method='post'), True)
+        self.assertEqual(cache.get('daniel_accesses'), None)
+        cache.delete('daniel_get_accesses')
+        cache.delete('daniel_post_accesses')
+
+    def test_consume_custom_checks(self):
+        throttle_1 = CustomCacheThrottle(throttle_at=2, timeframe=5, expiration=2)
+        self.assertEqual(throttle_1.has_custom_checks(CacheThrottle), True)
+        self.assertEqual(CacheThrottle().has_custom_checks(CacheThrottle), False)
+
+        # The overridden ``accessed`` is still used.
+        self.assertEqual(throttle_1.consume('daniel'), False)
+        self.assertEqual(cache.get('custom_accessed'), 'daniel')
+        self.assertEqual(len(cache.get('daniel_accesses')), 1)
+
+
 class CacheDBThrottleTestCase(TestCase):
     def tearDown(self):
         cache.delete('daniel_accesses')
@@ -129,3 +243,385 @@ class CacheDBThrottleTestCase(TestCase):
         self.assertEqual(len(cache.get('daniel_accesses')), 0)
         self.assertEqual(ApiAccess.objects.count(), 7)
         self.assertEqual(ApiAccess.objects.filter(identifier='daniel').count(), 4)
+
+    def test_consume(self):
+        throttle_1 = CacheDBThrottle(throttle_at=1, timeframe=5, expiration=2)
+
+        self.assertEqual(throttle_1.consume('daniel', url='/', request_method='get'), False)
+        self.assertEqual(len(cache.get('daniel_accesses')), 1)
+        self.assertEqual(ApiAccess.objects.filter(identifier='daniel').count(), 1)
+
+        # THROTTLE'D! Which isn't logged.
+        self.assertEqual(throttle_1.consume('daniel', url='/', request_method='get'), True)
+        self.assertEqual(len(cache.get('daniel_accesses')), 1)
+        self.assertEqual(ApiAccess.objects.filter(identifier='daniel').count(), 1)
+        self.assertEqual(ApiAccess.objects.get(identifier='daniel').url, '/')
+
+
+class BufferedCacheDBThrottleTestCase(TestCase):
+    def tearDown(self):
+        cache.delete('daniel_accesses')
+
+    def test_buffer_size(self):
+        throttle_1 = CacheDBThrottle(throttle_at=10, buffer_size=3, flush_thread=False)
+
+        self.assertEqual(throttle_1.consume('daniel', url='/', request_method='get'), False)
+        self.assertEqual(throttle_1.consume('daniel', url='/', request_method='get'), False)
+        self.assertEqual(ApiAccess.objects.count(), 0)
+        self.assertEqual(len(cache.get('daniel_accesses')), 2)
+
+        # Written in one go (an ``INSERT`` each, without ``bulk_create``).
+        if hasattr(ApiAccess.objects, 'bulk_create'):
+            self.assertNumQueries(1, lambda: throttle_1.consume('daniel', url='/', request_method='get'))
+        else:
+            self.assertNumQueries(3, lambda: throttle_1.consume('daniel', url='/', request_method='get'))
+        self.assertEqual(ApiAccess.objects.filter(identifier='daniel', url='/', request_method='get').count(), 3)
+        self.assertTrue(ApiAccess.objects.all()[0].accessed > 0)
+
+        # Through ``accessed`` too.
+        throttle_1.accessed('daniel')
+        self.assertEqual(ApiAccess.objects.count(), 3)
+        self.assertEqual(throttle_1.flush(), 1)
+        self.assertEqual(ApiAccess.objects.count(), 4)
+        self.assertEqual(throttle_1.flush(), 0)
+
+    def test_flush_batch_size(self):
+        throttle_1 = CacheDBThrottle(buffer_size=10, flush_thread=False)
+        throttle_1.flush_batch_size = 4
+
+        for i in range(9):
+            throttle_1.log_access('daniel')
+
+        if hasattr(ApiAccess.objects, 'bulk_create'):
+            self.assertNumQueries(3, throttle_1.flush)
+        else:
+            self.assertNumQueries(9, throttle_1.flush)
+
+        self.assertEqual(ApiAccess.objects.count(), 9)
+
+    def test_flush_if_due(self):
+        throttle_1 = CacheDBThrottle(buffer_size=10, flush_interval=60, flush_thread=False)
+        throttle_1.log_access('daniel')
+
+        throttle_1.flush_if_due()
+        self.assertEqual(ApiAccess.objects.count(), 0)
+
+        throttle_1.flush_interval = 0
+        throttle_1.flush_if_due()
+        self.assertEqual(ApiAccess.objects.count(), 1)
+
+    def test_without_bulk_create(self):
+        # Django 1.3 has no ``bulk_create``.
+        bulk_create = getattr(Manager, 'bulk_create', None)
+        old_time = throttle.time
+        throttle.time = MockTime(1000.0)
+
+        if bulk_create is not None:
+            del Manager.bulk_create
+
+        try:
+            throttle_1 = CacheDBThrottle(buffer_size=10, flush_thread=False)
+            throttle_1.log_access('daniel', url='/1/')
+            throttle_1.log_access('daniel', url='/2/')
+            self.assertEqual(throttle_1.flush(), 2)
+        finally:
+            throttle.time = old_time
+
+            if bulk_create is not None:
+                Manager.bulk_create = bulk_create
+
+        # The buffered times are kept.
+        self.assertEqual(sorted(ApiAccess.objects.values_list('url', 'accessed')), [(u'/1/', 1000), (u'/2/', 1000)])
+
+    def test_failures(self):
+        throttle_1 = FailingCacheDBThrottle(buffer_size=2, max_buffer_size=3, flush_thread=False)
+        throttle_1.failures = 1
+
+        # Kept for the next flush.
+        throttle_1.log_access('daniel', url='/1/')
+        throttle_1.log_access('daniel', url='/2/')
+        self.assertEqual(ApiAccess.objects.count(), 0)
+        self.assertEqual(len(throttle_1._buffer), 2)
+
+        # But no more than ``max_buffer_size``. Retries wait for the
+        # ``flush_interval``.
+        throttle_1.log_access('daniel', url='/3/')
+        throttle_1.log_access('daniel', url='/4/')
+        self.assertEqual(throttle_1.dropped, 1)
+        self.assertEqual([access.url for access in throttle_1._buffer], ['/2/', '/3/', '/4/'])
+
+        self.assertEqual(throttle_1.flush(), 3)
+        self.assertEqual(sorted(ApiAccess.objects.values_list('url', flat=True)), [u'/2/', u'/3/', u'/4/'])
+
+    def test_flush_in_background(self):
+        throttle_1 = FailingCacheDBThrottle(buffer_size=10, flush_interval=0, flush_thread=False)
+        throttle_1.failures = 1
+        throttle_1.log_access('daniel', url='/1/')
+
+        # Kept for the next attempt.
+        throttle_1._flush_in_background()
+        self.assertEqual([access.url for access in throttle_1._buffer], ['/1/'])
+        throttle_1._flush_in_background()
+        self.assertEqual(ApiAccess.objects.count(), 1)
+
+        # Nothing gets out of the thread.
+        def flush_if_due():
+            raise IOError('The database is down.')
+
+        throttle_1.flush_if_due = flush_if_due
+        throttle_1._flush_in_background()
+
+
+class ThrottleStatusTestCase(TestCase):
+    def setUp(self):
+        super(ThrottleStatusTestCase, self).setUp()
+        self.old_time = throttle.time
+        throttle.time = MockTime(1005.0)
+
+    def tearDown(self):
+        throttle.time = self.old_time
+        cache.clear()
+        super(ThrottleStatusTestCase, self).tearDown()
+
+    def test_base(self):
+        status = {}
+        self.assertEqual(BaseThrottle().consume('daniel', status=status), False)
+        self.assertEqual(status, {})
+
+    def test_cache_throttle(self):
+        throttle_1 = CacheThrottle(throttle_at=3, timeframe=10, expiration=20)
+        status = {}
+        self.assertEqual(throttle_1.consume('daniel', status=status), False)
+        self.assertEqual(status, {'limit': 3, 'remaining': 2, 'reset': 1016})
+
+        throttle.time.now = 1008.0
+        self.assertEqual(throttle_1.consume('daniel', cost=2, status=status), False)
+        self.assertEqual(status, {'limit': 3, 'remaining': 0, 'reset': 1016})
+
+        # Under the limit again once the first access expires.
+        status = {}
+        self.assertEqual(throttle_1.consume('daniel', status=status), True)
+        self.assertEqual(status, {'limit': 3, 'remaining': 0, 'reset': 1016, 'retry_after': 8})
+
+        throttle.time.now = 1016.0
+        status = {}
+        self.assertEqual(throttle_1.consume('daniel', status=status), False)
+        self.assertEqual(status, {'limit': 3, 'remaining': 0, 'reset': 1019})
+
+    def test_sliding_window_throttle(self):
+        throttle_1 = SlidingWindowThrottle(throttle_at=4, timeframe=10)
+        status = {}
+        self.assertEqual(throttle_1.consume('daniel', cost=3, status=status), False)
+        self.assertEqual(status, {'limit': 4, 'remaining': 1, 'reset': 1010})
+
+        # Over the limit in this window alone, so they wait until over a
+        # fifth of the next has passed.
+        self.assertEqual(throttle_1.consume('daniel', cost=2, status=status), False)
+        self.assertEqual(throttle_1.consume('daniel', status=status), True)
+        self.assertEqual(status, {'limit': 4, 'remaining': 0, 'reset': 1010, 'retry_after': 8})
+
+        # Now the previous window's share has to shrink.
+        throttle.time.now = 1012.0
+        status = {}
+        self.assertEqual(throttle_1.consume('daniel', status=status), True)
+        self.assertEqual(status['retry_after'], 1)
+        throttle.time.now = 1013.0
+        status = {}
+        self.assertEqual(throttle_1.consume('daniel', status=status), False)
+        self.assertEqual(status, {'limit': 4, 'remaining': 0, 'reset': 1020})
+
+
+class SlidingWindowThrottleTestCase(TestCase):
+    def setUp(self):
+        super(SlidingWindowThrottleTestCase, self).setUp()
+        self.old_time = throttle.time
+        throttle.time = MockTime(1000.0)
+
+    def tearDown(self):
+        throttle.time = self.old_time
+        cache.clear()
+        super(SlidingWindowThrottleTestCase, self).tearDown()
+
+    def test_get_window_keys(self):
+        throttle_1 = SlidingWindowThrottle(throttle_at=2, timeframe=60)
+        self.assertEqual(throttle_1.get_window_keys('daniel'), ('daniel_accesses_16', 'daniel_accesses_15', 1.0 - 40.0 / 60))
+
+    def test_throttling(self):
+        throttle_1 = SlidingWindowThrottle(throttle_at=3, timeframe=10)
+        throttle.time.now = 1005.0
+
+        self.assertEqual(throttle_1.should_be_throttled('daniel'), False)
+        self.assertEqual(throttle_1.accessed('daniel'), None)
+        self.assertEqual(throttle_1.accessed('daniel'), None)
+        self.assertEqual(cache.get('daniel_accesses_100'), 2)
+        self.assertEqual(throttle_1.should_be_throttled('daniel'), False)
+        self.assertEqual(throttle_1.accessed('daniel'), None)
+
+        # THROTTLE'D!
+        self.assertEqual(throttle_1.should_be_throttled('daniel'), True)
+
+        # Should be no interplay.
+        self.assertEqual(throttle_1.should_be_throttled('cody'), False)
+
+        # Early in the next window, most of the last one still counts...
+        throttle.time.now = 1012.0
+        self.assertEqual(throttle_1.should_be_throttled('daniel'), False)
+        self.assertEqual(throttle_1.accessed('daniel'), None)
+        # ...(3 * 0.8 + 1)...
+        self.assertEqual(throttle_1.should_be_throttled('daniel'), True)
+
+        # ...but less & less of it.
+        throttle.time.now = 1018.0
+        self.assertEqual(throttle_1.should_be_throttled('daniel'), False)
+
+        # Two windows on, it's all forgotten.
+        throttle.time.now = 1030.0
+        self.assertEqual(throttle_1.should_be_throttled('daniel'), False)
+
+    def test_increment(self):
+        throttle_1 = SlidingWindowThrottle()
+        self.assertEqual(throttle_1.increment('daniel_accesses_1'), 1)
+        self.assertEqual(throttle_1.increment('daniel_accesses_1'), 2)
+        self.assertEqual(throttle_1.increment('daniel_accesses_1', 3), 5)
+
+    def test_consume(self):
+        throttle_1 = SlidingWindowThrottle(throttle_at=2, timeframe=10)
+        throttle.time.now = 1005.0
+
+        self.assertEqual(throttle_1.consume('daniel'), False)
+        self.assertEqual(throttle_1.consume('daniel'), False)
+        self.assertEqual(cache.get('daniel_accesses_100'), 2)
+
+        # THROTTLE'D! Which isn't counted.
+        self.assertEqual(throttle_1.consume('daniel'), True)
+        self.assertEqual(cache.get('daniel_accesses_100'), 2)
+
+        # The previous window is read once, then remembered.
+        throttle.time.now = 1018.0
+        self.assertEqual(throttle_1.consume('daniel'), False)
+        self.assertEqual(throttle_1.previous_counts.get('daniel_accesses_100'), 2)
+        cache.set('daniel_accesses_100', 50)
+        self.assertEqual(throttle_1.consume('daniel'), False)
+        self.assertEqual(cache.get('daniel_accesses_101'), 2)
+
+    def test_consume_cost(self):
+        throttle_1 = SlidingWindowThrottle(throttle_at=10, timeframe=10, per_resource=True)
+        throttle.time.now = 1005.0
+
+        self.assertEqual(throttle_1.consume('daniel', resource_name='notes', cost=6), False)
+        self.assertEqual(throttle_1.consume('daniel', resource_name='notes', cost=6), False)
+        self.assertEqual(cache.get('daniel_notes_accesses_100'), 12)
+
+        # THROTTLE'D! Which is taken back in full.
+        self.assertEqual(throttle_1.consume('daniel', resource_name='notes', cost=6), True)
+        self.assertEqual(cache.get('daniel_notes_accesses_100'), 12)
+        self.assertEqual(throttle_1.should_be_throttled('daniel', resource_name='notes'), True)
+
+        # Resources are counted separately.
+        self.assertEqual(throttle_1.consume('daniel', resource_name='users'), False)
+        throttle_1.accessed('daniel', resource_name='users', cost=3)
+        self.assertEqual(cache.get('daniel_users_accesses_100'), 4)
+
+    def test_consume_expired(self):
+        throttle_1 = SlidingWindowThrottle(throttle_at=1, timeframe=10)
+        throttle.time.now = 1005.0
+        cache.set('daniel_accesses_100', 1)
+        increment = throttle_1.increment
+
+        def increment_then_expire(key, delta=1):
+            count = increment(key, delta)
+            cache.delete(key)
+            return count
+
+        # THROTTLE'D! The counter's already gone, so there's nothing to
+        # take back.
+        throttle_1.increment = increment_then_expire
+        self.assertEqual(throttle_1.consume('daniel'), True)
+        self.assertEqual(cache.get('daniel_accesses_100'), None)
+
+
+class ConcurrencyThrottleTestCase(TestCase):
+    def tearDown(self):
+        cache.clear()
+        super(ConcurrencyThrottleTestCase, self).tearDown()
+
+    def test_acquire_release(self):
+        throttle_1 = ConcurrencyThrottle(max_concurrent=2)
+        self.assertEqual(throttle_1.acquire('daniel'), True)
+        self.assertEqual(throttle_1.acquire('daniel'), True)
+        self.assertEqual(throttle_1.in_flight('daniel'), 2)
+
+        # Rejected, without holding a slot.
+        self.assertEqual(throttle_1.acquire('daniel'), False)
+        self.assertEqual(throttle_1.in_flight('daniel'), 2)
+        self.assertEqual(throttle_1.acquire('cody'), True)
+
+        throttle_1.release('daniel')
+        self.assertEqual(throttle_1.in_flight('daniel'), 1)
+        self.assertEqual(throttle_1.acquire('daniel'), True)
+
+        # Never below zero.
+        for i in range(4):
+            throttle_1.release('cody')
+
+        self.assertEqual(throttle_1.in_flight('cody'), 0)
+
+    def test_buckets(self):
+        throttle_1 = ConcurrencyThrottle(max_concurrent=1, per_method=True)
+        self.assertEqual(throttle_1.acquire('daniel', request_method='get'), True)
+        self.assertEqual(throttle_1.acquire('daniel', request_method='get'), False)
+        self.assertEqual(throttle_1.acquire('daniel', request_method='post'), True)
+
+    def test_wait(self):
+        throttle_1 = ConcurrencyThrottle(max_concurrent=1, wait=0.1)
+        self.assertEqual(throttle_1.acquire('daniel'), True)
+
+        start = time.time()
+        self.assertEqual(throttle_1.acquire('daniel'), False)
+        self.assertTrue(time.time() - start >= 0.1)
+
+        # Queued until the slot comes free.
+        throttle_1.wait = 5
+        releaser = threading.Timer(0.1, throttle_1.release, ['daniel'])
+        releaser.start()
+        self.assertEqual(throttle_1.acquire('daniel'), True)
+        self.assertTrue(time.time() - start < 5)
+        releaser.join()
+
+    def test_timeout(self):
+        throttle_1 = ConcurrencyThrottle(max_concurrent=1, timeout=1)
+        self.assertEqual(throttle_1.acquire('daniel'), True)
+        self.assertEqual(throttle_1.acquire('daniel'), False)
+
+        # A leaked slot is recovered once the counter expires.
+        time.sleep(1.1)
+        self.assertEqual(throttle_1.acquire('daniel'), True)
+
+    def test_timeout_kept_by_incr(self):
+        throttle_1 = ConcurrencyThrottle(max_concurrent=1, timeout=1)
+
+        # Like backends whose ``incr`` sets the value again, with the
+        # default timeout.
+        def incr(key, delta=1, **kwargs):
+            value = cache.get(key)
+
+            if value is None:
+                raise ValueError("Key '%s' not found" % key)
+
+            cache.set(key, value + delta)
+            return value + delta
+
+        cache.incr = incr
+
+        try:
+            self.assertEqual(throttle_1.acquire('daniel'), True)
+            self.assertEqual(throttle_1.acquire('daniel'), False)
+            self.assertEqual(throttle_1.in_flight('daniel'), 1)
+
+            # The slots still expire on time.
+            time.sleep(1.1)
+            self.assertEqual(throttle_1.in_flight('daniel'), 0)
+            self.assertEqual(throttle_1.acquire('daniel'), True)
+            self.assertEqual(throttle_1.in_flight('daniel'), 1)
+        finally:
+            del(cache.incr)